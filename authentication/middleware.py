@@ -0,0 +1,36 @@
+import re
+
+from django.http import JsonResponse
+
+from .tokens import TokenError, authenticate_token
+
+# The mobile API: every json/ and flutter/ endpoint
+API_PATH = re.compile(r'/(json|flutter)(/|$)')
+
+
+class TokenAuthenticationMiddleware:
+    """
+    Authenticates API requests that carry `Authorization: Bearer <access token>`.
+    The user comes from the token and the user cache, so the session is never
+    read; a bad or expired token is answered with 401. Requests without a
+    bearer token keep their session user. Goes after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        header = request.headers.get('Authorization', '')
+        if header.startswith('Bearer ') and API_PATH.search(request.path_info):
+            try:
+                user = authenticate_token(header[len('Bearer '):].strip())
+            except TokenError as e:
+                return JsonResponse({'status': False, 'message': e.message}, status=401)
+
+            async def auser():
+                return user
+
+            request.user = user
+            request.auser = auser
+            request._dont_enforce_csrf_checks = True  # no cookies involved, so no CSRF
+        return self.get_response(request)
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from main.models import CustomUser
+from .tokens import invalidate_user
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Token requests must see deactivations and password changes"""
+    invalidate_user(instance.pk)
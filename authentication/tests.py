@@ -1,3 +1,81 @@
-from django.test import TestCase
+import json
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from main.models import CustomUser
 
-# Create your tests here.
+
+class TokenAuthenticationTests(TestCase):
+    """Signed bearer tokens authenticate json/ and flutter/ requests without the session"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='fan', password='password123', email='fan@example.com', full_name='Fan'
+        )
+
+    def obtain(self, password='password123'):
+        return self.client.post(
+            reverse('authentication:token'),
+            json.dumps({'username': 'fan', 'password': password}),
+            content_type='application/json',
+        )
+
+    def get(self, url, token):
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_access_token_skips_session_and_user_queries(self):
+        self.assertEqual(self.obtain('wrong').status_code, 401)
+        tokens = self.obtain().json()
+        self.assertEqual((tokens['token_type'], tokens['expires_in']), ('Bearer', 60 * 15))
+        self.assertNotIn('sessionid', self.client.cookies)
+
+        url = reverse('club_directories:show_json_picks')
+        with self.assertNumQueries(2):  # user (then cached), picks (then cached)
+            response = self.get(url, tokens['access'])
+        self.assertEqual(response.json(), {'picks': {}})
+        with self.assertNumQueries(0):
+            self.get(url, tokens['access'])
+
+        response = self.get(reverse('forum:get_favorite_clubs_flutter'), tokens['access'])
+        self.assertEqual(response.json(), {'status': 'success', 'clubs': []})
+
+    def test_bad_tokens_are_rejected(self):
+        tokens = self.obtain().json()
+        url = reverse('club_directories:show_json_picks')
+        self.assertEqual(self.get(url, tokens['refresh']).status_code, 401)
+        self.assertEqual(self.get(url, tokens['access'][:-2] + 'xx').status_code, 401)
+        with override_settings(ACCESS_TOKEN_TTL=-1):
+            response = self.get(url, tokens['access'])
+        self.assertEqual((response.status_code, response.json()['message']), (401, 'Token expired.'))
+
+        # Only API paths read the header
+        self.assertEqual(self.get(reverse('main:profile'), 'junk').status_code, 302)
+
+    def test_refresh_and_revocation(self):
+        tokens = self.obtain().json()
+        response = self.client.post(
+            reverse('authentication:token_refresh'), json.dumps({'refresh': tokens['refresh']}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        access = response.json()['access']
+        self.assertEqual(self.get(reverse('club_directories:show_json_picks'), access).status_code, 200)
+
+        self.user.set_password('another-password')
+        self.user.save()
+        self.assertEqual(self.get(reverse('club_directories:show_json_picks'), access).status_code, 401)
+        response = self.client.post(reverse('authentication:token_refresh'), {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_reads_the_user_from_the_database(self):
+        tokens = self.obtain().json()
+        self.get(reverse('club_directories:show_json_picks'), tokens['access'])  # caches the user
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)  # sends no post_save
+        response = self.client.post(reverse('authentication:token_refresh'), {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+    def test_login_also_returns_tokens(self):
+        response = self.client.post(reverse('authentication:login'), {'username': 'fan', 'password': 'password123'})
+        self.assertTrue(response.json()['status'])
+        self.assertIn('access', response.json())
@@ -0,0 +1,99 @@
+"""
+Stateless bearer tokens for the mobile API.
+
+Tokens are signed (HMAC-SHA256 over SECRET_KEY) and timestamped with
+django.core.signing, so verifying one needs no database. A short-lived
+access token authenticates json/ and flutter/ requests; a long-lived
+refresh token trades for a new pair. Both carry a fragment of the user's
+session auth hash, so changing the password revokes them.
+
+Access tokens are checked against a cached copy of the user. Saving or
+deleting the user clears it, but only in the TOKEN_USER_CACHE backend the
+save ran against: with a per-process cache (LocMemCache) other workers,
+and any change made with QuerySet.update(), keep seeing the old user for
+up to TOKEN_USER_CACHE_TIMEOUT seconds. Point TOKEN_USER_CACHE at a shared
+backend (Redis, Memcached, database) to make revocation immediate.
+Refresh tokens always read the user from the database.
+"""
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+
+from main.models import CustomUser
+
+ACCESS = 'access'
+REFRESH = 'refresh'
+
+
+class TokenError(Exception):
+    """A token that is malformed, tampered with, expired or revoked"""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+def _ttl(kind):
+    return settings.ACCESS_TOKEN_TTL if kind == ACCESS else settings.REFRESH_TOKEN_TTL
+
+
+def _user_hash(user):
+    return user.get_session_auth_hash()[:16]
+
+
+def make_token(user, kind):
+    return signing.dumps({'uid': user.pk, 'h': _user_hash(user)}, salt=f'authentication.{kind}')
+
+
+def issue_tokens(user):
+    return {
+        'access': make_token(user, ACCESS),
+        'refresh': make_token(user, REFRESH),
+        'token_type': 'Bearer',
+        'expires_in': settings.ACCESS_TOKEN_TTL,
+    }
+
+
+def read_token(token, kind=ACCESS):
+    """The token's payload, checked against its signature and TTL (no DB access)"""
+    try:
+        return signing.loads(token, salt=f'authentication.{kind}', max_age=_ttl(kind))
+    except signing.SignatureExpired:
+        raise TokenError('Token expired.')
+    except signing.BadSignature:
+        raise TokenError('Invalid token.')
+
+
+def user_cache_key(user_id):
+    return f'authentication:user:{user_id}'
+
+
+def user_cache():
+    return caches[settings.TOKEN_USER_CACHE]
+
+
+def invalidate_user(user_id):
+    user_cache().delete(user_cache_key(user_id))
+
+
+def cached_user(user_id):
+    """The user with this id, read from the cache (or once from the DB); None if there is none"""
+    key = user_cache_key(user_id)
+    user = user_cache().get(key)
+    if user is None:
+        user = CustomUser.objects.filter(pk=user_id).first()
+        if user is not None:
+            user_cache().set(key, user, settings.TOKEN_USER_CACHE_TIMEOUT)
+    return user
+
+
+def authenticate_token(token, kind=ACCESS):
+    """The active user a token was issued to (TokenError if it isn't valid any more)"""
+    payload = read_token(token, kind)
+    if kind == ACCESS:
+        user = cached_user(payload.get('uid'))
+    else:
+        user = CustomUser.objects.filter(pk=payload.get('uid')).first()
+    if user is None or not user.is_active or payload.get('h') != _user_hash(user):
+        raise TokenError('Invalid token.')
+    return user
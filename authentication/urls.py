@@ -7,6 +7,8 @@ urlpatterns = [
     path('login/', login, name='login'),
     path('register/', register, name='register'),
     path('logout/', logout, name='logout'),
+    path('token/', token, name='token'),
+    path('token/refresh/', token_refresh, name='token_refresh'),
     path('profile/', profile_json, name='profile_json'),
     path('profile/edit/', profile_edit, name='edit_profile'),  
 ]
\ No newline at end of file
@@ -4,6 +4,7 @@ from django.contrib.auth import authenticate, login as auth_login, logout as aut
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
 from main.models import CustomUser
+from .tokens import REFRESH, TokenError, authenticate_token, issue_tokens
 import json
 
 @csrf_exempt
@@ -27,6 +28,7 @@ def login(request):
                     "message": "Login successful!",
                     "username": user.username,
                     "is_staff": user.is_staff, 
+                    **issue_tokens(user),
                 }, status=200)
             else:
                 return JsonResponse({
@@ -41,6 +43,39 @@ def login(request):
             
     return JsonResponse({'status': False, 'message': 'Method not allowed'}, status=405)
 
+def _json_or_post(request):
+    try:
+        data = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return request.POST
+    return data if isinstance(data, dict) else {}
+
+@csrf_exempt
+def token(request):
+    """Trade a username and password for an access and a refresh token (no session)"""
+    if request.method != 'POST':
+        return JsonResponse({'status': False, 'message': 'Method not allowed'}, status=405)
+    data = _json_or_post(request)
+    user = authenticate(username=data.get('username'), password=data.get('password'))
+    if user is None or not user.is_active:
+        return JsonResponse({
+            "status": False,
+            "message": "Login failed, please check your username or password."
+        }, status=401)
+    return JsonResponse({"status": True, "username": user.username, **issue_tokens(user)}, status=200)
+
+@csrf_exempt
+def token_refresh(request):
+    """Trade a refresh token for a new pair"""
+    if request.method != 'POST':
+        return JsonResponse({'status': False, 'message': 'Method not allowed'}, status=405)
+    data = _json_or_post(request)
+    try:
+        user = authenticate_token(str(data.get('refresh') or ''), kind=REFRESH)
+    except TokenError as e:
+        return JsonResponse({"status": False, "message": e.message}, status=401)
+    return JsonResponse({"status": True, "username": user.username, **issue_tokens(user)}, status=200)
+
 @csrf_exempt
 def register(request):
     if request.method == 'POST':
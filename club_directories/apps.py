@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ClubDirectoriesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'club_directories'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,119 @@
+import re
+import unicodedata
+
+# Spellings used by the data sources that no normalization can map to the
+# club's name (alias -> Club.name). Aliases added in the admin live in ClubAlias.
+BUILTIN_ALIASES = {
+    'reial-club-deportiu-espanyol': 'Espanyol Barcelona',
+    'rennes': 'Stade Rennais FC',
+    'koln': '1. FC Köln',
+    'fc-bayern-munchen': 'FC Bayern München',
+    '1-fsv-mainz-05': '1. FSV Mainz 05',
+    'borussia-vfl-monchengladbach': 'Borussia Mönchengladbach',
+    'fc-st-pauli': 'FC St. Pauli',
+    'le-havre': 'Le Havre AC',
+    'olympique-de-marseille': 'Olympique Marseille',
+    'paris-saint-germain-fc': 'Paris Saint-Germain',
+    'real-club-celta-de-vigo': 'RC Celta de Vigo',
+    'real-club-deportivo-mallorca': 'RCD Mallorca',
+    'real-sociedad': 'Real Sociedad San Sebastian',
+    'sporting-braga': 'SC Braga',
+    'angers-sporting-club-de-louest': 'Angers SCO',
+}
+
+# Club-type words left out when comparing token sets ("Sevilla FC" == "Sevilla")
+NOISE_TOKENS = {'fc', 'cf', 'afc', 'ac', 'sc', 'cd', 'club', 'de', 'calcio', 'football'}
+
+# Shortest word matched as a prefix of a longer one ('lyon' ~ 'lyonnais')
+MIN_PREFIX = 4
+
+
+def normalize_club_name(name):
+    """'FC Bayern München' / 'fc-bayern-munchen' -> 'fc bayern munchen'"""
+    name = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode()
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', name.lower()).split())
+
+
+def name_tokens(name):
+    tokens = set(normalize_club_name(name).split())
+    return tokens - NOISE_TOKENS or tokens
+
+
+def _tokens_match(a, b):
+    if a == b:
+        return True
+    short, long = sorted((a, b), key=len)
+    return len(short) >= MIN_PREFIX and long.startswith(short)
+
+
+def token_set_similarity(a, b):
+    """
+    0 unless every word of the smaller token set matches a word of the other;
+    then the share of all words matched (1.0 for equal sets)
+    """
+    small, large = sorted((a, b), key=len)
+    if not small or not all(any(_tokens_match(t, u) for u in large) for t in small):
+        return 0.0
+    return len(small) / len(large)
+
+
+class ClubNameIndex:
+    """
+    In-memory club name resolver for the importers, built with two queries
+    (clubs and ClubAlias rows). A name resolves through, in order: an alias,
+    the accent/punctuation folded name, the same token set without words
+    like FC/CF, and finally the club with the most similar token set
+    ('heidenheim' -> '1. FC Heidenheim 1846'), if it is the only best match.
+    Results are memoized, so each distinct name is resolved once.
+    """
+
+    def __init__(self, clubs, aliases=()):
+        self.clubs = list(clubs)
+        by_name = {club.name: club for club in self.clubs}
+        self.by_normalized = {}
+        self.by_tokens = {}
+        for club in self.clubs:
+            self.by_normalized.setdefault(normalize_club_name(club.name), club)
+            self.by_tokens.setdefault(frozenset(name_tokens(club.name)), club)
+        self.by_alias = {
+            normalize_club_name(alias): by_name[name]
+            for alias, name in BUILTIN_ALIASES.items() if name in by_name
+        }
+        clubs_by_id = {club.pk: club for club in self.clubs}
+        for alias, club_id in aliases:
+            if club_id in clubs_by_id:
+                self.by_alias[normalize_club_name(alias)] = clubs_by_id[club_id]
+        self._resolved = {}
+
+    @classmethod
+    def build(cls, clubs=None):
+        """Index over `clubs` (a queryset, all clubs by default) and their stored aliases"""
+        from .models import Club, ClubAlias
+        if clubs is None:
+            clubs = Club.objects.all()
+        aliases = ClubAlias.objects.filter(club__in=clubs).values_list('alias', 'club_id')
+        return cls(clubs, aliases)
+
+    def resolve(self, name):
+        """The Club a name refers to, or None"""
+        if name not in self._resolved:
+            self._resolved[name] = self._resolve(name) if name else None
+        return self._resolved[name]
+
+    def _resolve(self, name):
+        normalized = normalize_club_name(name)
+        club = self.by_alias.get(normalized) or self.by_normalized.get(normalized)
+        if club is not None:
+            return club
+        tokens = frozenset(name_tokens(name))
+        if tokens in self.by_tokens:
+            return self.by_tokens[tokens]
+
+        best, best_score, tie = None, 0.0, False
+        for other, club in self.by_tokens.items():
+            score = token_set_similarity(tokens, other)
+            if score > best_score:
+                best, best_score, tie = club, score, False
+            elif score and score == best_score:
+                tie = True
+        return None if tie else best
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+
+from .models import Club, League
+
+# Map positions of the known leagues (anything else is pinned on Paris)
+LEAGUE_COORDS = {
+    "Premier League": [52.3555, -1.1743],       # UK
+    "La Liga": [40.4637, -3.7492],              # Spain
+    "Bundesliga": [51.1657, 10.4515],           # Germany
+    "Serie A": [41.8719, 12.5674],              # Italy
+    "Ligue 1 McDonald's": [46.603354, 1.888334], # France
+    "Primeira Liga": [39.3999, -8.2245]         # Portugal
+}
+DEFAULT_COORDS = [48.8566, 2.3522]
+
+LEAGUE_SHORT_IDS = {
+    "Premier League": "PREM", "La Liga": "LALI", "Bundesliga": "BUND",
+    "Serie A": "SERI", "Ligue 1 McDonald's": "LIG1", "Primeira Liga": "PRIM"
+}
+
+DESCRIPTION_LENGTH = 100
+
+VERSION_KEY = 'club_directories:directory-version'
+
+
+def directory_version():
+    """Token that changes whenever a league, club or club's details change"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def bump_directory_version():
+    """Invalidate the cached directory (called by signals and the load_* commands)"""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def short_description(description):
+    if not description:
+        return "No description available."
+    return description[:DESCRIPTION_LENGTH] + '...'
+
+
+def build_directory():
+    """The league -> clubs tree shown to everyone, in two queries"""
+    clubs_by_league = {}
+    club_rows = Club.objects.values_list(
+        'league_id', 'id', 'name', 'logo_url', 'founded_year', 'details__description',
+    )
+    for league_id, club_id, name, logo_url, founded_year, description in club_rows:
+        clubs_by_league.setdefault(league_id, []).append({
+            'id': str(club_id),
+            'name': name,
+            'logo_url': logo_url,
+            'founded_year': founded_year,
+            'desc': short_description(description),
+        })
+
+    return [{
+        'id': str(league.id),
+        'name': league.name,
+        'short_id': LEAGUE_SHORT_IDS.get(league.name, league.name[:3].upper()),
+        'region': league.region,
+        'logo_path': league.logo_path,
+        'coords': LEAGUE_COORDS.get(league.name, DEFAULT_COORDS),
+        'clubs': clubs_by_league.get(league.id, []),
+    } for league in League.objects.order_by('name')]
+
+
+class Directory:
+    """The directory tree with its serialized JSON and that JSON's digest (the ETag)"""
+
+    def __init__(self, leagues):
+        self.leagues = leagues
+        self.json = json.dumps(leagues, separators=(',', ':'))
+        self.digest = hashlib.sha256(self.json.encode()).hexdigest()
+
+
+def get_directory():
+    """The Directory, rebuilt at most once per change of the directory data"""
+    key = f'club_directories:directory:{directory_version()}'
+    directory = cache.get(key)
+    if directory is None:
+        directory = Directory(build_directory())
+        cache.set(key, directory, 60 * 60 * 24)
+    return directory
+
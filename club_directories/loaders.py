@@ -0,0 +1,282 @@
+from dataclasses import dataclass, field
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from .club_names import ClubNameIndex
+from .directory import bump_directory_version
+from .models import Club, ClubDetails, League, content_hash
+
+
+@dataclass
+class LoadResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: list = field(default_factory=list)
+    changes: list = field(default_factory=list)  # (action, row label, changed fields)
+
+
+class BulkLoader:
+    """
+    Turns source rows (dicts) into model instances and writes them in a
+    handful of queries: club names are resolved in memory by a ClubNameIndex
+    (built once per loader), the existing rows are read in one query and
+    diffed on `key_fields`, then new rows are bulk created and changed rows
+    bulk updated inside one transaction. Loading the same rows twice is a
+    no-op.
+
+    Subclasses set `model`, `key_fields` and `update_fields` and implement
+    `build(row)`. With `unique_fields` set (a unique constraint of the model)
+    creates are upserts, so a concurrent load of the same rows can't fail on
+    a duplicate key.
+
+    With `fingerprint_field` set, the model stores a content_hash() of its
+    `update_fields`: only (key, pk, fingerprint) triples are read to find
+    the changed rows, and the full stored rows are read only for those.
+    """
+
+    model = None
+    key_fields = ()
+    update_fields = ()
+    unique_fields = None
+    fingerprint_field = None
+    batch_size = 500
+    index = None
+
+    def build(self, row):
+        """Model instance for a source row, or self.skip(row, reason)"""
+        raise NotImplementedError
+
+    def club_queryset(self):
+        """Clubs the rows may refer to by name"""
+        return Club.objects.all()
+
+    def club(self, name):
+        if self.index is None:
+            self.index = ClubNameIndex.build(self.club_queryset())
+        return self.index.resolve(name)
+
+    def skip(self, row, reason):
+        self.result.skipped.append((row, reason))
+        return None
+
+    def key(self, instance):
+        return tuple(getattr(instance, self.model._meta.get_field(f).attname) for f in self.key_fields)
+
+    def existing(self, instances):
+        """Stored rows the instances may match, narrowed on the first key field"""
+        first = self.model._meta.get_field(self.key_fields[0])
+        values = {getattr(instance, first.attname) for instance in instances}
+        return self.model.objects.filter(**{f'{first.name}__in': values})
+
+    def load(self, rows, dry_run=False):
+        """Write the rows' changes (or with dry_run, only work them out) and return a LoadResult"""
+        rows = list(rows)
+        self.result = LoadResult()
+
+        built = {}
+        for row in rows:
+            instance = self.build(row)
+            if instance is not None:
+                built[self.key(instance)] = instance  # a later duplicate row wins
+
+        # Compare raw column values (league_id, not league) so the diff never hits the db
+        attnames = [self.model._meta.get_field(f).attname for f in self.update_fields]
+        write_fields = list(self.update_fields)
+        with transaction.atomic():
+            if not built:
+                to_create, to_update = [], []
+            elif self.fingerprint_field:
+                write_fields.append(self.fingerprint_field)
+                to_create, to_update = self.diff_fingerprints(built, attnames)
+            else:
+                to_create, to_update = self.diff_rows(built, attnames)
+
+            if not dry_run:
+                self.write(to_create, to_update, write_fields)
+
+        self.result.created = len(to_create)
+        return self.result
+
+    def write(self, to_create, to_update, fields):
+        if to_create:
+            conflicts = {}
+            if self.unique_fields:
+                conflicts = {'update_conflicts': True, 'unique_fields': self.unique_fields, 'update_fields': fields}
+            self.model.objects.bulk_create(to_create, batch_size=self.batch_size, **conflicts)
+        if to_update:
+            self.model.objects.bulk_update(to_update, fields, batch_size=self.batch_size)
+
+    def diff_rows(self, built, attnames):
+        """New instances and updated stored rows, comparing every update field"""
+        existing = {self.key(obj): obj for obj in self.existing(built.values())}
+        to_create, to_update = [], []
+        for key, instance in built.items():
+            current = existing.get(key)
+            if current is None:
+                to_create.append(instance)
+                self.result.changes.append(('created', str(instance), []))
+                continue
+            changed = [f for f in attnames if getattr(current, f) != getattr(instance, f)]
+            if changed:
+                for f in attnames:
+                    setattr(current, f, getattr(instance, f))
+                to_update.append(current)
+                self.result.changes.append(('updated', str(instance), changed))
+            else:
+                self.result.unchanged += 1
+        self.result.updated = len(to_update)
+        return to_create, to_update
+
+    def diff_fingerprints(self, built, attnames):
+        """New instances and instances (given the stored pk) whose fingerprint changed"""
+        key_attnames = [self.model._meta.get_field(f).attname for f in self.key_fields]
+        stored = {
+            tuple(values[:-2]): values[-2:]
+            for values in self.existing(built.values()).values_list(*key_attnames, 'pk', self.fingerprint_field)
+        }
+        to_create, changed = [], {}
+        for key, instance in built.items():
+            fingerprint = content_hash(*(getattr(instance, f) for f in attnames))
+            setattr(instance, self.fingerprint_field, fingerprint)
+            if key not in stored:
+                to_create.append(instance)
+                self.result.changes.append(('created', str(instance), []))
+            elif stored[key][1] == fingerprint:
+                self.result.unchanged += 1
+            else:
+                instance.pk = stored[key][0]
+                changed[instance.pk] = instance
+
+        # Only changed rows are read in full, to log which fields changed
+        for pk, current in self.model.objects.in_bulk(list(changed)).items():
+            instance = changed[pk]
+            fields = [f for f in attnames if getattr(current, f) != getattr(instance, f)]
+            if fields:
+                self.result.updated += 1
+                self.result.changes.append(('updated', str(instance), fields))
+            else:
+                self.result.unchanged += 1  # only the stored fingerprint was stale
+        return to_create, list(changed.values())
+
+
+class LeagueLoader(BulkLoader):
+    model = League
+    key_fields = ('name',)
+    update_fields = ('region', 'logo_path')
+    unique_fields = ('name',)
+
+    def build(self, row):
+        return League(name=row['name'], region=row['region'], logo_path=row.get('logo_path'))
+
+
+class ClubLoader(BulkLoader):
+    model = Club
+    key_fields = ('name',)
+    update_fields = ('league', 'founded_year', 'logo_url')
+    unique_fields = ('name',)
+
+    def __init__(self, leagues):
+        self.leagues = leagues
+
+    def build(self, row):
+        league = self.leagues.get(row.get('league_name'))
+        if league is None:
+            return self.skip(row, f"club '{row['name']}' (league '{row.get('league_name')}' not found)")
+        return Club(name=row['name'], league=league, founded_year=row.get('year'), logo_url=row.get('logo'))
+
+
+class ClubDetailsLoader(BulkLoader):
+    model = ClubDetails
+    key_fields = ('club',)
+    update_fields = ClubDetails.CONTENT_FIELDS
+    unique_fields = ('club',)
+    fingerprint_field = 'content_hash'
+
+    def __init__(self, league_name):
+        self.league_name = league_name
+
+    def club_queryset(self):
+        return Club.objects.filter(league__name=self.league_name)
+
+    def build(self, row):
+        club_name = row.get('club_name')
+        if not club_name:
+            return self.skip(row, "item with no 'club_name'")
+        club = self.club(club_name)
+        if club is None:
+            return self.skip(row, f"club '{club_name}' (not found in database)")
+        return ClubDetails(club=club, **{f: row.get(f) for f in self.update_fields})
+
+
+class BulkLoadCommand(BaseCommand):
+    """Base of the load_* commands: run loaders and report their counts"""
+
+    def report(self, label, result, changes=False):
+        """Print the counts, the skipped rows and with `changes` the change log"""
+        for row, reason in result.skipped:
+            self.stdout.write(self.style.WARNING(f'  Skipped {reason}.'))
+        for action, row, fields in result.changes if changes else ():
+            self.stdout.write(f"  {action.capitalize()} {row}{': ' + ', '.join(fields) if fields else ''}")
+        self.stdout.write(self.style.SUCCESS(
+            f'{label}: {result.created} created, {result.updated} updated, '
+            f'{result.unchanged} unchanged, {len(result.skipped)} skipped'
+        ))
+
+
+class LeaguesAndClubsCommand(BulkLoadCommand):
+    """Load `leagues_data` ({name: {region, logo_path}}) and `clubs_data`, matched by name"""
+
+    leagues_data = {}
+    clubs_data = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Delete all clubs and leagues (and everything that refers to them) before loading',
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            self.stdout.write(self.style.WARNING('Deleting existing club and league data...'))
+            Club.objects.all().delete()
+            League.objects.all().delete()
+
+        self.stdout.write(self.style.NOTICE('Loading leagues and clubs...'))
+        leagues = [{'name': name, **data} for name, data in self.leagues_data.items()]
+        league_result = LeagueLoader().load(leagues)
+        self.report('Leagues', league_result)
+        league_objects = {league.name: league for league in League.objects.filter(name__in=self.leagues_data)}
+        club_result = ClubLoader(league_objects).load(self.clubs_data)
+        self.report('Clubs', club_result)
+        # Bulk writes don't send post_save; only a real change invalidates the cached directory
+        if league_result.changes or club_result.changes:
+            bump_directory_version()
+
+
+class ClubDetailsCommand(BulkLoadCommand):
+    """
+    Sync `details` (rows keyed by 'club_name') into the clubs of `league_name`:
+    unchanged clubs are skipped on their stored fingerprint, and only the
+    changed ones are written and listed
+    """
+
+    league_name = None
+    details = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the changes a sync would make without writing them',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE(f'Starting to load {self.league_name} details...'))
+        result = ClubDetailsLoader(self.league_name).load(self.details, dry_run=options['dry_run'])
+        label = f'{self.league_name} details'
+        self.report(f'{label} (dry run)' if options['dry_run'] else label, result, changes=True)
+        if result.changes and not options['dry_run']:
+            bump_directory_version()
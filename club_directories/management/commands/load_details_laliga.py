@@ -1,6 +1,4 @@
-import json
-from django.core.management.base import BaseCommand
-from club_directories.models import Club, ClubDetails
+from club_directories.loaders import ClubDetailsCommand
 
 # --- Data for all La Liga clubs ---
 LA_LIGA_DETAILS = [
@@ -167,53 +165,7 @@ LA_LIGA_DETAILS = [
 ]
 
 
-class Command(BaseCommand):
+class Command(ClubDetailsCommand):
     help = 'Loads club details for La Liga from an embedded list'
-
-    def handle(self, *args, **kwargs):
-        
-        created_count = 0
-        updated_count = 0
-        skipped_count = 0
-
-        self.stdout.write(self.style.NOTICE('Starting to load La Liga details...'))
-
-        for item in LA_LIGA_DETAILS:
-            club_name = item.get('club_name')
-            if not club_name:
-                self.stdout.write(self.style.WARNING("Skipped item with no 'club_name'."))
-                skipped_count += 1
-                continue
-
-            try:
-                # Find the club in the main Club model
-                club = Club.objects.get(name=club_name, league__name="La Liga")
-                
-                # Create or update the ClubDetails entry
-                details, created = ClubDetails.objects.update_or_create(
-                    club=club,
-                    defaults={
-                        'description': item.get('description'),
-                        'history_summary': item.get('history_summary'),
-                        'stadium_name': item.get('stadium_name'),
-                        'stadium_capacity': item.get('stadium_capacity'),
-                        'manager_name': item.get('manager_name'),
-                    }
-                )
-                
-                if created:
-                    created_count += 1
-                else:
-                    updated_count += 1
-
-            except Club.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f"Warning: Club '{club_name}' not found in database. Skipping."))
-                skipped_count += 1
-            except Exception as e:
-                self.stderr.write(self.style.ERROR(f"Error processing {club_name}: {e}"))
-                skipped_count += 1
-        
-        self.stdout.write(self.style.SUCCESS(f"\n--- La Liga Details Summary ---"))
-        self.stdout.write(self.style.SUCCESS(f"Successfully created: {created_count}"))
-        self.stdout.write(self.style.SUCCESS(f"Successfully updated: {updated_count}"))
-        self.stdout.write(self.style.WARNING(f"Skipped: {skipped_count}"))
\ No newline at end of file
+    league_name = 'La Liga'
+    details = LA_LIGA_DETAILS
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from club_directories.popularity import rebuild_pick_counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute every ClubPickCount row from the league picks table'
+
+    def handle(self, *args, **options):
+        counted, changed = rebuild_pick_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt pick counts for {counted} clubs ({changed} changed).'
+        ))
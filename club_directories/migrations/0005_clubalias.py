@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('club_directories', '0004_leaguepick_delete_favoriteclub'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClubAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=200, unique=True)),
+                ('club', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='club_directories.club')),
+            ],
+            options={
+                'verbose_name_plural': 'club aliases',
+                'ordering': ['alias'],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:07
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+# Frozen copies of club_directories.models.content_hash and
+# ClubDetails.CONTENT_FIELDS as they were when this migration was written
+CONTENT_FIELDS = ('description', 'history_summary', 'stadium_name', 'stadium_capacity', 'manager_name')
+
+
+def content_hash(*values):
+    return hashlib.sha256(json.dumps(values, default=str).encode()).hexdigest()
+
+
+def backfill_content_hashes(apps, schema_editor):
+    ClubDetails = apps.get_model('club_directories', 'ClubDetails')
+    details = list(ClubDetails.objects.only(*CONTENT_FIELDS))
+    for row in details:
+        row.content_hash = content_hash(*(getattr(row, f) for f in CONTENT_FIELDS))
+    ClubDetails.objects.bulk_update(details, ['content_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('club_directories', '0005_clubalias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clubdetails',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_content_hashes, migrations.RunPython.noop),
+    ]
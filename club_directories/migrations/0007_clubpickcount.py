@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_pick_counts(apps, schema_editor):
+    LeaguePick = apps.get_model('club_directories', 'LeaguePick')
+    ClubPickCount = apps.get_model('club_directories', 'ClubPickCount')
+    counts = LeaguePick.objects.values('club_id', 'club__league_id').annotate(picks=Count('id')).order_by()
+    ClubPickCount.objects.bulk_create(
+        [ClubPickCount(club_id=row['club_id'], league_id=row['club__league_id'], picks=row['picks']) for row in counts],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('club_directories', '0006_clubdetails_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClubPickCount',
+            fields=[
+                ('club', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pick_count', serialize=False, to='club_directories.club')),
+                ('picks', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='club_pick_counts', to='club_directories.league')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['league', '-picks'], name='clubpickcount_league_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_pick_counts, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,16 @@
 from django.db import models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
 from main.models import CustomUser
+import hashlib
+import json
 import uuid
+from .club_names import normalize_club_name
+
+def content_hash(*values):
+    """Fingerprint of a row's content, to spot changes without comparing every column"""
+    return hashlib.sha256(json.dumps(values, default=str).encode()).hexdigest()
 
 class League(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -37,10 +47,38 @@ class ClubDetails(models.Model):
     stadium_name = models.CharField(max_length=255, blank=True, null=True)
     stadium_capacity = models.IntegerField(blank=True, null=True)
     manager_name = models.CharField(max_length=255, blank=True, null=True)
+    content_hash = models.CharField(max_length=64, blank=True, default="", editable=False)
+
+    CONTENT_FIELDS = ('description', 'history_summary', 'stadium_name', 'stadium_capacity', 'manager_name')
+
+    def compute_content_hash(self):
+        return content_hash(*(getattr(self, f) for f in self.CONTENT_FIELDS))
+
+    def save(self, *args, **kwargs):
+        self.content_hash = self.compute_content_hash()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'content_hash'}
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"Details for {self.club.name}"
 
+class ClubAlias(models.Model):
+    """Another spelling of a club's name used by a data source (stored normalized)"""
+    alias = models.CharField(max_length=200, unique=True)
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name="aliases")
+
+    def save(self, *args, **kwargs):
+        self.alias = normalize_club_name(self.alias)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.alias} -> {self.club.name}"
+
+    class Meta:
+        ordering = ['alias']
+        verbose_name_plural = "club aliases"
+
 class LeaguePick(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="league_picks")
@@ -51,4 +89,46 @@ class LeaguePick(models.Model):
         unique_together = ('user', 'league')
 
     def __str__(self):
-        return f"{self.user.username}'s pick for {self.league.name}: {self.club.name}"
\ No newline at end of file
+        return f"{self.user.username}'s pick for {self.league.name}: {self.club.name}"
+
+class ClubPickCount(models.Model):
+    """
+    How many users picked a club in its league. Kept up to date by
+    club_directories.picks.apply_picks (run `manage.py rebuild_pick_counts`
+    after picks change some other way, e.g. in the admin or by deleted users).
+    """
+    club = models.OneToOneField(Club, on_delete=models.CASCADE, primary_key=True, related_name="pick_count")
+    league = models.ForeignKey(League, on_delete=models.CASCADE, related_name="club_pick_counts")
+    picks = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['league', '-picks'], name='clubpickcount_league_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.club.name}: {self.picks} picks"
+
+    @classmethod
+    def apply(cls, deltas):
+        """
+        Add {(league_id, club_id): delta} to the counts: rows are created on a
+        club's first pick, then every count moves in one CASE UPDATE.
+        Call inside the transaction that changes the LeaguePick rows.
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        cls.objects.bulk_create(
+            [cls(league_id=league_id, club_id=club_id) for league_id, club_id in deltas],
+            ignore_conflicts=True,
+        )
+        cls.objects.filter(club_id__in=[club_id for _, club_id in deltas]).update(
+            picks=Greatest(
+                F('picks') + Case(*[When(club_id=club_id, then=Value(delta)) for (_, club_id), delta in deltas.items()]),
+                Value(0),
+            ),
+            updated_at=timezone.now(),
+        )
+
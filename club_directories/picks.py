@@ -0,0 +1,126 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import Signal
+
+from main.models import CustomUser
+
+from .models import Club, ClubPickCount, League, LeaguePick
+from .popularity import bump_popularity_version, pick_deltas
+
+# Most leagues one batch may touch
+MAX_BATCH = 50
+
+# Sent with user_id and picks ({league id: Club or None}) after apply_picks,
+# whose upsert sends no post_save
+picks_changed = Signal()
+
+
+class PickError(Exception):
+    """A pick change that can't be applied, with the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def picks_cache_key(user_id):
+    return f'club_directories:picks:{user_id}'
+
+
+def invalidate_picks(user_id):
+    cache.delete(picks_cache_key(user_id))
+
+
+def league_picks(user):
+    """The user's overlay on the directory: league id -> picked club (cached per user)"""
+    if not user.is_authenticated:
+        return {}
+    key = picks_cache_key(user.pk)
+    picks = cache.get(key)
+    if picks is None:
+        picks = {
+            str(pick.league_id): {
+                'clubId': str(pick.club_id),
+                'clubName': pick.club.name,
+                'logoUrl': pick.club.logo_url
+            } for pick in LeaguePick.objects.filter(user=user).select_related('club')
+        }
+        cache.set(key, picks, 60 * 60 * 24)
+    return picks
+
+
+def _uuid(value, message):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        raise PickError(message, status=404)
+
+
+def apply_picks(user, changes):
+    """
+    Set or clear several league picks at once. `changes` are dicts with a
+    'league_id' and a 'club_id' (None or 'NONE' clears the league's pick;
+    the league may be left out when setting). Everything is validated
+    first, then written in one transaction (holding a lock on the user row,
+    so one user's batches apply one at a time): one delete for the clears
+    and one upsert for the sets, with the ClubPickCount rollup moved to match.
+    Returns {league id: Club or None}.
+    """
+    if not changes:
+        raise PickError('No picks given.')
+    if len(changes) > MAX_BATCH:
+        raise PickError(f'At most {MAX_BATCH} picks can be changed at once.')
+
+    sets, clears = {}, set()
+    for change in changes:
+        if not isinstance(change, dict):
+            raise PickError('Each pick needs a club_id and/or league_id.')
+        club_id, league_id = change.get('club_id'), change.get('league_id')
+        if club_id in (None, '', 'NONE'):
+            if not league_id:
+                raise PickError('League ID is required to clear a pick.')
+            clears.add(_uuid(league_id, 'League not found.'))
+        else:
+            sets[_uuid(club_id, 'Club not found.')] = league_id and _uuid(league_id, 'League not found.')
+
+    clubs = Club.objects.in_bulk(list(sets))
+    if len(clubs) < len(sets):
+        raise PickError('Club not found.', status=404)
+    for club_id, league_id in sets.items():
+        if league_id and clubs[club_id].league_id != league_id:
+            raise PickError(f'{clubs[club_id].name} does not play in that league.')
+    if clears and League.objects.filter(pk__in=clears).count() < len(clears):
+        raise PickError('League not found.', status=404)
+
+    picked = {club.league_id: club for club in clubs.values()}
+    cleared = clears - set(picked)
+    with transaction.atomic():
+        # Lock the user row, not their picks: two concurrent first picks have
+        # no pick row to lock yet, and would both count as new
+        list(CustomUser.objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True))
+        old = {
+            league_id: (league_id, club_id) for league_id, club_id in
+            LeaguePick.objects.filter(user=user, league_id__in=cleared | set(picked))
+            .values_list('league_id', 'club_id')
+        }
+        new = {league_id: (league_id, club.pk) for league_id, club in picked.items()}
+        deltas = pick_deltas(old, new)
+        if cleared:
+            LeaguePick.objects.filter(user=user, league_id__in=cleared).delete()
+        if picked:
+            LeaguePick.objects.bulk_create(
+                [LeaguePick(user=user, league_id=league_id, club=club) for league_id, club in picked.items()],
+                update_conflicts=True,
+                unique_fields=['user', 'league'],
+                update_fields=['club'],
+            )
+        ClubPickCount.apply(deltas)
+    if deltas:
+        bump_popularity_version()
+    changed = {**{league_id: None for league_id in cleared}, **picked}
+    invalidate_picks(user.pk)
+    picks_changed.send(sender=LeaguePick, user_id=user.pk, picks=changed)
+    return changed
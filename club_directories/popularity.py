@@ -0,0 +1,113 @@
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import ClubPickCount, LeaguePick
+
+VERSION_KEY = 'club_directories:popularity-version'
+
+
+def popularity_version():
+    """Token that changes whenever the pick counts change"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def bump_popularity_version():
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def pick_deltas(old, new):
+    """
+    {(league_id, club_id): change in picks} for one user's picks moving from
+    `old` to `new` (both {league id: (club league id, club id) or None})
+    """
+    deltas = {}
+    for league_id in old.keys() | new.keys():
+        before, after = old.get(league_id), new.get(league_id)
+        if before == after:
+            continue
+        if before:
+            deltas[before] = deltas.get(before, 0) - 1
+        if after:
+            deltas[after] = deltas.get(after, 0) + 1
+    return deltas
+
+
+def rebuild_pick_counts():
+    """
+    Recount every ClubPickCount from LeaguePick with one GROUP BY.
+    Returns (clubs counted, clubs whose count changed).
+    """
+    counts = LeaguePick.objects.values('club_id', 'club__league_id').annotate(picks=Count('id')).order_by()
+    with transaction.atomic():
+        previous = dict(ClubPickCount.objects.select_for_update().values_list('club_id', 'picks'))
+        rows = [ClubPickCount(club_id=row['club_id'], league_id=row['club__league_id'], picks=row['picks']) for row in counts]
+        changed = sum(1 for row in rows if previous.pop(row.club_id, 0) != row.picks)
+        changed += sum(1 for picks in previous.values() if picks)  # clubs nobody picks any more
+
+        ClubPickCount.objects.all().delete()
+        ClubPickCount.objects.bulk_create(rows, batch_size=500)
+    bump_popularity_version()
+    return len(rows), changed
+
+
+def build_popularity():
+    """Per league (by name): its clubs by picks, with their share of the league's picks"""
+    leagues = {}
+    counts = (
+        ClubPickCount.objects.filter(picks__gt=0)
+        .select_related('club', 'league')
+        .order_by('league__name', '-picks', 'club__name')
+    )
+    for count in counts:
+        league = leagues.setdefault(count.league_id, {
+            'league_id': str(count.league_id),
+            'league': count.league.name,
+            'total_picks': 0,
+            'clubs': [],
+        })
+        league['total_picks'] += count.picks
+        league['clubs'].append({
+            'club_id': str(count.club_id),
+            'name': count.club.name,
+            'logo_url': count.club.logo_url,
+            'picks': count.picks,
+        })
+    for league in leagues.values():
+        for club in league['clubs']:
+            club['share'] = round(100 * club['picks'] / league['total_picks'], 1)
+    return list(leagues.values())
+
+
+class Popularity:
+    """The popularity payload serialized once, with its digest (the ETag)"""
+
+    def __init__(self, leagues):
+        self.leagues = {league['league_id']: league for league in leagues}
+        self.json = json.dumps(leagues, separators=(',', ':'))
+        self.digest = hashlib.sha256(self.json.encode()).hexdigest()
+
+    def league(self, league_id):
+        """(json, digest) of one league's entry (empty for a league nobody picked in)"""
+        league = self.leagues.get(league_id, {'league_id': league_id, 'total_picks': 0, 'clubs': []})
+        league_json = json.dumps(league, separators=(',', ':'))
+        return league_json, hashlib.sha256(league_json.encode()).hexdigest()
+
+
+def get_popularity():
+    """Popularity from the cache, rebuilt from the rollup (one query) after picks change"""
+    key = f'club_directories:popularity:{popularity_version()}'
+    popularity = cache.get(key)
+    if popularity is None:
+        popularity = Popularity(build_popularity())
+        cache.set(key, popularity, 60 * 60 * 24)
+    return popularity
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .directory import bump_directory_version
+from .models import Club, ClubDetails, League, LeaguePick
+from .picks import invalidate_picks
+
+
+@receiver([post_save, post_delete], sender=League)
+@receiver([post_save, post_delete], sender=Club)
+@receiver([post_save, post_delete], sender=ClubDetails)
+def invalidate_directory(sender, **kwargs):
+    """Admin edits make the cached club directory stale"""
+    bump_directory_version()
+
+
+@receiver([post_save, post_delete], sender=LeaguePick)
+def invalidate_user_picks(sender, instance, **kwargs):
+    invalidate_picks(instance.user_id)
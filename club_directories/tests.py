@@ -4,7 +4,7 @@ from django.test import TestCase, Client
 from django.urls import reverse, resolve
 from django.db.utils import IntegrityError
 from main.models import CustomUser
-from .models import League, Club, ClubDetails, LeaguePick
+from .models import League, Club, ClubDetails, ClubPickCount, LeaguePick
 from .views import show_club_directory, get_club_details, set_league_pick
 
 class ClubDirectoriesTests(TestCase):
@@ -267,4 +267,320 @@ class ClubDirectoriesTests(TestCase):
         self.client.login(username='testuser', password='password123')
         invalid_uuid = uuid.uuid4()
         response = self.client.post(self.set_pick_url, {'club_id': 'NONE', 'league_id': invalid_uuid})
-        self.assertEqual(response.status_code, 404)
\ No newline at end of file
+        self.assertEqual(response.status_code, 404)
+
+
+class BulkLoaderTests(TestCase):
+    """The load_* commands write in bulk and are idempotent"""
+
+    def load(self, *commands):
+        from io import StringIO
+        from django.core.management import call_command
+        out = StringIO()
+        for command in commands:
+            call_command(command, stdout=out)
+        return out.getvalue()
+
+    def test_clubs_and_details_load_in_a_handful_of_queries(self):
+        with self.assertNumQueries(9):  # 2 x (savepoint, select, insert, release) + league lookup
+            self.load('load_clubs')
+        self.assertEqual(League.objects.count(), 6)
+        pk_before = Club.objects.get(name="Arsenal").pk
+
+        with self.assertNumQueries(6 * 6):  # per league: clubs, aliases, savepoint, fingerprints, insert, release
+            out = self.load(
+                'load_details_pl', 'load_details_laliga', 'load_details_bundesliga',
+                'load_details_seriea', 'load_details_ligue1', 'load_details_primeira',
+            )
+        self.assertIn("Premier League details: 20 created, 0 updated, 0 unchanged", out)
+        self.assertEqual(ClubDetails.objects.get(club__name="Arsenal").manager_name, "Mikel Arteta")
+
+        # Reloading changes nothing and keeps existing rows (and whatever refers to them)
+        out = self.load('load_clubs', 'load_details_pl')
+        self.assertIn("0 created, 0 updated", out)
+        self.assertIn("Premier League details: 0 created, 0 updated, 20 unchanged", out)
+        self.assertEqual(Club.objects.get(name="Arsenal").pk, pk_before)
+
+    def test_changed_rows_are_updated_and_unknown_clubs_skipped(self):
+        from .loaders import ClubDetailsLoader
+        league = League.objects.create(name="Premier League", region="UK")
+        arsenal = Club.objects.create(name="Arsenal", league=league)
+        ClubDetails.objects.create(club=arsenal, manager_name="Someone Else")
+        loader = ClubDetailsLoader("Premier League")
+        # clubs, aliases, stored fingerprints, changed rows, bulk update (+ savepoint/release)
+        with self.assertNumQueries(7):
+            result = loader.load([
+                {'club_name': "Arsenal", 'manager_name': "Mikel Arteta"},
+                {'club_name': "Nowhere FC", 'manager_name': "Nobody"},
+            ])
+        self.assertEqual((result.created, result.updated, len(result.skipped)), (0, 1, 1))
+        self.assertEqual(result.changes, [('updated', "Details for Arsenal", ['manager_name'])])
+        details = ClubDetails.objects.get(club=arsenal)
+        self.assertEqual(details.manager_name, "Mikel Arteta")
+        self.assertEqual(details.content_hash, details.compute_content_hash())
+
+    def edit_manager(self, club_name, manager_name):
+        details = ClubDetails.objects.get(club__name=club_name)
+        details.manager_name = manager_name
+        details.save()  # e.g. in the admin; refreshes the fingerprint
+
+    def test_details_sync_only_writes_changed_clubs(self):
+        self.load('load_clubs', 'load_details_pl')
+        self.edit_manager("Arsenal", "Someone Else")
+        ClubDetails.objects.filter(club__name="Chelsea").update(content_hash="")  # stale fingerprint
+
+        out = self.load('load_details_pl')
+        self.assertIn("Updated Details for Arsenal: manager_name", out)
+        self.assertNotIn("Chelsea", out)
+        self.assertIn("Premier League details: 0 created, 1 updated, 19 unchanged", out)
+
+        from .directory import directory_version
+        version = directory_version()
+        with self.assertNumQueries(5):  # clubs, aliases, stored fingerprints (+ savepoint/release)
+            out = self.load('load_details_pl')
+        self.assertIn("0 created, 0 updated, 20 unchanged", out)
+        self.assertEqual(directory_version(), version)  # the cached directory stays valid
+
+    def test_details_dry_run_writes_nothing(self):
+        from io import StringIO
+        from django.core.management import call_command
+        self.load('load_clubs', 'load_details_pl')
+        self.edit_manager("Arsenal", "Someone Else")
+        out = StringIO()
+        call_command('load_details_pl', '--dry-run', stdout=out)
+        self.assertIn("Updated Details for Arsenal: manager_name", out.getvalue())
+        self.assertIn("Premier League details (dry run): 0 created, 1 updated", out.getvalue())
+        self.assertEqual(ClubDetails.objects.get(club__name="Arsenal").manager_name, "Someone Else")
+
+
+class ClubNameIndexTests(TestCase):
+    """Importers resolve club names in memory, from names and stored aliases"""
+
+    def setUp(self):
+        league = League.objects.create(name="Bundesliga", region="Germany")
+        self.bayern = Club.objects.create(name="FC Bayern München", league=league)
+        self.heidenheim = Club.objects.create(name="1. FC Heidenheim 1846", league=league)
+        self.gladbach = Club.objects.create(name="Borussia Mönchengladbach", league=league)
+        self.dortmund = Club.objects.create(name="Borussia Dortmund", league=league)
+        self.koln = Club.objects.create(name="1. FC Köln", league=league)
+
+    def build(self):
+        from .club_names import ClubNameIndex
+        with self.assertNumQueries(2):  # clubs, aliases
+            return ClubNameIndex.build()
+
+    def test_slugs_accents_and_club_type_words_are_ignored(self):
+        index = self.build()
+        with self.assertNumQueries(0):
+            self.assertEqual(index.resolve("fc-bayern-munchen"), self.bayern)
+            self.assertEqual(index.resolve("Bayern Munchen"), self.bayern)
+            self.assertEqual(index.resolve("BORUSSIA MÖNCHENGLADBACH"), self.gladbach)
+            self.assertEqual(index.resolve("koln"), self.koln)
+
+    def test_fuzzy_match_must_be_unique(self):
+        index = self.build()
+        self.assertEqual(index.resolve("heidenheim"), self.heidenheim)
+        self.assertEqual(index.resolve("dortmund"), self.dortmund)
+        self.assertIsNone(index.resolve("borussia"))  # Dortmund or Mönchengladbach
+        self.assertIsNone(index.resolve("Bayer Leverkusen"))
+        self.assertIsNone(index.resolve(""))
+
+    def test_stored_aliases_are_normalized_and_win(self):
+        from .models import ClubAlias
+        alias = ClubAlias.objects.create(alias="BVB 09", club=self.dortmund)
+        self.assertEqual(alias.alias, "bvb 09")
+        self.assertEqual(self.build().resolve("bvb-09"), self.dortmund)
+
+
+
+class DirectoryCacheTests(TestCase):
+    """The directory tree is cached per data version and served with ETags"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='fan', password='password123', email='fan@example.com', full_name='Fan'
+        )
+        self.league = League.objects.create(name="Premier League", region="UK")
+        self.arsenal = Club.objects.create(league=self.league, name="Arsenal", founded_year=1886)
+        self.chelsea = Club.objects.create(league=self.league, name="Chelsea", founded_year=1905)
+        ClubDetails.objects.create(club=self.arsenal, description="x" * 150)
+        self.url = reverse('club_directories:show_json_directory')
+
+    def test_tree_is_built_once_and_revalidated_with_etag(self):
+        with self.assertNumQueries(2):  # leagues, clubs with their descriptions
+            response = self.client.get(self.url)
+        data = response.json()
+        league = data['leagues'][0]
+        self.assertEqual((league['short_id'], league['coords']), ("PREM", [52.3555, -1.1743]))
+        self.assertEqual([c['desc'] for c in league['clubs']], ["x" * 100 + "...", "No description available."])
+        self.assertEqual(data['picks'], {})
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_edits_and_picks_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.arsenal.details.description = "Gunners"
+        self.arsenal.details.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['leagues'][0]['clubs'][0]['desc'], "Gunners...")
+
+        self.client.login(username='fan', password='password123')
+        etag = self.client.get(self.url)['ETag']
+        LeaguePick.objects.create(user=self.user, league=self.league, club=self.chelsea)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['picks'][str(self.league.id)]['clubName'], "Chelsea")
+
+    def test_directory_page_has_no_per_club_queries(self):
+        self.client.get(reverse('club_directories:show_club_directory'))
+        for i in range(5):
+            Club.objects.create(league=self.league, name=f"Club {i}")
+        self.client.get(reverse('club_directories:show_club_directory'))  # rebuilds the tree
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('club_directories:show_club_directory'))
+        self.assertEqual(len(response.context['leagues_data'][0]['clubs']), 7)
+
+
+class LeaguePickBatchTests(TestCase):
+    """Several picks change in one request; the picks-only GET is cached per user"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='fan', password='password123', email='fan@example.com', full_name='Fan'
+        )
+        self.pl = League.objects.create(name="Premier League", region="UK")
+        self.liga = League.objects.create(name="La Liga", region="Spain")
+        self.arsenal = Club.objects.create(league=self.pl, name="Arsenal")
+        self.chelsea = Club.objects.create(league=self.pl, name="Chelsea")
+        self.madrid = Club.objects.create(league=self.liga, name="Real Madrid")
+        self.client.login(username='fan', password='password123')
+
+    def post(self, picks):
+        return self.client.post(
+            reverse('club_directories:set_league_picks'), json.dumps({'picks': picks}), content_type='application/json'
+        )
+
+    def test_batch_sets_and_clears_picks(self):
+        LeaguePick.objects.create(user=self.user, league=self.liga, club=self.madrid)
+        response = self.post([
+            {'league_id': str(self.pl.id), 'club_id': str(self.chelsea.id)},
+            {'league_id': str(self.liga.id), 'club_id': None},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()['picks']), [str(self.pl.id)])
+        self.assertEqual(response.json()['picks'][str(self.pl.id)]['clubName'], "Chelsea")
+
+        response = self.post([{'club_id': str(self.arsenal.id)}])  # league taken from the club
+        self.assertEqual(LeaguePick.objects.get(user=self.user).club, self.arsenal)
+
+    def test_invalid_batch_changes_nothing(self):
+        response = self.post([
+            {'league_id': str(self.pl.id), 'club_id': str(self.arsenal.id)},
+            {'league_id': str(self.pl.id), 'club_id': str(self.madrid.id)},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(LeaguePick.objects.exists())
+        self.assertEqual(self.post([{'club_id': str(uuid.uuid4())}]).status_code, 404)
+        self.assertEqual(self.post([]).status_code, 400)
+
+    def test_picks_endpoint_is_cached_and_revalidated(self):
+        url = reverse('club_directories:show_json_picks')
+        self.post([{'league_id': str(self.pl.id), 'club_id': str(self.arsenal.id)}])
+        response = self.client.get(url)
+        self.assertEqual(response.json()['picks'][str(self.pl.id)]['clubId'], str(self.arsenal.id))
+
+        with self.assertNumQueries(2):  # session, user
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        LeaguePick.objects.filter(user=self.user).get().delete()
+        self.assertEqual(self.client.get(url).json(), {'picks': {}})
+
+
+class PickPopularityTests(TestCase):
+    """ClubPickCount follows pick changes and feeds the cached popularity endpoint"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.fans = [
+            CustomUser.objects.create_user(
+                username=f'fan{i}', password='password123', email=f'fan{i}@example.com', full_name=f'Fan {i}'
+            ) for i in range(3)
+        ]
+        self.pl = League.objects.create(name="Premier League", region="UK")
+        self.liga = League.objects.create(name="La Liga", region="Spain")
+        self.arsenal = Club.objects.create(league=self.pl, name="Arsenal")
+        self.chelsea = Club.objects.create(league=self.pl, name="Chelsea")
+        self.madrid = Club.objects.create(league=self.liga, name="Real Madrid")
+        self.url = reverse('club_directories:show_json_popularity')
+
+    def pick(self, fan, club=None, league=None):
+        self.client.login(username=fan.username, password='password123')
+        return self.client.post(reverse('club_directories:set_league_pick'), {
+            'club_id': str(club.id) if club else 'NONE',
+            'league_id': str((league or club.league).id),
+        })
+
+    def counts(self):
+        return dict(ClubPickCount.objects.values_list('club__name', 'picks'))
+
+    def test_counts_follow_set_change_and_clear(self):
+        self.pick(self.fans[0], self.arsenal)
+        self.pick(self.fans[1], self.arsenal)
+        self.pick(self.fans[2], self.chelsea)
+        self.pick(self.fans[2], self.madrid)
+        self.assertEqual(self.counts(), {"Arsenal": 2, "Chelsea": 1, "Real Madrid": 1})
+
+        self.pick(self.fans[1], self.chelsea)  # change
+        self.pick(self.fans[0], league=self.pl)  # clear
+        self.pick(self.fans[2], self.chelsea)  # unchanged
+        self.assertEqual(self.counts(), {"Arsenal": 0, "Chelsea": 2, "Real Madrid": 1})
+
+    def test_popularity_is_served_from_the_rollup_with_etags(self):
+        for fan, club in zip(self.fans, (self.arsenal, self.arsenal, self.chelsea)):
+            self.pick(fan, club)
+        self.client.logout()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        league = response.json()['leagues'][0]
+        self.assertEqual((league['league'], league['total_picks']), ("Premier League", 3))
+        self.assertEqual(
+            [(c['name'], c['picks'], c['share']) for c in league['clubs']],
+            [("Arsenal", 2, 66.7), ("Chelsea", 1, 33.3)],
+        )
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(self.url, {'league': str(self.liga.id)})
+        self.assertEqual(response.json(), {'league_id': str(self.liga.id), 'total_picks': 0, 'clubs': []})
+        self.assertEqual(self.client.get(self.url, {'league': 'nope'}).status_code, 400)
+
+        etag = self.client.get(self.url, {'league': str(self.pl.id)})['ETag']
+        self.pick(self.fans[2], self.arsenal)
+        response = self.client.get(self.url, {'league': str(self.pl.id)}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['clubs'][0]['picks'], 3)
+
+    def test_rebuild_command_repairs_drift(self):
+        from io import StringIO
+        from django.core.management import call_command
+        self.pick(self.fans[0], self.arsenal)
+        LeaguePick.objects.create(user=self.fans[1], league=self.liga, club=self.madrid)  # bypasses the rollup
+        ClubPickCount.objects.filter(club=self.arsenal).update(picks=5)
+
+        out = StringIO()
+        call_command('rebuild_pick_counts', stdout=out)
+        self.assertIn('Rebuilt pick counts for 2 clubs (2 changed).', out.getvalue())
+        self.assertEqual(self.counts(), {"Arsenal": 1, "Real Madrid": 1})
+
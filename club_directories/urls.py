@@ -1,5 +1,8 @@
 from django.urls import path
-from .views import show_club_directory, get_club_details, set_league_pick ,show_json_directory
+from .views import (
+    show_club_directory, get_club_details, set_league_pick, set_league_picks, show_json_directory, show_json_picks,
+    show_json_popularity,
+)
 
 app_name = 'club_directories'
 
@@ -7,5 +10,8 @@ urlpatterns = [
     path('', show_club_directory, name='show_club_directory'),
     path('club/<uuid:club_id>/', get_club_details, name='get_club_details'),
     path('set-league-pick/', set_league_pick, name='set_league_pick'),
+    path('set-league-picks/', set_league_picks, name='set_league_picks'),
     path('json/', show_json_directory, name='show_json_directory'),
+    path('json/picks/', show_json_picks, name='show_json_picks'),
+    path('json/popularity/', show_json_popularity, name='show_json_popularity'),
 ]
\ No newline at end of file
@@ -0,0 +1,324 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/123.0 Safari/537.36"
+)
+
+CHUNK_SIZE = 64 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+_caches = {}
+
+
+class ImageTooLarge(Exception):
+    """Upstream image is bigger than IMAGE_PROXY_MAX_IMAGE_BYTES"""
+
+
+def get_session():
+    """Shared requests.Session so upstream connections are pooled and reused"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=10,
+                    pool_maxsize=20,
+                    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['User-Agent'] = USER_AGENT
+                _session = session
+    return _session
+
+
+class CacheEntry:
+    """Metadata for one cached URL; the body lives in a content-addressed blob"""
+
+    def __init__(self, url, digest, content_type, size, fetched_at, etag=None, last_modified=None):
+        self.url = url
+        self.digest = digest
+        self.content_type = content_type
+        self.size = size
+        self.fetched_at = fetched_at
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    def is_fresh(self, ttl):
+        return time.time() - self.fetched_at < ttl
+
+
+class ImageCache:
+    """
+    On-disk image store.
+
+    Bodies are stored once per content hash under blobs/, and each URL has a
+    small JSON record under meta/ pointing at its blob, so the same crest
+    served from several URLs is only kept once. Blob mtimes are bumped on
+    every hit and the least recently used blobs, with the records pointing
+    at them, are evicted once blobs and records together grow past max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+
+    # paths
+    def _blob_path(self, digest):
+        return os.path.join(self.directory, 'blobs', digest[:2], digest)
+
+    def _meta_path(self, url):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.directory, 'meta', key[:2], key + '.json')
+
+    def blob_path(self, entry):
+        return self._blob_path(entry.digest)
+
+    # reads
+    def get(self, url):
+        """Return the CacheEntry for url, or None if it is missing or its blob was evicted"""
+        try:
+            with open(self._meta_path(url)) as f:
+                entry = CacheEntry(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+        blob = self._blob_path(entry.digest)
+        try:
+            os.utime(blob)  # mark as recently used
+        except OSError:
+            return None
+        return entry
+
+    def open(self, entry):
+        """Open an entry's blob for reading, or None if it was evicted since the lookup"""
+        try:
+            return open(self._blob_path(entry.digest), 'rb')
+        except FileNotFoundError:
+            return None
+
+    # writes
+    def _write_meta(self, entry):
+        """Write entry's record; returns how many bytes the store grew by"""
+        path = self._meta_path(entry.url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry.to_dict(), f)
+            size = f.tell()
+        os.replace(tmp, path)
+        return size - previous
+
+    def touch(self, entry, etag=None, last_modified=None):
+        """Record a successful revalidation (upstream answered 304)"""
+        entry.fetched_at = time.time()
+        entry.etag = etag or entry.etag
+        entry.last_modified = last_modified or entry.last_modified
+        self._grow(self._write_meta(entry))
+        return entry
+
+    def store(self, url, chunks, content_type, max_size, etag=None, last_modified=None):
+        """
+        Write an upstream body to the store chunk by chunk (never fully in memory).
+        Raises ImageTooLarge as soon as more than max_size bytes arrive.
+        """
+        tmp_dir = os.path.join(self.directory, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=tmp_dir)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_size:
+                        raise ImageTooLarge(f'Image is larger than {max_size} bytes')
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            blob = self._blob_path(digest.hexdigest())
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            already_stored = os.path.exists(blob)
+            os.replace(tmp, blob)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        entry = CacheEntry(
+            url=url,
+            digest=digest.hexdigest(),
+            content_type=content_type,
+            size=size,
+            fetched_at=time.time(),
+            etag=etag,
+            last_modified=last_modified,
+        )
+        growth = self._write_meta(entry)
+        self._grow(growth if already_stored else growth + size)
+        return entry
+
+    # eviction
+    def _files(self, kind):
+        """Every file under blobs/ or meta/"""
+        root = os.path.join(self.directory, kind)
+        if not os.path.isdir(root):
+            return
+        for prefix in os.scandir(root):
+            if prefix.is_dir():
+                yield from os.scandir(prefix.path)
+
+    def _grow(self, size):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(f.stat().st_size for kind in ('blobs', 'meta') for f in self._files(kind))
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _records(self):
+        """{blob digest: [(path, size), ...]} of the meta records (unreadable ones under None)"""
+        records = {}
+        for meta in self._files('meta'):
+            if not meta.name.endswith('.json'):  # a record still being written
+                continue
+            try:
+                size = meta.stat().st_size
+                with open(meta.path) as f:
+                    digest = json.load(f)['digest']
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, KeyError, TypeError):
+                digest = None
+            records.setdefault(digest, []).append((meta.path, size))
+        return records
+
+    @staticmethod
+    def _remove(paths):
+        """Delete the given (path, size) files; returns the bytes freed"""
+        freed = 0
+        for path, size in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            freed += size
+        return freed
+
+    def _evict(self):
+        """
+        Delete least recently used blobs, and the records pointing at them,
+        until the store is back under 90% of max_bytes. Records whose blob is
+        already gone are deleted in the same pass.
+        """
+        records = self._records()
+        blobs = sorted(self._files('blobs'), key=lambda blob: blob.stat().st_mtime)
+        total = sum(blob.stat().st_size for blob in blobs)
+        total += sum(size for paths in records.values() for _, size in paths)
+
+        stored = {blob.name for blob in blobs}
+        for digest in [digest for digest in records if digest not in stored]:
+            total -= self._remove(records.pop(digest))
+
+        target = self.max_bytes * 0.9
+        for blob in blobs:
+            if total <= target:
+                break
+            try:
+                size = blob.stat().st_size
+                os.remove(blob.path)
+            except OSError:
+                continue
+            total -= size + self._remove(records.pop(blob.name, []))
+        self._size = total
+
+
+def get_image_cache():
+    directory = settings.IMAGE_PROXY_CACHE_DIR
+    max_bytes = settings.IMAGE_PROXY_CACHE_MAX_BYTES
+    key = (str(directory), max_bytes)
+    if key not in _caches:
+        _caches[key] = ImageCache(directory, max_bytes)
+    return _caches[key]
+
+
+def fetch_image(url):
+    """
+    Return a fresh CacheEntry for url, going upstream only when needed:
+    - fresh entry: served from disk without any upstream request
+    - stale entry: conditional GET (If-None-Match / If-Modified-Since), 304 keeps the blob
+    - miss: streamed download into the store, capped at IMAGE_PROXY_MAX_IMAGE_BYTES
+    A stale entry is still returned if the upstream request fails.
+    """
+    cache = get_image_cache()
+    ttl = settings.IMAGE_PROXY_TTL
+    max_size = settings.IMAGE_PROXY_MAX_IMAGE_BYTES
+
+    entry = cache.get(url)
+    if entry and entry.is_fresh(ttl):
+        return entry
+
+    headers = {}
+    if entry and entry.etag:
+        headers['If-None-Match'] = entry.etag
+    if entry and entry.last_modified:
+        headers['If-Modified-Since'] = entry.last_modified
+
+    try:
+        response = get_session().get(url, headers=headers, timeout=10, stream=True)
+    except requests.RequestException:
+        if entry:
+            return entry
+        raise
+
+    with response:
+        if entry and response.status_code == 304:
+            return cache.touch(
+                entry,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+            )
+
+        try:
+            response.raise_for_status()
+        except requests.RequestException:
+            if entry:
+                return entry
+            raise
+
+        declared = response.headers.get('Content-Length')
+        if declared and declared.isdigit() and int(declared) > max_size:
+            raise ImageTooLarge(f'Image is larger than {max_size} bytes')
+
+        return cache.store(
+            url,
+            response.iter_content(CHUNK_SIZE),
+            content_type=response.headers.get('Content-Type', 'image/png'),
+            max_size=max_size,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+        )
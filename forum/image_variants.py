@@ -0,0 +1,132 @@
+import io
+from urllib.parse import urlencode
+
+from django.urls import reverse
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .image_cache import get_image_cache
+
+# Requested widths are rounded up to one of these buckets so every image has
+# at most a handful of variants on disk
+VARIANT_WIDTHS = (64, 128, 256, 512, 1024)
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'png': ('PNG', 'image/png'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'jpg': ('JPEG', 'image/jpeg'),
+}
+
+VARIANT_QUALITY = 80
+
+# Refuse to decode anything bigger than this (roughly 8000 x 5000)
+VARIANT_MAX_PIXELS = 40_000_000
+
+
+def bucket_width(width):
+    """Round a requested width up to the nearest bucket (capped at the largest)"""
+    for bucket in VARIANT_WIDTHS:
+        if width <= bucket:
+            return bucket
+    return VARIANT_WIDTHS[-1]
+
+
+def parse_variant(params):
+    """
+    Read the w / fmt query parameters.
+    Returns (width, fmt), either of which may be None, or raises ValueError.
+    """
+    width = params.get('w')
+    fmt = params.get('fmt')
+
+    if width is not None:
+        width = int(width)
+        if width <= 0:
+            raise ValueError('w must be a positive integer')
+        width = bucket_width(width)
+
+    if fmt is not None:
+        fmt = fmt.lower()
+        if fmt not in VARIANT_FORMATS:
+            raise ValueError(f"fmt must be one of: {', '.join(VARIANT_FORMATS)}")
+        if fmt == 'jpg':
+            fmt = 'jpeg'
+
+    return width, fmt
+
+
+def render_variant(data, width=None, fmt=None):
+    """
+    Resize (never upscale) and re-encode image bytes with Pillow.
+    Returns (bytes, content_type), or None if Pillow can't decode, resize or
+    encode the source (SVG crests or truncated files, for example) so the
+    caller can fall back to the original.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.width * image.height > VARIANT_MAX_PIXELS:
+            return None
+        image.seek(0)  # first frame of animated images
+        image = ImageOps.exif_transpose(image)
+
+        if fmt is None:
+            fmt = (image.format or 'png').lower() if image.format in ('PNG', 'JPEG', 'WEBP') else 'png'
+        pil_format, content_type = VARIANT_FORMATS[fmt]
+
+        if width and image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+
+        if pil_format == 'JPEG':
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            elif image.mode != 'RGB':
+                image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+            image = image.convert('RGBA')
+
+        out = io.BytesIO()
+        if pil_format == 'PNG':
+            image.save(out, pil_format, optimize=True)
+        else:
+            image.save(out, pil_format, quality=VARIANT_QUALITY)
+    except (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError):
+        return None
+    return out.getvalue(), content_type
+
+
+def get_variant(entry, width=None, fmt=None):
+    """
+    Return the CacheEntry for a resized / re-encoded copy of a cached image,
+    rendering and storing it on first use. Variants are keyed by the source
+    digest, so a changed upstream image gets fresh variants automatically.
+    """
+    if width is None and fmt is None:
+        return entry
+
+    cache = get_image_cache()
+    key = f'variant:{entry.digest}:{width or "orig"}:{fmt or "orig"}'
+    variant = cache.get(key)
+    if variant:
+        return variant
+
+    with open(cache.blob_path(entry), 'rb') as f:
+        rendered = render_variant(f.read(), width, fmt)
+    if rendered is None:
+        return entry
+
+    data, content_type = rendered
+    if fmt is None and len(data) >= entry.size:
+        return entry  # re-encoding only made it bigger
+    return cache.store(key, [data], content_type, max_size=len(data))
+
+
+def thumbnail_url(url, width, fmt='webp'):
+    """URL of a proxied, resized copy of an image"""
+    if not url:
+        return url
+    query = urlencode({'url': url, 'w': width, 'fmt': fmt})
+    return f"{reverse('forum:proxy_image')}?{query}"
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from forum.models import Comment, Post
+from forum.search import backend, update_comment_index, update_post_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the forum full-text search index from existing posts and comments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of posts or comments to reindex per batch',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write(self.style.NOTICE(f'Rebuilding search index ({backend()} backend)...'))
+
+        post_ids = list(Post.objects.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(post_ids), batch_size):
+            update_post_index(post_ids[start:start + batch_size])
+
+        comment_ids = list(Comment.objects.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(comment_ids), batch_size):
+            update_comment_index(comment_ids[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(f'Reindexed {len(post_ids)} posts and {len(comment_ids)} comments.'))
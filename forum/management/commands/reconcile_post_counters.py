@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from forum.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = 'Recompute Post.comment_count and last_activity_at from the comments table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drifted posts, do not write anything',
+        )
+
+    def handle(self, *args, **options):
+        comments = Comment.objects.filter(post=OuterRef('pk')).order_by().values('post')
+        actual_count = Subquery(comments.annotate(total=Count('id')).values('total'))
+        latest_comment = Subquery(comments.annotate(latest=Max('created_at')).values('latest'))
+
+        drifted = list(
+            Post.objects.annotate(
+                actual_count=Coalesce(actual_count, 0),
+                actual_activity=Greatest('created_at', Coalesce(latest_comment, 'created_at')),
+            ).exclude(
+                comment_count=F('actual_count'),
+                last_activity_at=F('actual_activity'),
+            ).only('id', 'title', 'comment_count', 'last_activity_at', 'created_at')
+        )
+
+        for post in drifted:
+            self.stdout.write(f"  Post #{post.id} '{post.title}': {post.comment_count} -> {post.actual_count} comments")
+            post.comment_count = post.actual_count
+            post.last_activity_at = post.actual_activity
+
+        if drifted and not options['dry_run']:
+            with transaction.atomic():
+                Post.objects.bulk_update(drifted, ['comment_count', 'last_activity_at'], batch_size=500)
+
+        action = 'Found' if options['dry_run'] else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(f'{action} {len(drifted)} posts with drifted counters.'))
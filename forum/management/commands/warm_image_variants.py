@@ -0,0 +1,50 @@
+import requests
+from django.core.management.base import BaseCommand
+from club_directories.models import Club
+from forum.image_cache import ImageTooLarge, fetch_image
+from forum.image_variants import VARIANT_WIDTHS, get_variant, parse_variant
+from forum.models import PostImage
+
+
+class Command(BaseCommand):
+    help = 'Fetch club logos and post images into the image proxy cache and precompute their thumbnails'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--widths',
+            default='64,128,256,512',
+            help=f'Comma separated widths to render (rounded up to {VARIANT_WIDTHS})',
+        )
+        parser.add_argument('--fmt', default='webp', help='Output format of the variants')
+
+    def handle(self, *args, **options):
+        try:
+            variants = [
+                parse_variant({'w': width, 'fmt': options['fmt']})
+                for width in options['widths'].split(',') if width.strip()
+            ]
+        except ValueError as e:
+            self.stderr.write(self.style.ERROR(f'Invalid variant: {e}'))
+            return
+
+        urls = set(Club.objects.exclude(logo_url__isnull=True).exclude(logo_url='').values_list('logo_url', flat=True))
+        urls.update(PostImage.objects.values_list('image_url', flat=True))
+
+        warmed = failed = 0
+        for url in sorted(urls):
+            if url.startswith('data:'):
+                continue
+            try:
+                entry = fetch_image(url)
+                for width, fmt in variants:
+                    get_variant(entry, width, fmt)
+            except (ImageTooLarge, requests.RequestException, OSError) as e:
+                # One unreachable or evicted image shouldn't stop the run
+                failed += 1
+                self.stdout.write(self.style.WARNING(f'Skipping {url}: {e}'))
+                continue
+            warmed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed {warmed} images ({len(variants)} variants each), {failed} failed.'
+        ))
@@ -0,0 +1,67 @@
+import django.contrib.postgres.search
+import forum.models
+from django.db import migrations
+
+FTS_TOKENIZER = 'tokenize="unicode61 remove_diacritics 2"'
+
+
+def backfill_search_index(apps, schema_editor):
+    """Fill the search vectors on PostgreSQL, or the FTS5 tables on SQLite, from existing rows"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "UPDATE forum_post SET search_vector = "
+            "setweight(to_tsvector(coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector(coalesce(content, '')), 'B')"
+        )
+        schema_editor.execute(
+            "UPDATE forum_comment SET search_vector = setweight(to_tsvector(coalesce(content, '')), 'C')"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS forum_post_fts USING fts5(title, content, {FTS_TOKENIZER})'
+        )
+        schema_editor.execute(
+            'INSERT INTO forum_post_fts (rowid, title, content) SELECT id, title, content FROM forum_post'
+        )
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS forum_comment_fts USING fts5(post_id UNINDEXED, content, {FTS_TOKENIZER})'
+        )
+        schema_editor.execute(
+            'INSERT INTO forum_comment_fts (rowid, post_id, content) SELECT id, post_id, content FROM forum_comment'
+        )
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS forum_comment_fts')
+        schema_editor.execute('DROP TABLE IF EXISTS forum_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0002_alter_post_post_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=forum.models.SearchVectorIndex(fields=['search_vector'], name='forum_post_search_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=forum.models.SearchVectorIndex(fields=['search_vector'], name='forum_comment_search_gin'),
+        ),
+        migrations.RunPython(backfill_search_index, drop_search_tables),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:33
+
+import django.utils.timezone
+import forum.models
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model('forum', 'Post')
+    Comment = apps.get_model('forum', 'Comment')
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by().values('post')
+    Post.objects.update(
+        comment_count=Coalesce(Subquery(comments.annotate(n=Count('id')).values('n')), 0),
+        last_activity_at=Greatest(
+            'created_at',
+            Coalesce(Subquery(comments.annotate(latest=Max('created_at')).values('latest')), 'created_at'),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0003_post_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_activity_at',
+            field=forum.models.LastActivityField(default=django.utils.timezone.now, editable=False),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['post_type', '-last_activity_at'], name='forum_post_post_ty_ec0b37_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,29 @@
 from django.db import models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from main.models import CustomUser
 from club_directories.models import Club
 
+class LastActivityField(models.DateTimeField):
+    """DateTimeField that starts out equal to the row's created_at on insert"""
+
+    def pre_save(self, model_instance, add):
+        if add and getattr(model_instance, self.attname) is None:
+            setattr(model_instance, self.attname, model_instance.created_at)
+        return super().pre_save(model_instance, add)
+
+
+class SearchVectorIndex(GinIndex):
+    """GIN index on PostgreSQL; a plain index elsewhere (SQLite searches its FTS5 tables instead)"""
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return models.Index.create_sql(self, model, schema_editor, using=using, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+
 class Post(models.Model):
     POST_TYPE_CHOICES = [
         ('discussion', 'Discussion'),
@@ -28,11 +50,21 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalized counters, kept up to date by the comment views
+    # (run `manage.py reconcile_post_counters` to fix any drift)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    last_activity_at = LastActivityField(editable=False)
+
+    # Full-text search document (PostgreSQL only, maintained by forum.signals)
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         ordering = ['-post_type', '-created_at']  # News first, then by date
         indexes = [
             models.Index(fields=['-post_type', '-created_at']),
             models.Index(fields=['post_type']),
+            models.Index(fields=['post_type', '-last_activity_at']),
+            SearchVectorIndex(fields=['search_vector'], name='forum_post_search_gin'),
         ]
 
     def __str__(self):
@@ -54,6 +86,24 @@ class Post(models.Model):
         """Check if post is official news"""
         return self.post_type == 'news'
 
+    def comment_added(self, comment):
+        """Bump comment_count and last_activity_at in a single atomic UPDATE"""
+        Post.objects.filter(pk=self.pk).update(
+            comment_count=F('comment_count') + 1,
+            last_activity_at=comment.created_at,
+        )
+
+    def comment_removed(self):
+        """
+        Decrement comment_count and fall last_activity_at back to the newest
+        remaining comment, in a single atomic UPDATE (count never below zero)
+        """
+        latest_comment = Comment.objects.filter(post=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+        Post.objects.filter(pk=self.pk, comment_count__gt=0).update(
+            comment_count=F('comment_count') - 1,
+            last_activity_at=Greatest('created_at', Coalesce(Subquery(latest_comment), 'created_at')),
+        )
+
 
 class PostImage(models.Model):
     """Model to store multiple images per post"""
@@ -80,10 +130,14 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # The comment's own search document (PostgreSQL only, maintained by forum.signals)
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         ordering = ['created_at']
         indexes = [
             models.Index(fields=['post', 'created_at']),
+            SearchVectorIndex(fields=['search_vector'], name='forum_comment_search_gin'),
         ]
 
     def __str__(self):
@@ -0,0 +1,111 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class CursorPage:
+    """A single page of results produced by KeysetPaginator"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over (<timestamp field>, id), newest first
+    (or oldest first with oldest_first=True). The field defaults to created_at.
+
+    Instead of COUNT(*) + OFFSET, each page is a range scan that starts right
+    after the last row of the previous page, so page N costs the same as page 1.
+    """
+
+    def __init__(self, queryset, per_page, field='created_at', oldest_first=False):
+        self.field = field
+        self.per_page = per_page
+        # lookups that move forward / backward along the ordering
+        if oldest_first:
+            self.queryset = queryset.order_by(field, 'id')
+            self.forward, self.backward = 'gt', 'lt'
+        else:
+            self.queryset = queryset.order_by(f'-{field}', '-id')
+            self.forward, self.backward = 'lt', 'gt'
+
+    def encode_cursor(self, obj):
+        raw = f"{getattr(obj, self.field).isoformat()}|{obj.pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Return (timestamp, pk) or None if the cursor is malformed"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode()).decode()
+            value, pk = raw.split('|', 1)
+            return datetime.fromisoformat(value), int(pk)
+        except (ValueError, TypeError, UnicodeDecodeError):
+            return None
+
+    def get_page(self, after=None, before=None):
+        """
+        Return the page after or before a cursor (older / newer rows in the
+        default newest-first ordering).
+        Invalid cursors fall back to the first page, like Paginator.get_page.
+        """
+        after_key = self.decode_cursor(after) if after else None
+        before_key = self.decode_cursor(before) if before else None
+
+        if before_key:
+            value, pk = before_key
+            rows = list(
+                self.queryset.filter(
+                    Q(**{f'{self.field}__{self.backward}': value}) |
+                    Q(**{self.field: value, f'id__{self.backward}': pk})
+                ).reverse()[:self.per_page + 1]
+            )
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return CursorPage(
+                rows,
+                next_cursor=self.encode_cursor(rows[-1]) if rows else None,
+                previous_cursor=self.encode_cursor(rows[0]) if rows and has_previous else None,
+            )
+
+        queryset = self.queryset
+        if after_key:
+            value, pk = after_key
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{self.forward}': value}) |
+                Q(**{self.field: value, f'id__{self.forward}': pk})
+            )
+
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1]) if rows and has_next else None,
+            previous_cursor=self.encode_cursor(rows[0]) if rows and after_key else None,
+        )
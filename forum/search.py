@@ -0,0 +1,146 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Exists, F, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Post
+
+# SQLite dev databases use FTS5 tables instead of the tsvector columns.
+# Comments have their own index entries (as they do on PostgreSQL), so
+# adding one never re-reads the rest of the thread.
+FTS_TABLE = 'forum_post_fts'
+COMMENT_FTS_TABLE = 'forum_comment_fts'
+
+# Relative weight of title / content / comment matches in the SQLite bm25 rank
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+
+def backend():
+    """Return which search implementation the current database supports"""
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        return 'sqlite'
+    return 'basic'
+
+
+def to_fts_query(text):
+    """Turn free text into a safe FTS5 MATCH expression (every word, prefix match)"""
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_posts(queryset, text, rank=True):
+    """
+    Filter a Post queryset down to posts whose title, content or comments
+    match the search text. With rank=True the posts are annotated with
+    search_rank (higher is better).
+    """
+    text = (text or '').strip()
+    if not text:
+        return queryset
+
+    if backend() == 'postgresql':
+        query = SearchQuery(text, search_type='websearch')
+        comment_matches = Comment.objects.filter(post=OuterRef('pk'), search_vector=query)
+        queryset = queryset.filter(Q(search_vector=query) | Exists(comment_matches))
+        if rank:
+            comment_rank = Subquery(
+                comment_matches.annotate(rank=SearchRank(F('search_vector'), query))
+                .order_by('-rank').values('rank')[:1]
+            )
+            queryset = queryset.annotate(search_rank=(
+                Coalesce(SearchRank(F('search_vector'), query), Value(0.0)) +
+                Coalesce(comment_rank, Value(0.0), output_field=FloatField())
+            ))
+        return queryset
+
+    if backend() == 'sqlite':
+        match = to_fts_query(text)
+        if not match:
+            return queryset.none()
+        queryset = queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'UNION SELECT post_id FROM {COMMENT_FTS_TABLE} WHERE {COMMENT_FTS_TABLE} MATCH %s',
+            (match, match),
+        ))
+        if rank:
+            title_weight, content_weight, comment_weight = FTS_WEIGHTS
+            post_table = Post._meta.db_table
+            queryset = queryset.annotate(search_rank=RawSQL(
+                f'coalesce((SELECT -bm25({FTS_TABLE}, {title_weight}, {content_weight}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid = {post_table}.id), 0) + '
+                f'coalesce((SELECT -bm25({COMMENT_FTS_TABLE}, 0.0, {comment_weight}) AS score FROM {COMMENT_FTS_TABLE} '
+                f'WHERE {COMMENT_FTS_TABLE} MATCH %s AND post_id = {post_table}.id ORDER BY score DESC LIMIT 1), 0)',
+                (match, match),
+                output_field=FloatField(),
+            ))
+        return queryset
+
+    queryset = queryset.filter(
+        Q(title__icontains=text) |
+        Q(content__icontains=text) |
+        Q(comments__content__icontains=text)
+    ).distinct()
+    if rank:
+        queryset = queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+    return queryset
+
+
+def update_post_index(post_ids):
+    """Recompute the search index entries (title and content) for the given posts"""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+
+    if backend() == 'postgresql':
+        Post.objects.filter(pk__in=post_ids).update(
+            search_vector=SearchVector('title', weight='A') + SearchVector('content', weight='B')
+        )
+        return
+
+    if backend() == 'sqlite':
+        rows = Post.objects.filter(pk__in=post_ids).values_list('id', 'title', 'content')
+        _replace_fts_rows(FTS_TABLE, ('title', 'content'), post_ids, rows)
+
+
+def update_comment_index(comment_ids):
+    """Recompute the search index entries of the given comments (their posts' entries are untouched)"""
+    comment_ids = list(comment_ids)
+    if not comment_ids:
+        return
+
+    if backend() == 'postgresql':
+        Comment.objects.filter(pk__in=comment_ids).update(search_vector=SearchVector('content', weight='C'))
+        return
+
+    if backend() == 'sqlite':
+        rows = Comment.objects.filter(pk__in=comment_ids).values_list('id', 'post_id', 'content')
+        _replace_fts_rows(COMMENT_FTS_TABLE, ('post_id', 'content'), comment_ids, rows)
+
+
+def _replace_fts_rows(table, columns, ids, rows):
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid IN ({placeholders})', ids)
+        cursor.executemany(
+            f'INSERT INTO {table} (rowid, {", ".join(columns)}) VALUES ({", ".join(["%s"] * (len(columns) + 1))})',
+            list(rows),
+        )
+
+
+def remove_post_index(post_id):
+    """Drop a deleted post from the SQLite FTS table (the tsvector goes with the row)"""
+    if backend() == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def remove_comment_index(comment_id):
+    """Drop a deleted comment from the SQLite FTS table"""
+    if backend() == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {COMMENT_FTS_TABLE} WHERE rowid = %s', [comment_id])
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Comment, Post
+from .search import remove_comment_index, remove_post_index, update_comment_index, update_post_index
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    """Keep the search index in sync when a post is created or edited"""
+    update_post_index([instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    remove_post_index(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    """Comments have their own index entries, so a new one costs the same in any thread"""
+    update_comment_index([instance.pk])
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    remove_comment_index(instance.pk)
@@ -0,0 +1,11 @@
+from django import template
+
+from ..image_variants import thumbnail_url
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail(url, width):
+    """{{ post.images.first.image_url|thumbnail:512 }} -> resized webp through the image proxy"""
+    return thumbnail_url(url, width)
@@ -1,15 +1,26 @@
+import io
 import json
+import os
+import shutil
+import tempfile
+import threading
 import uuid
 from datetime import timedelta
-from django.test import TestCase, Client
+from io import StringIO
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import patch
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse, resolve
 from django.utils import timezone
+from django.template import Context, Template
+from django.core.management import call_command
+from PIL import Image
 from django.db.utils import IntegrityError
-from django.core.paginator import Page
 from main.models import CustomUser # Direct import
 from club_directories.models import Club, League, LeaguePick # Import dependent models
 from .models import Post, PostImage, Comment
 from .forms import PostForm
+from .pagination import CursorPage, KeysetPaginator
 from . import views # Import views to test URL resolution
 
 # Helper function to create users easily
@@ -60,6 +71,8 @@ class ForumTests(TestCase):
         # Comments
         cls.comment1 = Comment.objects.create(post=cls.post_discuss1, author=cls.other_user, content="First comment")
         cls.comment2 = Comment.objects.create(post=cls.post_discuss1, author=cls.user, content="Reply comment", created_at=now - timedelta(hours=1))
+        cls.post_discuss1.comment_added(cls.comment1)
+        cls.post_discuss1.comment_added(cls.comment2)
 
     def setUp(self):
         """Set up things that might change between tests (like client)."""
@@ -156,7 +169,7 @@ class ForumTests(TestCase):
         self.assertTemplateUsed(response, 'forum/home.html')
         self.assertIn('news_posts', response.context)
         self.assertIn('page_obj', response.context)
-        self.assertIsInstance(response.context['page_obj'], Page)
+        self.assertIsInstance(response.context['page_obj'], CursorPage)
         self.assertIn('user_favorite_clubs', response.context)
         self.assertEqual(response.context['user_favorite_clubs'], [])
 
@@ -179,7 +192,7 @@ class ForumTests(TestCase):
         self.assertEqual(len(response.context['news_posts']), 0) 
         # Discussions filtered in page_obj
         page_obj = response.context['page_obj']
-        self.assertEqual(page_obj.paginator.count, 1)
+        self.assertEqual(len(page_obj), 1)
         self.assertEqual(page_obj.object_list[0], self.post_discuss1)
         self.assertEqual(response.context['current_filters']['clubs'], [str(self.club1.id)])
 
@@ -188,17 +201,59 @@ class ForumTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.context['news_posts']), 1) # News post is in league 2 via club3
         self.assertEqual(response.context['news_posts'][0], self.post_news1)
-        self.assertEqual(response.context['page_obj'].paginator.count, 0) # No discussions in league 2
+        self.assertEqual(len(response.context['page_obj']), 0) # No discussions in league 2
         self.assertEqual(response.context['current_filters']['league'], str(self.league2.id))
 
         # Filter by search term
         response = self.client.get(reverse('forum:forum_home'), {'search': 'Searchable'})
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.context['news_posts']), 0) 
-        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+        self.assertEqual(len(response.context['page_obj']), 1)
         self.assertEqual(response.context['page_obj'].object_list[0], self.post_discuss2)
         self.assertEqual(response.context['current_filters']['search'], 'Searchable')
 
+    def test_forum_home_cursor_pagination(self):
+        with patch.object(views, 'FEED_PAGE_SIZE', 1):
+            first = self.client.get(reverse('forum:forum_home'))
+            page_obj = first.context['page_obj']
+            self.assertEqual(list(page_obj), [self.post_discuss2])
+            self.assertTrue(page_obj.has_next)
+            self.assertFalse(page_obj.has_previous)
+
+            second = self.client.get(reverse('forum:forum_home'), {'after': page_obj.next_cursor})
+            page_obj = second.context['page_obj']
+            self.assertEqual(list(page_obj), [self.post_discuss1])
+            self.assertFalse(page_obj.has_next)
+            self.assertTrue(page_obj.has_previous)
+
+            back = self.client.get(reverse('forum:forum_home'), {'before': page_obj.previous_cursor})
+            self.assertEqual(list(back.context['page_obj']), [self.post_discuss2])
+
+    def test_keyset_paginator_invalid_cursor_falls_back_to_first_page(self):
+        page = KeysetPaginator(Post.objects.filter(post_type='discussion'), 10).get_page(after='not-a-cursor')
+        self.assertEqual(list(page), [self.post_discuss2, self.post_discuss1])
+        self.assertFalse(page.has_next)
+
+    def test_feed_json(self):
+        response = self.client.get(reverse('forum:feed_json'), {'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([p['id'] for p in data['results']], [self.post_discuss2.pk])
+        self.assertIsNotNone(data['next_cursor'])
+
+        response = self.client.get(reverse('forum:feed_json'), {'limit': 1, 'after': data['next_cursor']})
+        data = response.json()
+        self.assertEqual([p['id'] for p in data['results']], [self.post_discuss1.pk])
+        self.assertEqual(data['results'][0]['comment_count'], 2)
+        self.assertEqual(len(data['results'][0]['clubs']), 2)
+        self.assertIsNone(data['next_cursor'])
+
+    def test_feed_json_filters(self):
+        response = self.client.get(reverse('forum:feed_json'), {'post_type': 'news', 'league': self.league2.id})
+        self.assertEqual([p['id'] for p in response.json()['results']], [self.post_news1.pk])
+        response = self.client.get(reverse('forum:feed_json'), {'limit': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
     def test_post_detail_view(self):
         response = self.client.get(reverse('forum:post_detail', args=[self.post_discuss1.pk]))
         self.assertEqual(response.status_code, 200)
@@ -206,6 +261,35 @@ class ForumTests(TestCase):
         self.assertEqual(response.context['post'], self.post_discuss1)
         self.assertListEqual(list(response.context['comments']), [self.comment1, self.comment2]) # Check ordering
 
+    def test_post_detail_renders_first_page_of_comments(self):
+        with patch.object(views, 'COMMENTS_PAGE_SIZE', 1):
+            response = self.client.get(reverse('forum:post_detail', args=[self.post_discuss1.pk]))
+        self.assertEqual(list(response.context['comments']), [self.comment1])
+        self.assertContains(response, 'Comments (2)')
+        self.assertContains(response, 'id="loadMoreComments"')
+
+    def test_comments_json_load_more(self):
+        url = reverse('forum:comments_json', args=[self.post_discuss1.pk])
+        data = self.client.get(url, {'limit': 1}).json()
+        self.assertEqual(data['total'], 2)
+        self.assertEqual([c['id'] for c in data['comments']], [self.comment1.pk])
+
+        data = self.client.get(url, {'limit': 1, 'after': data['next_cursor'], 'html': '1'}).json()
+        self.assertEqual([c['id'] for c in data['comments']], [self.comment2.pk])
+        self.assertIsNone(data['next_cursor'])
+        self.assertIn(f'id="comment-{self.comment2.pk}"', data['html'])
+
+        self.assertEqual(self.client.get(url, {'limit': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('forum:comments_json', args=[9999])).status_code, 404)
+
+    def test_keyset_paginator_oldest_first(self):
+        paginator = KeysetPaginator(self.post_discuss1.comments.all(), 1, oldest_first=True)
+        first = paginator.get_page()
+        second = paginator.get_page(after=first.next_cursor)
+        self.assertEqual(list(second), [self.comment2])
+        self.assertFalse(second.has_next)
+        self.assertEqual(list(paginator.get_page(before=second.previous_cursor)), [self.comment1])
+
     def test_post_detail_404(self):
         response = self.client.get(reverse('forum:post_detail', args=[9999]))
         self.assertEqual(response.status_code, 404)
@@ -450,4 +534,387 @@ class ForumTests(TestCase):
         self.assertEqual(response_post.status_code, 200)
         self.assertTrue(response_post.json()['success'])
         self.post_discuss1.refresh_from_db()
-        self.assertEqual(self.post_discuss1.title, 'Updated Title') # Verify basic title update worked
\ No newline at end of file
+        self.assertEqual(self.post_discuss1.title, 'Updated Title') # Verify basic title update worked
+    # JSON export (show_json)
+    def _stream_content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_show_json_streams_all_posts(self):
+        response = self.client.get(reverse('forum:show_json'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        data = json.loads(self._stream_content(response))
+        self.assertEqual([p['id'] for p in data], [self.post_news1.pk, self.post_discuss2.pk, self.post_discuss1.pk])
+        discuss1 = data[2]
+        self.assertEqual([c['content'] for c in discuss1['comments']], ['First comment', 'Reply comment'])
+        self.assertEqual(len(data[0]['images']), 2)
+
+    def test_show_json_keeps_legacy_defaults_without_paging(self):
+        busy = Post.objects.create(author=self.user, title="Busy thread", content="x")
+        for i in range(25):
+            Comment.objects.create(post=busy, author=self.other_user, content=f"c{i}")
+
+        data = json.loads(self._stream_content(self.client.get(reverse('forum:show_json'))))
+        self.assertEqual(data[0]['id'], self.post_news1.pk)  # news first, as before
+        self.assertEqual(data[1]['id'], busy.pk)
+        self.assertEqual(len(data[1]['comments']), 25)
+
+        data = json.loads(self._stream_content(self.client.get(reverse('forum:show_json'), {'limit': 5})))
+        self.assertEqual(data[0]['id'], busy.pk)  # pages are newest first
+        self.assertEqual(len(data[0]['comments']), 20)
+
+    def test_show_json_query_count_is_independent_of_post_count(self):
+        for i in range(5):
+            post = Post.objects.create(author=self.user, title=f"Bulk {i}", content="x")
+            Comment.objects.create(post=post, author=self.other_user, content="c")
+        # posts + authors, clubs, images, comments (+ authors) in one round each
+        with self.assertNumQueries(4):
+            self._stream_content(self.client.get(reverse('forum:show_json')))
+
+    def test_show_json_paginated_and_capped(self):
+        response = self.client.get(reverse('forum:show_json'), {'limit': 2, 'comments_limit': 1})
+        data = json.loads(self._stream_content(response))
+        self.assertEqual(len(data), 2)
+        self.assertIn('X-Next-Cursor', response)
+
+        response = self.client.get(reverse('forum:show_json'), {'limit': 2, 'comments_limit': 1, 'after': response['X-Next-Cursor']})
+        data = json.loads(self._stream_content(response))
+        self.assertEqual([p['id'] for p in data], [self.post_discuss1.pk])
+        self.assertEqual(len(data[0]['comments']), 1)
+        self.assertEqual(data[0]['comment_count'], 2)
+        self.assertNotIn('X-Next-Cursor', response)
+
+    def test_show_json_ndjson_without_comments(self):
+        response = self.client.get(reverse('forum:show_json'), {'format': 'ndjson', 'comments': '0', 'post_type': 'discussion'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in self._stream_content(response).splitlines()]
+        self.assertEqual([p['id'] for p in lines], [self.post_discuss2.pk, self.post_discuss1.pk])
+        self.assertNotIn('comments', lines[0])
+
+    # Full-text search
+    def test_search_matches_comment_text(self):
+        response = self.client.get(reverse('forum:search_json'), {'q': 'reply'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['id'] for p in response.json()['results']], [self.post_discuss1.pk])
+
+    def test_search_ranks_title_matches_first(self):
+        in_content = Post.objects.create(author=self.user, title="Matchday thoughts", content="Derby talk all week")
+        in_title = Post.objects.create(author=self.user, title="Derby preview", content="Lineups and odds")
+        response = self.client.get(reverse('forum:search_json'), {'q': 'derby'})
+        ids = [p['id'] for p in response.json()['results']]
+        self.assertEqual(ids, [in_title.pk, in_content.pk])
+
+    def test_search_filters_and_validation(self):
+        response = self.client.get(reverse('forum:search_json'), {'q': 'content', 'post_type': 'news'})
+        self.assertEqual([p['id'] for p in response.json()['results']], [self.post_news1.pk])
+        response = self.client.get(reverse('forum:search_json'), {'q': 'content', 'clubs': self.club1.id})
+        self.assertEqual([p['id'] for p in response.json()['results']], [self.post_discuss1.pk])
+        response = self.client.get(reverse('forum:search_json'), {'q': '  '})
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_index_follows_edits_and_deletes(self):
+        self.post_discuss2.title = "Renamed transfer rumour"
+        self.post_discuss2.save()
+        response = self.client.get(reverse('forum:search_json'), {'q': 'rumour'})
+        self.assertEqual([p['id'] for p in response.json()['results']], [self.post_discuss2.pk])
+
+        self.post_discuss2.delete()
+        response = self.client.get(reverse('forum:search_json'), {'q': 'rumour'})
+        self.assertEqual(response.json()['results'], [])
+
+    def test_comment_index_cost_does_not_grow_with_the_thread(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        def add_comment(content):
+            with CaptureQueriesContext(connection) as queries:
+                comment = Comment.objects.create(post=self.post_discuss2, author=self.user, content=content)
+            return comment, len(queries)
+
+        _, first = add_comment("Opening goal")
+        for i in range(10):
+            Comment.objects.create(post=self.post_discuss2, author=self.user, content=f"Reply {i}")
+        comment, later = add_comment("Late equaliser")
+        self.assertEqual(first, later)
+
+        response = self.client.get(reverse('forum:search_json'), {'q': 'equaliser'})
+        self.assertEqual([p['id'] for p in response.json()['results']], [self.post_discuss2.pk])
+        comment.delete()
+        response = self.client.get(reverse('forum:search_json'), {'q': 'equaliser'})
+        self.assertEqual(response.json()['results'], [])
+
+    def test_search_handles_fts_syntax_characters(self):
+        response = self.client.get(reverse('forum:search_json'), {'q': '"Searchable* ('})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['id'] for p in response.json()['results']], [self.post_discuss2.pk])
+
+    def test_rebuild_search_index_command(self):
+        from django.core.management import call_command
+        from io import StringIO
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Reindexed 3 posts', out.getvalue())
+        response = self.client.get(reverse('forum:search_json'), {'q': 'official'})
+        self.assertEqual([p['id'] for p in response.json()['results']], [self.post_news1.pk])
+
+    # Denormalized comment counters
+    def test_create_comment_updates_counters(self):
+        url = reverse('forum:create_comment', args=[self.post_discuss2.pk])
+        response = self.client.post(url, json.dumps({'content': 'Counted'}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.post_discuss2.refresh_from_db()
+        self.assertEqual(self.post_discuss2.comment_count, 1)
+        self.assertEqual(self.post_discuss2.last_activity_at, Comment.objects.get(content='Counted').created_at)
+
+    def test_create_comment_flutter_updates_counters(self):
+        url = reverse('forum:create_comment_flutter', args=[self.post_discuss1.pk])
+        response = self.client.post(url, json.dumps({'content': 'From the app'}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.post_discuss1.refresh_from_db()
+        self.assertEqual(self.post_discuss1.comment_count, 3)
+
+    def test_failed_comment_does_not_change_counters(self):
+        url = reverse('forum:create_comment', args=[self.post_discuss2.pk])
+        response = self.client.post(url, json.dumps({'wrong_field': 'x'}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.post_discuss2.refresh_from_db()
+        self.assertEqual(self.post_discuss2.comment_count, 0)
+
+    def test_delete_comment_updates_counters(self):
+        response = self.client.delete(reverse('forum:delete_comment', args=[self.comment2.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.post_discuss1.refresh_from_db()
+        self.assertEqual(self.post_discuss1.comment_count, 1)
+        self.assertEqual(self.post_discuss1.last_activity_at, self.comment1.created_at)
+
+    def test_feed_sort_by_recent_activity(self):
+        url = reverse('forum:create_comment', args=[self.post_discuss1.pk])
+        self.client.post(url, json.dumps({'content': 'Bump'}), content_type='application/json')
+        response = self.client.get(reverse('forum:feed_json'), {'sort': 'active'})
+        self.assertEqual([p['id'] for p in response.json()['results']], [self.post_discuss1.pk, self.post_discuss2.pk])
+        response = self.client.get(reverse('forum:forum_home'), {'sort': 'active'})
+        self.assertEqual(list(response.context['page_obj']), [self.post_discuss1, self.post_discuss2])
+
+    def test_reconcile_post_counters_command(self):
+        from django.core.management import call_command
+        from io import StringIO
+        Post.objects.filter(pk=self.post_discuss1.pk).update(comment_count=99)
+        Comment.objects.create(post=self.post_discuss2, author=self.user, content="Not counted")
+
+        out = StringIO()
+        call_command('reconcile_post_counters', '--dry-run', stdout=out)
+        self.assertIn('Found 2 posts', out.getvalue())
+        self.post_discuss1.refresh_from_db()
+        self.assertEqual(self.post_discuss1.comment_count, 99)
+
+        call_command('reconcile_post_counters', stdout=StringIO())
+        self.post_discuss1.refresh_from_db()
+        self.post_discuss2.refresh_from_db()
+        self.assertEqual(self.post_discuss1.comment_count, 2)
+        self.assertEqual(self.post_discuss2.comment_count, 1)
+
+
+class ImageStubHandler(BaseHTTPRequestHandler):
+    """Tiny origin server for the image proxy tests"""
+    images = {}
+    hits = []
+
+    def do_GET(self):
+        self.hits.append((self.path, self.headers.get('If-None-Match')))
+        body = self.images.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = f'"{len(body)}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('ETag', etag)
+        if not self.path.startswith('/chunked'):
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ImageProxyTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(('127.0.0.1', 0), ImageStubHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.origin = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        settings_override = override_settings(IMAGE_PROXY_CACHE_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        photo = io.BytesIO()
+        Image.new('RGBA', (300, 200), (255, 0, 0, 128)).save(photo, 'PNG')
+        ImageStubHandler.images = {
+            '/crest.png': b'\x89PNG' + b'a' * 100,
+            '/chunked.png': b'b' * 2000,
+            '/photo.png': photo.getvalue(),
+            '/truncated.png': photo.getvalue()[:len(photo.getvalue()) // 2],
+        }
+        ImageStubHandler.hits = []
+
+    def proxy(self, path, data=None, **headers):
+        params = {'url': self.origin + path, **(data or {})}
+        response = self.client.get(reverse('forum:proxy_image'), params, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_proxy_caches_and_serves_from_disk(self):
+        response, body = self.proxy('/crest.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, ImageStubHandler.images['/crest.png'])
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('max-age=', response['Cache-Control'])
+
+        response, body = self.proxy('/crest.png')
+        self.assertEqual(body, ImageStubHandler.images['/crest.png'])
+        self.assertEqual(len(ImageStubHandler.hits), 1)
+
+    def test_proxy_revalidates_stale_entries_with_etag(self):
+        self.proxy('/crest.png')
+        with override_settings(IMAGE_PROXY_TTL=0):
+            response, body = self.proxy('/crest.png')
+        self.assertEqual(body, ImageStubHandler.images['/crest.png'])
+        self.assertEqual(ImageStubHandler.hits[-1], ('/crest.png', '"104"'))
+
+    def test_proxy_answers_client_conditional_requests(self):
+        response, _ = self.proxy('/crest.png')
+        response, body = self.proxy('/crest.png', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(body, b'')
+
+    def test_proxy_rejects_oversized_images(self):
+        with override_settings(IMAGE_PROXY_MAX_IMAGE_BYTES=50):
+            self.assertEqual(self.proxy('/crest.png')[0].status_code, 413)
+        with override_settings(IMAGE_PROXY_MAX_IMAGE_BYTES=1000):
+            self.assertEqual(self.proxy('/chunked.png')[0].status_code, 413)
+        self.assertEqual(os.listdir(os.path.join(self.cache_dir, 'tmp')), [])
+
+    def test_proxy_upstream_errors(self):
+        self.assertEqual(self.proxy('/missing.png')[0].status_code, 500)
+
+    def test_cache_evicts_least_recently_used(self):
+        from .image_cache import ImageCache
+        cache = ImageCache(self.cache_dir, max_bytes=10 ** 6)
+        cache.store('http://a/1', [b'1' * 100], 'image/png', max_size=1000)
+        cache.store('http://a/2', [b'2' * 100], 'image/png', max_size=1000)
+        old = os.path.getmtime(cache.blob_path(cache.get('http://a/2'))) - 10
+        os.utime(cache.blob_path(cache.get('http://a/1')), (old, old))
+
+        def files(kind):
+            return [os.path.join(root, name) for root, _, names in os.walk(os.path.join(self.cache_dir, kind)) for name in names]
+
+        # Room for two blobs and their records (give or take a few bytes of timestamp), not three
+        cache.max_bytes = int(sum(os.path.getsize(path) for path in files('blobs') + files('meta')) / 0.9) + 50
+        cache.store('http://a/3', [b'3' * 100], 'image/png', max_size=1000)
+        self.assertIsNone(cache.get('http://a/1'))
+        self.assertIsNotNone(cache.get('http://a/2'))
+        self.assertIsNotNone(cache.get('http://a/3'))
+        self.assertEqual((len(files('blobs')), len(files('meta'))), (2, 2))
+
+    def test_proxy_refetches_a_blob_evicted_before_it_is_opened(self):
+        from . import views
+        self.proxy('/crest.png')
+
+        def evicting_get_variant(entry, width, fmt):
+            if evicting_get_variant.first:
+                evicting_get_variant.first = False
+                os.remove(views.get_image_cache().blob_path(entry))
+            return entry
+        evicting_get_variant.first = True
+
+        with patch.object(views, 'get_variant', evicting_get_variant):
+            response, body = self.proxy('/crest.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, ImageStubHandler.images['/crest.png'])
+        self.assertEqual(len(ImageStubHandler.hits), 2)
+
+    def test_proxy_resizes_into_width_buckets(self):
+        response, body = self.proxy('/photo.png', data={'w': 100, 'fmt': 'webp'})
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        image = Image.open(io.BytesIO(body))
+        self.assertEqual((image.format, image.size), ('WEBP', (128, 85)))
+
+        # Never upscaled past the source size
+        response, body = self.proxy('/photo.png', data={'w': 2000, 'fmt': 'jpg'})
+        image = Image.open(io.BytesIO(body))
+        self.assertEqual((image.format, image.size, image.mode), ('JPEG', (300, 200), 'RGB'))
+
+    def test_proxy_variants_are_cached(self):
+        from . import image_variants
+        with patch.object(image_variants, 'render_variant', wraps=image_variants.render_variant) as render:
+            first = self.proxy('/photo.png', data={'w': 64, 'fmt': 'png'})[1]
+            second = self.proxy('/photo.png', data={'w': 60, 'fmt': 'png'})[1]
+        self.assertEqual(first, second)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(len(ImageStubHandler.hits), 1)
+
+    def test_proxy_variant_validation_and_fallback(self):
+        self.assertEqual(self.proxy('/photo.png', data={'w': 'big'})[0].status_code, 400)
+        self.assertEqual(self.proxy('/photo.png', data={'w': 64, 'fmt': 'bmp'})[0].status_code, 400)
+        # Pillow can't read it, so the original bytes are served
+        response, body = self.proxy('/crest.png', data={'w': 64, 'fmt': 'webp'})
+        self.assertEqual(body, ImageStubHandler.images['/crest.png'])
+        # The header reads fine but decoding fails partway through
+        response, body = self.proxy('/truncated.png', data={'w': 64, 'fmt': 'webp'})
+        self.assertEqual((response.status_code, body), (200, ImageStubHandler.images['/truncated.png']))
+        # Decodes and resizes, then the encoder fails
+        with patch.object(Image.Image, 'save', side_effect=OSError('encoder error')):
+            response, body = self.proxy('/photo.png', data={'w': 64, 'fmt': 'webp'})
+        self.assertEqual((response.status_code, body), (200, ImageStubHandler.images['/photo.png']))
+
+    def test_thumbnail_filter(self):
+        rendered = Template('{% load forum_images %}{{ url|thumbnail:64 }}').render(Context({'url': 'http://a/b.png'}))
+        self.assertEqual(rendered, reverse('forum:proxy_image') + '?url=http%3A%2F%2Fa%2Fb.png&amp;w=64&amp;fmt=webp')
+
+    def test_warm_image_variants_command(self):
+        league = League.objects.create(name="Warm League", region="Region")
+        Club.objects.create(league=league, name="Warm Club", logo_url=self.origin + '/photo.png')
+        Club.objects.create(league=league, name="Broken Club", logo_url=self.origin + '/missing.png')
+        out = StringIO()
+        call_command('warm_image_variants', '--widths', '64,128', stdout=out)
+        self.assertIn('Warmed 1 images (2 variants each), 1 failed.', out.getvalue())
+
+        ImageStubHandler.hits = []
+        response, body = self.proxy('/photo.png', data={'w': 128, 'fmt': 'webp'})
+        self.assertEqual(Image.open(io.BytesIO(body)).size, (128, 85))
+        self.assertEqual(ImageStubHandler.hits, [])
+
+    def test_warm_image_variants_skips_images_that_fail_to_render(self):
+        from forum.management.commands import warm_image_variants
+        league = League.objects.create(name="Warm League", region="Region")
+        Club.objects.create(league=league, name="Truncated Club", logo_url=self.origin + '/truncated.png')
+        Club.objects.create(league=league, name="Evicted Club", logo_url=self.origin + '/photo.png')
+
+        render = warm_image_variants.get_variant
+
+        def get_variant(entry, width, fmt):
+            if entry.url.endswith('/photo.png'):
+                raise FileNotFoundError('blob evicted')
+            return render(entry, width, fmt)
+
+        out = StringIO()
+        with patch.object(warm_image_variants, 'get_variant', get_variant):
+            call_command('warm_image_variants', '--widths', '64', stdout=out)
+        self.assertIn('Skipping', out.getvalue())
+        self.assertIn('Warmed 1 images (1 variants each), 1 failed.', out.getvalue())
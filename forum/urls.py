@@ -16,6 +16,9 @@ urlpatterns = [
     path('api/comment/<int:pk>/update/', views.update_comment, name='update_comment'),
     path('api/comment/<int:pk>/delete/', views.delete_comment, name='delete_comment'),
     path('json/', views.show_json, name='show_json'),
+    path('json/feed/', views.feed_json, name='feed_json'),
+    path('json/search/', views.search_json, name='search_json'),
+    path('json/post/<int:pk>/comments/', views.comments_json, name='comments_json'),
     path('proxy-image/', views.proxy_image, name='proxy_image'),
     path('api/post/<int:post_pk>/comment/create/flutter/', views.create_comment_flutter, name='create_comment_flutter'),
     path('api/post/create/flutter/', views.create_post_flutter, name='create_post_flutter'),
@@ -1,19 +1,88 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, Http404, HttpResponse
+from django.http import JsonResponse, Http404, HttpResponse, StreamingHttpResponse, FileResponse
 from django.views.decorators.http import require_http_methods, require_GET
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.html import strip_tags
-from django.core.paginator import Paginator
-from django.db.models import Q, Count
+from django.db.models import Prefetch
+from django.db import transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.conf import settings
 from .models import Post, PostImage, Comment
 from .forms import PostForm
+from .pagination import KeysetPaginator
+from .search import search_posts
+from .image_cache import ImageTooLarge, fetch_image, get_image_cache
+from .image_variants import get_variant, parse_variant
 from club_directories.models import Club, League, LeaguePick
 from main.models import CustomUser
 import requests, base64, json, traceback
 from urllib.parse import unquote
 
 
+FEED_PAGE_SIZE = 200
+FEED_SORT_FIELDS = {
+    'newest': 'created_at',
+    'active': 'last_activity_at',
+}
+FEED_JSON_PAGE_SIZE = 20
+FEED_JSON_MAX_PAGE_SIZE = 100
+COMMENTS_PAGE_SIZE = 50
+COMMENTS_JSON_MAX_PAGE_SIZE = 100
+
+
+def filter_posts(queryset, club_ids=None, league_id=None, search=None):
+    """
+    Apply the forum filters to a Post queryset.
+    Club and league filters use a subquery on the tag table instead of a join,
+    so no distinct() is needed and annotations are not multiplied.
+    """
+    tags = Post.clubs.through.objects
+    if club_ids:
+        queryset = queryset.filter(id__in=tags.filter(club_id__in=club_ids).values('post_id'))
+
+    if league_id:
+        queryset = queryset.filter(id__in=tags.filter(club__league_id=league_id).values('post_id'))
+
+    if search:
+        queryset = search_posts(queryset, search, rank=False)
+    return queryset
+
+
+def post_to_dict(post, include_comments=False):
+    """Helper to convert a Post (with clubs and images prefetched) to a dictionary"""
+    data = {
+        "id": post.id,
+        "title": post.title,
+        "content": post.content,
+        "post_type": post.post_type,
+        "author": post.author.username,
+        "created_at": post.created_at.isoformat(),
+        "updated_at": post.updated_at.isoformat(),
+        "comment_count": post.comment_count,
+        "last_activity_at": post.last_activity_at.isoformat(),
+        "clubs": [
+            {"id": str(club.id), "name": club.name, "logo_url": club.logo_url}
+            for club in post.clubs.all()
+        ][:3],
+        "images": [
+            {"url": img.image_url, "caption": img.caption, "order": img.order}
+            for img in post.images.all()
+        ],
+    }
+    if include_comments:
+        data["comments"] = [
+            {
+                "author": c.author.username,
+                "content": c.content,
+                "created_at": c.created_at.isoformat()
+            }
+            for c in post.embedded_comments
+        ]
+    return data
+
+
 def forum_home(request):
     """
     Forum homepage with filtering capabilities
@@ -22,9 +91,7 @@ def forum_home(request):
     - Shows news carousel at top, discussions below
     """
     # Base queryset
-    all_posts = Post.objects.select_related('author').prefetch_related('clubs', 'images').annotate(
-        comment_count=Count('comments')
-    ).order_by('-created_at')
+    all_posts = Post.objects.select_related('author').prefetch_related('clubs', 'images').order_by('-created_at')
     
     # Get filter parameters
     club_ids = request.GET.getlist('clubs')  # Multiple clubs
@@ -35,19 +102,7 @@ def forum_home(request):
     search = request.GET.get('search')
     
     # Apply filters to all posts
-    filtered_posts = all_posts
-    
-    if club_ids:
-        filtered_posts = filtered_posts.filter(clubs__id__in=club_ids).distinct()
-    
-    if league_id:
-        filtered_posts = filtered_posts.filter( Q(clubs__league_id=league_id)).distinct()
-    
-    if search:
-        filtered_posts = filtered_posts.filter(
-            Q(title__icontains=search) | 
-            Q(content__icontains=search)
-        )
+    filtered_posts = filter_posts(all_posts, club_ids, league_id, search)
     
     # Get favorite club
     user_favorite_clubs = []
@@ -58,10 +113,10 @@ def forum_home(request):
     news_posts = filtered_posts.filter(post_type='news').order_by('-created_at')
     discussion_posts = filtered_posts.filter(post_type='discussion')
     
-    # Pagination for discussions only
-    paginator = Paginator(discussion_posts, 200)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Cursor pagination for discussions only (no COUNT, no OFFSET)
+    sort = request.GET.get('sort') if request.GET.get('sort') in FEED_SORT_FIELDS else 'newest'
+    paginator = KeysetPaginator(discussion_posts, FEED_PAGE_SIZE, field=FEED_SORT_FIELDS[sort])
+    page_obj = paginator.get_page(after=request.GET.get('after'), before=request.GET.get('before'))
     
     # Get all clubs and leagues for filter dropdowns
     clubs = Club.objects.select_related('league').all().order_by('name')
@@ -78,24 +133,64 @@ def forum_home(request):
             'clubs': club_ids,
             'league': league_id,
             'search': search,
+            'sort': sort,
         }
     }
     
     return render(request, 'forum/home.html', context)
 
 
+@require_GET
+def feed_json(request):
+    """
+    JSON version of the discussion feed with cursor pagination
+    - Same filters as forum_home (clubs, league, search) plus post_type
+    - ?sort=active orders by latest comment activity instead of creation date
+    - Pass back next_cursor as ?after=... to get the next page
+    """
+    club_ids = [cid for cid in request.GET.getlist('clubs') if cid.strip()]
+    league_id = request.GET.get('league') or None
+    search = request.GET.get('search')
+    post_type = request.GET.get('post_type', 'discussion')
+    sort = request.GET.get('sort') if request.GET.get('sort') in FEED_SORT_FIELDS else 'newest'
+
+    try:
+        limit = int(request.GET.get('limit', FEED_JSON_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid limit'}, status=400)
+    limit = max(1, min(limit, FEED_JSON_MAX_PAGE_SIZE))
+
+    posts = Post.objects.select_related('author').prefetch_related('clubs', 'images')
+    if post_type:
+        posts = posts.filter(post_type=post_type)
+    posts = filter_posts(posts, club_ids, league_id, search)
+
+    page = KeysetPaginator(posts, limit, field=FEED_SORT_FIELDS[sort]).get_page(
+        after=request.GET.get('after'), before=request.GET.get('before')
+    )
+
+    return JsonResponse({
+        'results': [post_to_dict(post) for post in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+
 def post_detail(request, pk):
     """
     Post detail page with comments
     - Viewable by everyone
     - Only logged-in users can see comment form
+    - Only the first page of comments is rendered, the rest comes from comments_json
     """
     post = get_object_or_404(
-        Post.objects.select_related('author').prefetch_related('clubs', 'images', 'comments__author'),
+        Post.objects.select_related('author').prefetch_related('clubs', 'images'),
         pk=pk
     )
-    comments = post.comments.all()
-    
+    comments = KeysetPaginator(
+        post.comments.select_related('author'), COMMENTS_PAGE_SIZE, oldest_first=True
+    ).get_page(after=request.GET.get('after'))
+
     context = {
         'post': post,
         'comments': comments,
@@ -104,6 +199,46 @@ def post_detail(request, pk):
     return render(request, 'forum/post_detail.html', context)
 
 
+@require_GET
+def comments_json(request, pk):
+    """
+    "Load more" endpoint for a post's comments, oldest first
+    - Pass back next_cursor as ?after=... to get the next page
+    - ?html=1 also returns the rendered comment cards for the detail page
+    """
+    post = get_object_or_404(Post, pk=pk)
+
+    try:
+        limit = int(request.GET.get('limit', COMMENTS_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid limit'}, status=400)
+    limit = max(1, min(limit, COMMENTS_JSON_MAX_PAGE_SIZE))
+
+    page = KeysetPaginator(
+        post.comments.select_related('author'), limit, oldest_first=True
+    ).get_page(after=request.GET.get('after'))
+
+    data = {
+        'success': True,
+        'total': post.comment_count,
+        'comments': [
+            {
+                'id': c.id,
+                'author': c.author.username,
+                'content': c.content,
+                'created_at': c.created_at.isoformat(),
+            }
+            for c in page
+        ],
+        'next_cursor': page.next_cursor,
+    }
+    if request.GET.get('html') == '1':
+        data['html'] = render_to_string(
+            'forum/comment_list.html', {'post': post, 'comments': page}, request=request
+        )
+    return JsonResponse(data)
+
+
 @login_required
 @require_GET
 def get_post_data(request, pk):
@@ -151,51 +286,136 @@ def get_post_data(request, pk):
         print("Error in get_post_data:", traceback.format_exc()) # Keep for debugging
         return JsonResponse({'success': False, 'error': 'An internal server error occurred.'}, status=500)
 
-def show_json(request):
-    posts = Post.objects.all()
+SEARCH_JSON_PAGE_SIZE = 20
+SEARCH_JSON_MAX_PAGE_SIZE = 50
 
-    data = []
-    
+
+@require_GET
+def search_json(request):
+    """
+    Ranked full-text search over post titles, content and comments
+    - q is required; clubs, league and post_type narrow the results
+    - Best matches first, ties broken by newest post
+    """
+    text = request.GET.get('q', '').strip()
+    if not text:
+        return JsonResponse({'success': False, 'error': 'Search query is required'}, status=400)
+
+    try:
+        limit = int(request.GET.get('limit', SEARCH_JSON_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid limit'}, status=400)
+    limit = max(1, min(limit, SEARCH_JSON_MAX_PAGE_SIZE))
+
+    club_ids = [cid for cid in request.GET.getlist('clubs') if cid.strip()]
+    league_id = request.GET.get('league') or None
+    post_type = request.GET.get('post_type')
+
+    posts = Post.objects.select_related('author').prefetch_related('clubs', 'images')
+    if post_type:
+        posts = posts.filter(post_type=post_type)
+    posts = filter_posts(posts, club_ids, league_id)
+    posts = search_posts(posts, text).order_by('-search_rank', '-created_at', '-id')[:limit]
+
+    results = []
     for post in posts:
-        data.append({
-            "id": post.id,
-            "title": post.title,
-            "content": post.content,
-            "post_type": post.post_type,
-            "author": post.author.username,    
-            "created_at": post.created_at.isoformat(),
-            "updated_at": post.updated_at.isoformat(),
-            
-            "clubs": list(
-                post.clubs.values(
-                    "id",
-                    "name",
-                    "logo_url",
-                )
-            )[:3],
-
-            # Nested related images
-            "images": [
-                {
-                    "url": img.image_url,
-                    "caption": img.caption,
-                    "order": img.order,
-                }
-                for img in post.images.all()
-            ],
-
-            # Nested comments
-            "comments": [
-                {
-                    "author": c.author.username,
-                    "content": c.content,
-                    "created_at": c.created_at.isoformat()
-                }
-                for c in post.comments.all()
-            ]
-        })
+        data = post_to_dict(post)
+        data['rank'] = post.search_rank
+        results.append(data)
+
+    return JsonResponse({'query': text, 'results': results})
 
-    return JsonResponse(data, safe=False)
+
+POSTS_JSON_BATCH_SIZE = 100
+POSTS_JSON_MAX_PAGE_SIZE = 100
+COMMENTS_EMBED_LIMIT = 20
+
+
+def iter_post_batches(queryset, batch_size=POSTS_JSON_BATCH_SIZE, after=None):
+    """Walk a Post queryset newest-first in keyset batches, yielding one post at a time"""
+    cursor = after
+    while True:
+        page = KeysetPaginator(queryset, batch_size).get_page(after=cursor)
+        yield from page
+        if not page.has_next:
+            break
+        cursor = page.next_cursor
+
+
+def stream_json_array(items):
+    yield '['
+    for index, item in enumerate(items):
+        yield (',' if index else '') + json.dumps(item, cls=DjangoJSONEncoder)
+    yield ']'
+
+
+def stream_ndjson(items):
+    for item in items:
+        yield json.dumps(item, cls=DjangoJSONEncoder) + '\n'
+
+
+@require_GET
+def show_json(request):
+    """
+    Streaming JSON export of forum posts (used by the Flutter client)
+    - Filters: clubs, league, search, post_type
+    - ?limit=N returns one page, newest first, the next cursor is in the
+      X-Next-Cursor header (pass it back as ?after=)
+    - ?comments=0 leaves comments out, ?comments_limit=N caps them per post
+      (pages cap them at COMMENTS_EMBED_LIMIT by default)
+    - ?format=ndjson streams one post per line instead of a JSON array
+    Without limit/after/format/comments_limit every post is streamed in the
+    legacy order (news first, then newest) with all of its comments.
+    """
+    club_ids = [cid for cid in request.GET.getlist('clubs') if cid.strip()]
+    league_id = request.GET.get('league') or None
+    search = request.GET.get('search')
+    post_type = request.GET.get('post_type')
+    include_comments = request.GET.get('comments', '1') != '0'
+    paged = bool(request.GET.get('limit') or request.GET.get('after'))
+    legacy = not paged and not any(request.GET.get(param) for param in ('format', 'comments_limit'))
+
+    try:
+        limit = request.GET.get('limit')
+        limit = max(1, min(int(limit), POSTS_JSON_MAX_PAGE_SIZE)) if limit else None
+        comments_limit = request.GET.get('comments_limit')
+        if comments_limit:
+            comments_limit = max(1, min(int(comments_limit), COMMENTS_EMBED_LIMIT))
+        elif paged:
+            comments_limit = COMMENTS_EMBED_LIMIT
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid limit'}, status=400)
+
+    posts = Post.objects.select_related('author').prefetch_related('clubs', 'images')
+    if include_comments:
+        comments = Comment.objects.select_related('author').order_by('created_at', 'id')
+        posts = posts.prefetch_related(Prefetch(
+            'comments',
+            queryset=comments[:comments_limit] if comments_limit else comments,
+            to_attr='embedded_comments',
+        ))
+    if post_type:
+        posts = posts.filter(post_type=post_type)
+    posts = filter_posts(posts, club_ids, league_id, search)
+
+    next_cursor = None
+    if legacy:
+        rows = posts.order_by(*Post._meta.ordering, '-id').iterator(chunk_size=POSTS_JSON_BATCH_SIZE)
+    elif limit:
+        page = KeysetPaginator(posts, limit).get_page(after=request.GET.get('after'))
+        rows, next_cursor = page.object_list, page.next_cursor
+    else:
+        rows = iter_post_batches(posts, after=request.GET.get('after'))
+
+    items = (post_to_dict(post, include_comments=include_comments) for post in rows)
+    if request.GET.get('format') == 'ndjson':
+        response = StreamingHttpResponse(stream_ndjson(items), content_type='application/x-ndjson')
+    else:
+        response = StreamingHttpResponse(stream_json_array(items), content_type='application/json')
+
+    if next_cursor:
+        response['X-Next-Cursor'] = next_cursor
+    return response
 
 def proxy_image(request):
     image_url = request.GET.get('url')
@@ -232,25 +452,50 @@ def proxy_image(request):
         except Exception:
             return HttpResponse("Invalid base64 image", status=400)
 
-    # CASE 2: URL fetch
+    # CASE 2: URL fetch, served from the on-disk cache
+    # (optionally resized / re-encoded with ?w=128&fmt=webp)
     try:
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/123.0 Safari/537.36"
-            )
-        }
+        width, fmt = parse_variant(request.GET)
+    except ValueError as e:
+        return HttpResponse(f"Invalid image variant: {str(e)}", status=400)
 
-        response = requests.get(image_url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        return HttpResponse(
-            response.content,
-            content_type=response.headers.get("Content-Type", "image/png")
-        )
+    try:
+        opened = _open_cached_image(image_url, width, fmt)
+    except ImageTooLarge as e:
+        return HttpResponse(str(e), status=413)
     except requests.RequestException as e:
         return HttpResponse(f"Error fetching image!: {str(e)}", status=500)
+    if opened is None:
+        return HttpResponse("Image cache is busy, please retry", status=503)
+    entry, blob = opened
+
+    etag = f'"{entry.digest}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        blob.close()
+        response = HttpResponse(status=304)
+    else:
+        response = FileResponse(blob, content_type=entry.content_type)
+        response['Content-Length'] = entry.size
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={settings.IMAGE_PROXY_TTL}'
+    return response
+
+def _open_cached_image(image_url, width, fmt):
+    """
+    (entry, open blob) for an image variant. Another request may evict the
+    blob between the lookup and the open; the cache then misses, so the
+    image is fetched / rendered once more. None if that loses the race too.
+    """
+    cache = get_image_cache()
+    for _ in range(2):
+        try:
+            entry = get_variant(fetch_image(image_url), width, fmt)
+        except FileNotFoundError:  # the source blob went while rendering
+            continue
+        blob = cache.open(entry)
+        if blob is not None:
+            return entry, blob
+    return None
 
 @login_required
 def create_post(request):
@@ -334,11 +579,13 @@ def create_comment(request, post_pk):
     
     try:
         data = json.loads(request.body)
-        comment = Comment.objects.create(
-            post=post,
-            content=data.get('content'),
-            author=request.user
-        )
+        with transaction.atomic():
+            comment = Comment.objects.create(
+                post=post,
+                content=data.get('content'),
+                author=request.user
+            )
+            post.comment_added(comment)
         
         return JsonResponse({
             'success': True,
@@ -383,12 +630,14 @@ def update_comment(request, pk):
 @require_http_methods(["DELETE"])
 def delete_comment(request, pk):
     """Delete a comment (AJAX) - author or admin only"""
-    comment = get_object_or_404(Comment, pk=pk)
+    comment = get_object_or_404(Comment.objects.select_related('post'), pk=pk)
     
     if comment.author != request.user and not request.user.is_staff:
         return JsonResponse({'success': False, 'error': 'Unauthorized'}, status=403)
     
-    comment.delete()
+    with transaction.atomic():
+        comment.delete()
+        comment.post.comment_removed()
     return JsonResponse({'success': True})
 
 @csrf_exempt
@@ -418,11 +667,13 @@ def create_comment_flutter(request, post_pk):
             post = get_object_or_404(Post, pk=post_pk)
 
             # create comment
-            comment = Comment.objects.create(
-                post=post,
-                author=author,
-                content=content
-            )
+            with transaction.atomic():
+                comment = Comment.objects.create(
+                    post=post,
+                    author=author,
+                    content=content
+                )
+                post.comment_added(comment)
 
             new_comment_data = {
                 'author': comment.author.username,
@@ -0,0 +1,141 @@
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+try:
+    from club_directories.models import Club, LeaguePick
+except ImportError:
+    Club = LeaguePick = None
+
+try:
+    from forum.models import Post, PostImage
+except ImportError:
+    Post = PostImage = None
+
+try:
+    from matchpredictions.models import Vote
+except ImportError:
+    Vote = None
+
+# How many posts and predictions the profile shows
+RECENT_LIMIT = 10
+
+# Upper bound on staleness from edits no signal reports (club names, match dates, ...)
+ACTIVITY_TTL = 60 * 10
+
+
+def activity_cache_key(user_id):
+    return f'main:activity:{user_id}'
+
+
+def invalidate_activity(user_id):
+    cache.delete(activity_cache_key(user_id))
+
+
+def _league_picks(user):
+    picks = LeaguePick.objects.filter(user=user).select_related('club__details')
+    activity = []
+    for pick in picks:
+        club = pick.club
+        details = getattr(club, 'details', None)
+        activity.append({
+            'id': str(club.id),
+            'name': club.name,
+            'logo_url': club.logo_url,
+            'founded_year': club.founded_year,
+            'desc': details.description if details else "",
+        })
+    return activity
+
+
+def _posts(user):
+    posts = (
+        Post.objects.filter(author=user)
+        .only('id', 'title', 'content', 'post_type', 'created_at', 'updated_at')
+        .prefetch_related(
+            Prefetch('clubs', queryset=Club.objects.only('id', 'name', 'logo_url')),
+            Prefetch('images', queryset=PostImage.objects.only('id', 'post_id', 'image_url', 'order', 'uploaded_at')),
+        )[:RECENT_LIMIT]
+    )
+    return [{
+        'id': post.id,
+        'title': post.title,
+        'content': post.content,
+        'post_type': post.post_type,
+        'created_at': post.created_at,
+        'updated_at': post.updated_at,
+        'clubs': [{'id': str(c.id), 'name': c.name, 'logo_url': c.logo_url} for c in post.clubs.all()],
+        'image_url': next((image.image_url for image in post.images.all()), None),
+    } for post in posts]
+
+
+def _predictions(user):
+    votes = (
+        Vote.objects.filter(user=user)
+        .select_related('match__home_team', 'match__away_team')
+        .order_by('-timestamp')[:RECENT_LIMIT]
+    )
+    return [{
+        'id': str(vote.id),
+        'match_id': str(vote.match_id),
+        'home_team': vote.match.home_team.name,
+        'away_team': vote.match.away_team.name,
+        'prediction': vote.prediction,
+        'prediction_display': vote.get_prediction_display(),
+        'match_date': vote.match.match_date,
+    } for vote in votes]
+
+
+def build_activity(user):
+    """A user's picks, recent posts and recent predictions, in five queries"""
+    return {
+        'league_picks': _league_picks(user) if LeaguePick else [],
+        'user_posts': _posts(user) if Post else [],
+        'user_predictions': _predictions(user) if Vote else [],
+    }
+
+
+def get_activity(user):
+    """build_activity(user), cached until the user's picks, posts or votes change"""
+    key = activity_cache_key(user.pk)
+    activity = cache.get(key)
+    if activity is None:
+        activity = build_activity(user)
+        cache.set(key, activity, ACTIVITY_TTL)
+    return activity
+
+
+def _prediction_label(prediction):
+    if prediction['prediction'] == 'home_win':
+        return f"{prediction['home_team']} Win"
+    if prediction['prediction'] == 'away_win':
+        return f"{prediction['away_team']} Win"
+    if prediction['prediction'] == 'draw':
+        return "Draw"
+    return prediction['prediction']
+
+
+def activity_json(user):
+    """The user_activity_api payload"""
+    activity = get_activity(user)
+    return {
+        'username': user.username,
+        'league_picks': [{**pick, 'is_league_pick': True} for pick in activity['league_picks']],
+        'user_posts': [{
+            'id': post['id'],
+            'title': post['title'],
+            'content': post['content'],
+            'post_type': post['post_type'],
+            'author': user.username,
+            'created_at': post['created_at'].isoformat(),
+            'updated_at': post['updated_at'].isoformat(),
+            'clubs': [],    # Simplified for profile
+            'images': [],   # Simplified for profile
+            'comments': [], # Simplified for profile
+        } for post in activity['user_posts']],
+        'user_predictions': [{
+            'id': prediction['id'],
+            'match_title': f"{prediction['home_team']} vs {prediction['away_team']}",
+            'voted_for': _prediction_label(prediction),
+            'match_date': prediction['match_date'].strftime('%Y-%m-%d'),
+        } for prediction in activity['user_predictions']],
+    }
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from main import timeline
+from main.activity import LeaguePick, Post, Vote
+from main.models import ActivityEvent
+from main.signals import ClubVote, Comment
+
+
+class Command(BaseCommand):
+    help = 'Rebuild every activity timeline from the posts, comments, votes, club votes and league picks'
+
+    def events(self):
+        if Post is not None:
+            for post in Post.objects.only('id', 'author_id', 'title', 'post_type', 'created_at').iterator():
+                yield timeline.post_event(post)
+        if Comment is not None:
+            for comment in Comment.objects.select_related('post').iterator():
+                yield timeline.comment_event(comment)
+        if Vote is not None:
+            for vote in Vote.objects.select_related('match__home_team', 'match__away_team').iterator():
+                yield timeline.prediction_event(
+                    vote.user_id, vote.match_id, vote.prediction,
+                    vote.match.home_team.name, vote.match.away_team.name,
+                    created_at=vote.timestamp,
+                )
+        if ClubVote is not None:
+            for club_vote in ClubVote.objects.select_related('club').iterator():
+                yield timeline.club_vote_event(club_vote, created_at=club_vote.created_at)
+        if LeaguePick is not None:
+            for pick in LeaguePick.objects.select_related('club').iterator():
+                yield timeline.league_pick_event(pick.user_id, pick.league_id, pick.club)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            ActivityEvent.objects.all().delete()
+            created = len(ActivityEvent.objects.bulk_create(self.events(), batch_size=1000))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} activity events.'))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_customuser_profpict'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Forum post'), ('comment', 'Comment'), ('prediction', 'Match prediction'), ('club_vote', 'Club vote'), ('league_pick', 'League pick')], max_length=20)),
+                ('object_id', models.CharField(max_length=64)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['user', '-created_at', '-id'], name='activity_user_timeline_idx'), models.Index(fields=['kind', 'object_id'], name='activity_kind_object_idx')],
+            },
+        ),
+    ]
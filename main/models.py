@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import (
     BaseUserManager, AbstractBaseUser
 )
@@ -73,3 +74,34 @@ class CustomUser(AbstractBaseUser):
 
     def has_module_perms(self, app_label):
         return self.role == 'admin'
+
+
+class ActivityEvent(models.Model):
+    """
+    One entry of a user's activity timeline, appended when the user posts,
+    comments, predicts a match, votes for a club or picks a league's club.
+    `data` holds what the feed shows, so reading a page touches only this table.
+    """
+    KIND_CHOICES = (
+        ('post', 'Forum post'),
+        ('comment', 'Comment'),
+        ('prediction', 'Match prediction'),
+        ('club_vote', 'Club vote'),
+        ('league_pick', 'League pick'),
+    )
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='activity_events')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.CharField(max_length=64)  # pk of the post, comment, match, club or league
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='activity_user_timeline_idx'),
+            models.Index(fields=['kind', 'object_id'], name='activity_kind_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.kind} at {self.created_at}"
@@ -0,0 +1,73 @@
+import json
+import uuid
+
+from django.db.models import Count
+
+from club_directories.models import LeaguePick
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 2000
+
+# Exported columns (one JOIN per related table) and their keys in the output
+FIELDS = ('id', 'league__name', 'club__name', 'user__full_name', 'user__username')
+KEYS = ('id', 'league', 'club', 'user', 'username')
+
+
+def _uuid(value, name):
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name} id '{value}'")
+
+
+def filtered_picks(params):
+    """LeaguePicks filtered by ?league=<id>, ?club=<id> and ?user=<username> (ValueError if malformed)"""
+    picks = LeaguePick.objects.all()
+    if params.get('league'):
+        picks = picks.filter(league_id=_uuid(params['league'], 'league'))
+    if params.get('club'):
+        picks = picks.filter(club_id=_uuid(params['club'], 'club'))
+    if params.get('user'):
+        picks = picks.filter(user__username=params['user'])
+    return picks
+
+
+def _row(values):
+    row = dict(zip(KEYS, values))
+    row['id'] = str(row['id'])
+    return row
+
+
+def pick_page(picks, cursor=None, limit=PAGE_SIZE):
+    """One page of rows ordered by id, after the `cursor` id, and the next cursor"""
+    picks = picks.order_by('id')
+    if cursor:
+        picks = picks.filter(id__gt=_uuid(cursor, 'cursor'))
+    rows = [_row(values) for values in picks.values_list(*FIELDS)[:limit + 1]]
+    next_cursor = rows[limit - 1]['id'] if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def stream_picks(picks):
+    """Every row as chunks of one JSON array, read with a server-side cursor"""
+    yield '['
+    for i, values in enumerate(picks.order_by('id').values_list(*FIELDS).iterator(chunk_size=STREAM_CHUNK_SIZE)):
+        yield (',' if i else '') + json.dumps(_row(values))
+    yield ']'
+
+
+def pick_counts(picks):
+    """Picks per club per league, counted in one GROUP BY"""
+    rows = (
+        picks.values('league_id', 'league__name', 'club_id', 'club__name')
+        .annotate(picks=Count('id'))
+        .order_by('league__name', '-picks', 'club__name')
+    )
+    return [{
+        'league_id': str(row['league_id']),
+        'league': row['league__name'],
+        'club_id': str(row['club_id']),
+        'club': row['club__name'],
+        'picks': row['picks'],
+    } for row in rows]
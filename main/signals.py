@@ -0,0 +1,106 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from . import timeline
+from .activity import LeaguePick, Post, PostImage, Vote, invalidate_activity
+
+try:
+    from forum.models import Comment
+except ImportError:
+    Comment = None
+
+try:
+    from statisticsrafi.models import ClubVote
+except ImportError:
+    ClubVote = None
+
+
+def invalidate_user_activity(sender, instance, **kwargs):
+    """A pick, vote or post changed: drop its user's cached profile activity"""
+    user_id = getattr(instance, 'user_id', None) or getattr(instance, 'author_id', None)
+    if user_id:
+        invalidate_activity(user_id)
+
+
+def invalidate_post_author_activity(sender, instance, **kwargs):
+    """A post's images or tagged clubs changed"""
+    if isinstance(instance, PostImage):
+        author_id = Post.objects.filter(pk=instance.post_id).values_list('author_id', flat=True).first()
+    else:
+        author_id = getattr(instance, 'author_id', None)  # a Post, not a Club (reverse m2m)
+    if author_id:
+        invalidate_activity(author_id)
+
+
+def picks_written(sender, user_id, picks, **kwargs):
+    """Batch pick changes are bulk writes, which send no post_save"""
+    invalidate_activity(user_id)
+    timeline.record(
+        timeline.league_pick_event(user_id, league_id, club) for league_id, club in picks.items() if club
+    )
+
+
+def votes_written(sender, batch, **kwargs):
+    """Votes flushed by the ingest path (a bulk upsert, so no post_save)"""
+    for user_id in {user_id for user_id, _ in batch}:
+        invalidate_activity(user_id)
+    timeline.record(timeline.prediction_events(
+        (user_id, match_id, prediction) for (user_id, match_id), prediction in batch.items()
+    ))
+
+
+# --- Activity timeline (fan-out on write) ---
+
+def record_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.record([timeline.post_event(instance)])
+
+
+def record_comment(sender, instance, created, **kwargs):
+    if created:
+        timeline.record([timeline.comment_event(instance)])
+
+
+def forget_post_or_comment(sender, instance, **kwargs):
+    timeline.forget('post' if sender is Post else 'comment', instance.pk)
+
+
+def record_prediction(sender, instance, **kwargs):
+    timeline.record(timeline.prediction_events([(instance.user_id, instance.match_id, instance.prediction)]))
+
+
+def record_club_vote(sender, instance, **kwargs):
+    timeline.record([timeline.club_vote_event(instance)])
+
+
+def record_league_pick(sender, instance, **kwargs):
+    timeline.record([timeline.league_pick_event(instance.user_id, instance.league_id, instance.club)])
+
+
+if LeaguePick is not None:
+    from club_directories.picks import picks_changed
+    picks_changed.connect(picks_written, dispatch_uid='activity-picks-changed')
+    post_save.connect(record_league_pick, sender=LeaguePick, dispatch_uid='timeline-LeaguePick')
+
+if Vote is not None:
+    from matchpredictions.ingest import votes_written as votes_written_signal
+    votes_written_signal.connect(votes_written, dispatch_uid='activity-votes-written')
+    post_save.connect(record_prediction, sender=Vote, dispatch_uid='timeline-Vote')
+
+for model in (LeaguePick, Post, Vote):
+    if model is not None:
+        post_save.connect(invalidate_user_activity, sender=model, dispatch_uid=f'activity-{model.__name__}-save')
+        post_delete.connect(invalidate_user_activity, sender=model, dispatch_uid=f'activity-{model.__name__}-delete')
+
+if Post is not None:
+    post_save.connect(invalidate_post_author_activity, sender=PostImage, dispatch_uid='activity-PostImage-save')
+    post_delete.connect(invalidate_post_author_activity, sender=PostImage, dispatch_uid='activity-PostImage-delete')
+    m2m_changed.connect(invalidate_post_author_activity, sender=Post.clubs.through, dispatch_uid='activity-Post-clubs')
+    post_save.connect(record_post, sender=Post, dispatch_uid='timeline-Post')
+    post_delete.connect(forget_post_or_comment, sender=Post, dispatch_uid='timeline-Post-delete')
+
+if Comment is not None:
+    post_save.connect(record_comment, sender=Comment, dispatch_uid='timeline-Comment')
+    post_delete.connect(forget_post_or_comment, sender=Comment, dispatch_uid='timeline-Comment-delete')
+
+if ClubVote is not None:
+    post_save.connect(record_club_vote, sender=ClubVote, dispatch_uid='timeline-ClubVote')
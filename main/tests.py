@@ -357,4 +357,167 @@ class MainAppTests(TestCase):
     def test_profile_edit_unauthenticated(self):
         self.client.logout()
         response = self.client.post(reverse('main:profile_edit'), {})
-        self.assertEqual(response.status_code, 302)
\ No newline at end of file
+        self.assertEqual(response.status_code, 302)
+
+class UserActivityTests(TestCase):
+    """Profile activity is assembled in a few queries and cached per user"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from club_directories.models import ClubDetails
+        from forum.models import PostImage
+        cache.clear()
+        self.user = create_user('fan')
+        league = League.objects.create(name="Premier League", region="UK")
+        self.arsenal = Club.objects.create(name="Arsenal", league=league)
+        self.chelsea = Club.objects.create(name="Chelsea", league=league)
+        ClubDetails.objects.create(club=self.arsenal, description="Gunners")
+        FavoriteClub.objects.create(user=self.user, league=league, club=self.arsenal)
+        self.post = Post.objects.create(author=self.user, title="Derby day", content="COYG")
+        self.post.clubs.add(self.arsenal)
+        PostImage.objects.create(post=self.post, image_url="http://example.com/derby.jpg")
+        match = Match.objects.create(
+            league=league, home_team=self.arsenal, away_team=self.chelsea, match_date=timezone.now()
+        )
+        Vote.objects.create(user=self.user, match=match, prediction='home_win')
+        self.client.login(username='fan', password='password123')
+        self.url = reverse('main:api_user_activity')
+
+    def test_payload_is_built_once(self):
+        with self.assertNumQueries(2 + 5):  # session, user + picks, posts, post clubs, post images, votes
+            data = self.client.get(self.url).json()
+        self.assertEqual(data['username'], 'fan')
+        self.assertEqual(data['league_picks'][0]['desc'], "Gunners")
+        self.assertEqual(data['user_posts'][0]['title'], "Derby day")
+        self.assertEqual(data['user_predictions'][0]['voted_for'], "Arsenal Win")
+
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(self.url).json(), data)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('main:profile'))
+        self.assertContains(response, "http://example.com/derby.jpg")
+        self.assertContains(response, "Your pick: Home Win")
+
+    def test_writes_invalidate_the_cached_activity(self):
+        from club_directories.picks import apply_picks
+        self.client.get(self.url)
+        Post.objects.create(author=self.user, title="Second post", content="...")
+        self.assertEqual(len(self.client.get(self.url).json()['user_posts']), 2)
+
+        apply_picks(self.user, [{'club_id': str(self.chelsea.id)}])
+        self.assertEqual(self.client.get(self.url).json()['league_picks'][0]['name'], "Chelsea")
+
+    def test_errors_do_not_leak_a_traceback(self):
+        with patch('main.views.activity_json', side_effect=RuntimeError("boom")), \
+                self.assertLogs('main.views', 'ERROR'):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 500)
+        self.assertNotIn('trace', response.json())
+        self.assertNotIn('boom', response.content.decode())
+
+
+class ActivityTimelineTests(TestCase):
+    """Each module's writes are appended to one timeline, read page by page"""
+
+    def setUp(self):
+        from forum.models import Comment
+        from statisticsrafi.models import ClubVote
+        from club_directories.picks import apply_picks
+        from matchpredictions.voting import cast_vote
+        self.user = create_user('fan')
+        league = League.objects.create(name="Premier League", region="UK")
+        arsenal = Club.objects.create(name="Arsenal", league=league)
+        chelsea = Club.objects.create(name="Chelsea", league=league)
+        self.post = Post.objects.create(author=self.user, title="Derby day", content="COYG")
+        Comment.objects.create(post=self.post, author=self.user, content="Great post")
+        match = Match.objects.create(league=league, home_team=arsenal, away_team=chelsea, match_date=timezone.now())
+        cast_vote(self.user, match, 'draw')
+        ClubVote.objects.create(user=self.user, club=arsenal)
+        apply_picks(self.user, [{'club_id': str(chelsea.id)}])
+        self.client.login(username='fan', password='password123')
+        self.url = reverse('main:api_timeline')
+
+    def test_timeline_pages_through_every_module(self):
+        kinds, cursor = [], None
+        while True:
+            with self.assertNumQueries(2 + 1):  # session, user + one range scan
+                data = self.client.get(self.url, {'limit': 2, **({'cursor': cursor} if cursor else {})}).json()
+            kinds += [event['kind'] for event in data['events']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(kinds, ['league_pick', 'club_vote', 'prediction', 'comment', 'post'])
+
+        events = self.client.get(self.url).json()['events']
+        self.assertEqual(events[2]['data'], {'home_team': "Arsenal", 'away_team': "Chelsea", 'prediction': 'draw'})
+        self.assertEqual(events[0]['data']['club_name'], "Chelsea")
+
+    def test_deleted_posts_leave_the_timeline(self):
+        self.post.delete()  # and its comment
+        kinds = [event['kind'] for event in self.client.get(self.url).json()['events']]
+        self.assertEqual(kinds, ['league_pick', 'club_vote', 'prediction'])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'nope'}).status_code, 400)
+
+    def test_rebuild_command_backfills_the_timeline(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import ActivityEvent
+        ActivityEvent.objects.all().delete()
+        call_command('rebuild_activity_events', stdout=StringIO())
+        self.assertEqual(
+            sorted(ActivityEvent.objects.values_list('kind', flat=True)),
+            ['club_vote', 'comment', 'league_pick', 'post', 'prediction'],
+        )
+
+
+class LeaguePickExportTests(TestCase):
+    """main:show_json exports picks in pages, as a stream or as per-club counts"""
+
+    def setUp(self):
+        self.pl = League.objects.create(name="Premier League", region="UK")
+        self.liga = League.objects.create(name="La Liga", region="Spain")
+        self.arsenal = Club.objects.create(name="Arsenal", league=self.pl)
+        self.chelsea = Club.objects.create(name="Chelsea", league=self.pl)
+        self.madrid = Club.objects.create(name="Real Madrid", league=self.liga)
+        for i in range(5):
+            user = create_user(f'fan{i}')
+            FavoriteClub.objects.create(user=user, league=self.pl, club=self.arsenal if i < 3 else self.chelsea)
+            FavoriteClub.objects.create(user=user, league=self.liga, club=self.madrid)
+        self.url = reverse('main:show_json')
+
+    def test_stream_keeps_the_legacy_rows_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+            rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(set(rows[0]), {'id', 'league', 'club', 'user', 'username'})
+
+    def test_pages_and_filters(self):
+        ids, cursor = [], None
+        while True:
+            params = {'limit': 3, 'league': self.pl.id, **({'cursor': cursor} if cursor else {})}
+            with self.assertNumQueries(1):
+                data = self.client.get(self.url, params).json()
+            ids += [row['id'] for row in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+        data = self.client.get(self.url, {'limit': 10, 'user': 'fan0', 'club': self.madrid.id}).json()
+        self.assertEqual([(row['username'], row['club']) for row in data['results']], [('fan0', "Real Madrid")])
+
+    def test_counts_per_club_per_league(self):
+        with self.assertNumQueries(1):
+            counts = self.client.get(self.url, {'mode': 'counts'}).json()
+        self.assertEqual(
+            [(row['league'], row['club'], row['picks']) for row in counts],
+            [("La Liga", "Real Madrid", 5), ("Premier League", "Arsenal", 3), ("Premier League", "Chelsea", 2)],
+        )
+
+    def test_malformed_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'league': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'limit': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'cursor': 'x'}).status_code, 400)
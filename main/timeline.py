@@ -0,0 +1,97 @@
+from django.core.cache import cache
+
+from forum.pagination import KeysetPaginator
+
+from .models import ActivityEvent
+
+try:
+    from matchpredictions.models import Match
+except ImportError:
+    Match = None
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+MATCH_TITLE_TIMEOUT = 300
+
+
+def post_event(post):
+    return ActivityEvent(
+        user_id=post.author_id, kind='post', object_id=str(post.pk), created_at=post.created_at,
+        data={'title': post.title, 'post_type': post.post_type},
+    )
+
+
+def comment_event(comment):
+    return ActivityEvent(
+        user_id=comment.author_id, kind='comment', object_id=str(comment.pk), created_at=comment.created_at,
+        data={'post_id': comment.post_id, 'post_title': comment.post.title, 'excerpt': comment.content[:100]},
+    )
+
+
+def club_vote_event(club_vote, **fields):
+    return ActivityEvent(
+        user_id=club_vote.user_id, kind='club_vote', object_id=str(club_vote.club_id),
+        data={'club_name': club_vote.club.name, 'season': club_vote.season}, **fields,
+    )
+
+
+def league_pick_event(user_id, league_id, club):
+    return ActivityEvent(
+        user_id=user_id, kind='league_pick', object_id=str(league_id),
+        data={'club_id': str(club.pk), 'club_name': club.name, 'logo_url': club.logo_url},
+    )
+
+
+def prediction_event(user_id, match_id, prediction, home_team, away_team, **fields):
+    return ActivityEvent(
+        user_id=user_id, kind='prediction', object_id=str(match_id),
+        data={'home_team': home_team, 'away_team': away_team, 'prediction': prediction}, **fields,
+    )
+
+
+def match_titles(match_ids):
+    """{match id: (home team, away team)}, cached so the vote hot path rarely reads matches"""
+    keys = {f'main:match-teams:{match_id}': match_id for match_id in match_ids}
+    titles = {keys[key]: teams for key, teams in cache.get_many(keys).items()}
+    missing = set(match_ids) - set(titles)
+    if missing:
+        rows = Match.objects.filter(pk__in=missing).values_list('id', 'home_team__name', 'away_team__name')
+        fetched = {match_id: (home, away) for match_id, home, away in rows}
+        cache.set_many({f'main:match-teams:{match_id}': teams for match_id, teams in fetched.items()}, MATCH_TITLE_TIMEOUT)
+        titles.update(fetched)
+    return titles
+
+
+def prediction_events(votes):
+    """Events for (user_id, match_id, prediction) triples"""
+    votes = list(votes)
+    titles = match_titles({match_id for _, match_id, _ in votes})
+    return [
+        prediction_event(user_id, match_id, prediction, *titles[match_id])
+        for user_id, match_id, prediction in votes if match_id in titles
+    ]
+
+
+def record(events):
+    """Append events to their users' timelines"""
+    events = list(events)
+    if events:
+        ActivityEvent.objects.bulk_create(events)
+
+
+def forget(kind, object_id):
+    """Drop the events of a deleted post or comment"""
+    ActivityEvent.objects.filter(kind=kind, object_id=str(object_id)).delete()
+
+
+def timeline_page(user, cursor=None, limit=PAGE_SIZE):
+    """
+    The user's newest events, or the ones after `cursor` (keyset pagination
+    on the (user, created_at, id) index), and the cursor of the next page.
+    Raises ValueError for a malformed cursor.
+    """
+    if cursor and KeysetPaginator.decode_cursor(cursor) is None:
+        raise ValueError('Invalid cursor')
+    page = KeysetPaginator(ActivityEvent.objects.filter(user=user), limit).get_page(after=cursor)
+    return page.object_list, page.next_cursor
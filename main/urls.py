@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import show_main, register_user, login_user, logout_user, profile, profile_edit, show_json, user_activity_api
+from .views import show_main, register_user, login_user, logout_user, profile, profile_edit, show_json, user_activity_api, timeline_api
 
 app_name = 'main'
 
@@ -12,4 +12,5 @@ urlpatterns = [
     path('profile/edit/', profile_edit, name='profile_edit'),
     path('json/', show_json, name='show_json'),
     path('api/user-activity/', user_activity_api, name='api_user_activity'),
+    path('api/timeline/', timeline_api, name='api_timeline'),
 ]
\ No newline at end of file
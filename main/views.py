@@ -1,28 +1,21 @@
 import datetime
-import traceback
-from django.http import HttpResponseRedirect, JsonResponse
+import logging
+from django.http import HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 from django.contrib.auth import login, logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
 from django.shortcuts import render
+from .activity import activity_json, get_activity
 from .forms import CustomUserCreationForm, CustomUserChangeForm
+from .pick_export import (
+    MAX_PAGE_SIZE as PICKS_MAX_PAGE_SIZE, PAGE_SIZE as PICKS_PAGE_SIZE,
+    filtered_picks, pick_counts, pick_page, stream_picks,
+)
+from .timeline import MAX_PAGE_SIZE, PAGE_SIZE, timeline_page
 
-try:
-    from club_directories.models import LeaguePick
-except ImportError:
-    LeaguePick = None
-
-try:
-    from forum.models import Post
-except ImportError:
-    Post = None
-
-try:
-    from matchpredictions.models import Vote
-except ImportError:
-    Vote = None
+logger = logging.getLogger(__name__)
 
 def register_user(request):
     if request.method == 'POST':
@@ -97,29 +90,14 @@ def show_main(request):
 @login_required
 def profile(request):
     profile_user = request.user
-    
-    edit_form = CustomUserChangeForm(instance=profile_user)
-    
-    league_pick = []
-    if LeaguePick:
-        league_pick = LeaguePick.objects.filter(user=profile_user).select_related('club')
-
-    user_posts = []
-    if Post:
-        user_posts = profile_user.forum_posts.all()[:10]
-
-    user_predictions = []
-    if Vote:
-        user_predictions = profile_user.matchpred_votes.all().select_related(
-            'match', 'match__home_team', 'match__away_team'
-        )[:10]
+    activity = get_activity(profile_user)
 
     context = {
         'profile_user': profile_user,
-        'edit_form': edit_form,
-        'league_pick': league_pick,
-        'user_posts': user_posts,
-        'user_predictions': user_predictions,
+        'edit_form': CustomUserChangeForm(instance=profile_user),
+        'league_pick': activity['league_picks'],
+        'user_posts': activity['user_posts'],
+        'user_predictions': activity['user_predictions'],
     }
     return render(request, 'profile.html', context)
 
@@ -151,92 +129,56 @@ def profile_edit(request):
         }, status=400)
 
 def show_json(request):
-    product_list = LeaguePick.objects.all()
-    data = [
-        {
-            'id': str(product.id),
-            'league': product.league.name,
-            'club': product.club.name,
-            'user': product.user.full_name,
-            'username': product.user.username
-        }
-        for product in product_list
-    ]
-
-    return JsonResponse(data, safe=False)
+    """
+    LeaguePick export, filtered by ?league=, ?club= and ?user=<username>:
+    - ?limit=N[&cursor=...]: one page, {"results": [...], "next_cursor": ...}
+    - ?mode=counts: picks per club per league
+    - otherwise every pick, streamed as one JSON array
+    """
+    try:
+        picks = filtered_picks(request.GET)
+        if request.GET.get('mode') == 'counts':
+            return JsonResponse(pick_counts(picks), safe=False)
+        if 'limit' in request.GET or 'cursor' in request.GET:
+            limit = request.GET.get('limit', str(PICKS_PAGE_SIZE))
+            if not limit.isdigit():
+                raise ValueError(f"Invalid limit '{limit}'")
+            limit = max(1, min(int(limit), PICKS_MAX_PAGE_SIZE))
+            results, next_cursor = pick_page(picks, request.GET.get('cursor'), limit)
+            return JsonResponse({'results': results, 'next_cursor': next_cursor})
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    return StreamingHttpResponse(stream_picks(picks), content_type='application/json')
 
 @login_required
 def user_activity_api(request):
     try:
-        profile_user = request.user
-
-        # --- 1. LEAGUE PICKS ---
-        league_picks_data = []
-        # Uses related_name='league_picks' from your model
-        picks = profile_user.league_picks.select_related('club')
-        
-        for pick in picks:
-            club = pick.club
-            league_picks_data.append({
-                'id': str(club.id),       # UUID to string
-                'name': club.name,
-                'logo_url': club.logo_url, # EXACT FIELD NAME
-                'founded_year': club.founded_year,
-                'desc': getattr(club, 'details', None).description if hasattr(club, 'details') else "", 
-                'is_league_pick': True,
-            })
-
-        # --- 2. USER POSTS ---
-        user_posts_data = []
-        # Uses related_name='forum_posts' from your model
-        posts = profile_user.forum_posts.all()[:10]
-
-        for post in posts:
-            user_posts_data.append({
-                'id': post.id,
-                'title': post.title,
-                'content': post.content,
-                'post_type': post.post_type, # 'discussion' or 'news'
-                'author': profile_user.username,
-                'created_at': post.created_at.isoformat(),
-                'updated_at': post.updated_at.isoformat(),
-                'clubs': [],    # Simplified for profile
-                'images': [],   # Simplified for profile
-                'comments': [], # Simplified for profile
-            })
-
-        # --- 3. PREDICTIONS ---
-        user_predictions_data = []
-        # Uses related_name='matchpred_votes' from your model
-        votes = profile_user.matchpred_votes.all().select_related('match', 'match__home_team', 'match__away_team')[:10]
-
-        # Helper to make 'home_win' look nicer
-        def format_prediction(code, match):
-            if code == 'home_win': return f"{match.home_team.name} Win"
-            if code == 'away_win': return f"{match.away_team.name} Win"
-            if code == 'draw': return "Draw"
-            return code
-
-        for vote in votes:
-            user_predictions_data.append({
-                'id': str(vote.id), # UUID to string
-                'match_title': f"{vote.match.home_team.name} vs {vote.match.away_team.name}",
-                'voted_for': format_prediction(vote.prediction, vote.match), # EXACT FIELD NAME: prediction
-                'match_date': vote.match.match_date.strftime('%Y-%m-%d'),
-            })
-
-        data = {
-            'username': profile_user.username,
-            'league_picks': league_picks_data,
-            'user_posts': user_posts_data,
-            'user_predictions': user_predictions_data,
-        }
-
-        return JsonResponse(data)
-
-    except Exception as e:
+        return JsonResponse(activity_json(request.user))
+    except Exception:
+        logger.exception("Building the activity of user %s failed", request.user.pk)
         return JsonResponse({
             "status": "error",
-            "message": str(e),
-            "trace": traceback.format_exc()
-        }, status=500)
\ No newline at end of file
+            "message": "Could not load your activity.",
+        }, status=500)
+
+@login_required
+def timeline_api(request):
+    """The user's activity timeline, newest first: ?limit=N&cursor=<next_cursor of the previous page>"""
+    try:
+        limit = max(1, min(int(request.GET.get('limit', PAGE_SIZE)), MAX_PAGE_SIZE))
+        events, next_cursor = timeline_page(request.user, request.GET.get('cursor'), limit)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid limit or cursor.'}, status=400)
+
+    return JsonResponse({
+        'events': [{
+            'id': event.id,
+            'kind': event.kind,
+            'object_id': event.object_id,
+            'created_at': event.created_at.isoformat(),
+            'data': event.data,
+        } for event in events],
+        'next_cursor': next_cursor,
+    })
+
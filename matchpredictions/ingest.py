@@ -0,0 +1,201 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Q
+from django.dispatch import Signal
+
+from .models import PREDICTIONS, Match, MatchVoteTally, Vote
+
+logger = logging.getLogger(__name__)
+
+MATCH_EXISTS_CACHE_TIMEOUT = 300
+
+# Sent with batch ({(user_id, match_id): prediction}, the votes that changed)
+# after flush_votes, whose upsert sends no post_save
+votes_written = Signal()
+
+
+def match_exists_key(match_id):
+    return f'matchpredictions:match-exists:{match_id}'
+
+
+def match_exists(match_id):
+    """Cached existence check so the hot path doesn't load the Match row on every vote"""
+    key = match_exists_key(match_id)
+    if cache.get(key):
+        return True
+    exists = Match.objects.filter(pk=match_id).exists()
+    if exists:
+        cache.set(key, True, MATCH_EXISTS_CACHE_TIMEOUT)
+    return exists
+
+
+def _current_votes(keys):
+    """{(user_id, match_id): (vote id, prediction)} for existing votes, locking just those voters' rows"""
+    condition = Q()
+    for user_id, match_id in keys:
+        condition |= Q(user_id=user_id, match_id=match_id)
+    return {
+        (user_id, match_id): (pk, prediction) for pk, user_id, match_id, prediction in
+        Vote.objects.select_for_update().filter(condition).values_list('id', 'user_id', 'match_id', 'prediction')
+    }
+
+
+def write_votes(batch):
+    """
+    Write a {(user_id, match_id): prediction} batch and record how the
+    counts moved. Only the voters' own Vote rows are locked: new votes go
+    in with INSERT ... ON CONFLICT DO NOTHING, changed ones with one
+    INSERT ... ON CONFLICT DO UPDATE, and the count changes are appended
+    as VoteTallyDelta rows (see MatchVoteTally.record / fold), so votes on
+    a hot match never queue on its tally row. Returns the changed votes.
+    """
+    with transaction.atomic():
+        previous = _current_votes(batch) if batch else {}
+
+        inserted = {
+            key: Vote(user_id=key[0], match_id=key[1], prediction=prediction)
+            for key, prediction in batch.items() if key not in previous
+        }
+        if inserted:
+            Vote.objects.bulk_create(inserted.values(), ignore_conflicts=True)
+            # A concurrent request may have inserted the same vote first: its row then wins
+            for key, (pk, prediction) in _current_votes(inserted).items():
+                if pk != inserted[key].pk:
+                    previous[key] = (pk, prediction)
+                    del inserted[key]
+
+        updated = {
+            key: prediction for key, prediction in batch.items()
+            if key in previous and previous[key][1] != prediction
+        }
+        if updated:
+            Vote.objects.bulk_create(
+                [Vote(user_id=user_id, match_id=match_id, prediction=prediction)
+                 for (user_id, match_id), prediction in updated.items()],
+                update_conflicts=True,
+                unique_fields=['user', 'match'],
+                update_fields=['prediction'],
+            )
+
+        deltas = {}
+        for (user_id, match_id), vote in inserted.items():
+            tally = deltas.setdefault(match_id, dict.fromkeys(PREDICTIONS, 0))
+            tally[vote.prediction] += 1
+        for (user_id, match_id), prediction in updated.items():
+            tally = deltas.setdefault(match_id, dict.fromkeys(PREDICTIONS, 0))
+            tally[prediction] += 1
+            tally[previous[(user_id, match_id)][1]] -= 1
+        MatchVoteTally.record(deltas)
+    return {**{key: vote.prediction for key, vote in inserted.items()}, **updated}
+
+
+def flush_votes(batch):
+    """
+    Write a batch of votes (see write_votes), then fold the touched matches'
+    deltas into their tallies. If a match or user was deleted after its
+    votes were accepted, the foreign keys fail: its votes are dropped and
+    the rest of the batch is written.
+    """
+    if not batch:
+        return
+    try:
+        changed = write_votes(batch)
+    except IntegrityError:
+        match_ids = {match_id for _, match_id in batch}
+        user_ids = {user_id for user_id, _ in batch}
+        matches = set(Match.objects.filter(pk__in=match_ids).values_list('pk', flat=True))
+        users = set(get_user_model().objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+        cache.delete_many([match_exists_key(match_id) for match_id in match_ids - matches])
+        kept = {
+            (user_id, match_id): prediction for (user_id, match_id), prediction in batch.items()
+            if user_id in users and match_id in matches
+        }
+        logger.warning('Dropped %d votes for deleted matches or users', len(batch) - len(kept))
+        batch = kept
+        changed = write_votes(batch) if batch else {}
+    if changed:
+        MatchVoteTally.fold({match_id for _, match_id in changed})
+        votes_written.send(sender=Vote, batch=changed)
+
+
+class VoteBuffer:
+    """
+    Per-process micro-batcher for incoming votes.
+
+    Votes are collected (a later vote by the same user on the same match
+    replaces the earlier one) and written together once the batch is full or
+    the oldest vote has waited max_delay seconds. Buffered votes are lost if
+    the process dies before a flush (set VOTE_INGEST_BATCH_SIZE = 1 to write
+    every vote before answering).
+    """
+
+    def __init__(self, batch_size, max_delay):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def add(self, user_id, match_id, prediction):
+        with self.lock:
+            self.pending[(user_id, match_id)] = prediction
+            if len(self.pending) < self.batch_size:
+                if self.timer is None:
+                    self.timer = threading.Timer(self.max_delay, self.flush_in_background)
+                    self.timer.daemon = True
+                    self.timer.start()
+                return
+            batch = self._take()
+        flush_votes(batch)
+
+    def _take(self):
+        batch, self.pending = self.pending, {}
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        return batch
+
+    def flush(self):
+        with self.lock:
+            batch = self._take()
+        flush_votes(batch)
+
+    def flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Failed to flush buffered votes')
+        finally:
+            close_old_connections()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = VoteBuffer(settings.VOTE_INGEST_BATCH_SIZE, settings.VOTE_INGEST_MAX_DELAY)
+            atexit.register(_buffer.flush)
+    return _buffer
+
+
+def ingest_vote(user_id, match_id, prediction):
+    """
+    Record a vote on the hot path. By default it is buffered and written with
+    the next batch; with VOTE_INGEST_BATCH_SIZE = 1 it is written before
+    this returns.
+    """
+    if settings.VOTE_INGEST_BATCH_SIZE <= 1:
+        flush_votes({(user_id, match_id): prediction})
+    else:
+        get_buffer().add(user_id, match_id, prediction)
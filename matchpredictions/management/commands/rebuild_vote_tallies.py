@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from matchpredictions.models import PREDICTIONS, MatchVoteTally, Vote, VoteTallyDelta
+
+
+class Command(BaseCommand):
+    help = 'Recompute every MatchVoteTally row from the votes table (dropping pending deltas)'
+
+    def handle(self, *args, **options):
+        counts = Vote.objects.values('match_id').order_by().annotate(**{
+            prediction: Count('id', filter=Q(prediction=prediction))
+            for prediction in PREDICTIONS
+        })
+
+        with transaction.atomic():
+            previous = {
+                row.pop('match_id'): row
+                for row in MatchVoteTally.objects.select_for_update().values('match_id', *PREDICTIONS)
+            }
+            tallies = [MatchVoteTally(**row) for row in counts]
+            changed = sum(
+                1 for tally in tallies
+                if previous.pop(tally.match_id, None) != {p: getattr(tally, p) for p in PREDICTIONS}
+            )
+            changed += sum(1 for row in previous.values() if any(row.values()))  # matches with no votes left
+
+            MatchVoteTally.objects.all().delete()
+            MatchVoteTally.objects.bulk_create(tallies, batch_size=500)
+            VoteTallyDelta.objects.all().delete()  # already in the recount
+            MatchVoteTally.forget(*(tally.match_id for tally in tallies), *previous)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt tallies for {len(tallies)} matches ({changed} changed).'
+        ))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_tallies(apps, schema_editor):
+    Vote = apps.get_model('matchpredictions', 'Vote')
+    MatchVoteTally = apps.get_model('matchpredictions', 'MatchVoteTally')
+    counts = Vote.objects.values('match_id').annotate(**{
+        prediction: Count('id', filter=Q(prediction=prediction))
+        for prediction in ('home_win', 'draw', 'away_win')
+    })
+    MatchVoteTally.objects.bulk_create(
+        [MatchVoteTally(**row) for row in counts.order_by()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matchpredictions', '0005_alter_match_away_team_alter_match_home_team_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchVoteTally',
+            fields=[
+                ('match', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tally', serialize=False, to='matchpredictions.match')),
+                ('home_win', models.PositiveIntegerField(default=0)),
+                ('draw', models.PositiveIntegerField(default=0)),
+                ('away_win', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_tallies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matchpredictions', '0006_matchvotetally'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteTallyDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('home_win', models.IntegerField(default=0)),
+                ('draw', models.IntegerField(default=0)),
+                ('away_win', models.IntegerField(default=0)),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tally_deltas', to='matchpredictions.match')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['match', 'prediction'], name='matchpredic_match_i_67fa54_idx'),
+        ),
+    ]
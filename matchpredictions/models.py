@@ -1,11 +1,53 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
 import uuid
 
 # Import models from club_directories instead of defining our own
 from club_directories.models import League, Club
 
 
+PREDICTIONS = ('home_win', 'draw', 'away_win')
+
+
+def summarize_votes(counts):
+    """Percentages per prediction from a {prediction: count} dict"""
+    total = sum(counts.values())
+    if total == 0:
+        return {"home_win": 0, "away_win": 0, "draw": 0}
+    return {
+        "home_win": round((counts['home_win'] / total) * 100, 1),
+        "away_win": round((counts['away_win'] / total) * 100, 1),
+        "draw": round((counts['draw'] / total) * 100, 1),
+    }
+
+
+class MatchQuerySet(models.QuerySet):
+    def with_vote_stats(self, user=None):
+        """
+        Annotate each match with its home/draw/away vote counts (MatchVoteTally
+        plus any deltas not folded in yet) and the given user's prediction in the same query, so
+        total_votes and vote_summary don't hit the database again per match.
+        """
+        pending = VoteTallyDelta.objects.filter(match=OuterRef('pk')).order_by().values('match')
+        queryset = self.annotate(**{
+            f'{prediction}_votes': Greatest(
+                Coalesce(F(f'tally__{prediction}'), Value(0)) +
+                Coalesce(Subquery(pending.annotate(change=Sum(prediction)).values('change')), Value(0)),
+                Value(0),
+            )
+            for prediction in PREDICTIONS
+        })
+        if user is not None and user.is_authenticated:
+            queryset = queryset.annotate(user_prediction=Subquery(
+                Vote.objects.filter(match=OuterRef('pk'), user=user).values('prediction')[:1]
+            ))
+        return queryset
+
+
 #  Match Model
 class Match(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -23,23 +65,25 @@ class Match(models.Model):
         default='upcoming'
     )
 
+    objects = MatchQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.home_team.name} vs {self.away_team.name} ({self.league.name})"
 
+    @property
+    def vote_counts(self):
+        """Votes per prediction, from with_vote_stats() when available, else the cached tally"""
+        if hasattr(self, 'home_win_votes'):
+            return {prediction: getattr(self, f'{prediction}_votes') for prediction in PREDICTIONS}
+        return MatchVoteTally.cached_counts(self.pk)
+
     @property
     def total_votes(self):
-        return self.votes.count()
+        return sum(self.vote_counts.values())
 
     @property
     def vote_summary(self):
-        total = self.votes.count()
-        if total == 0:
-            return {"home_win": 0, "away_win": 0, "draw": 0}
-        return {
-            "home_win": round((self.votes.filter(prediction='home_win').count() / total) * 100, 1),
-            "away_win": round((self.votes.filter(prediction='away_win').count() / total) * 100, 1),
-            "draw": round((self.votes.filter(prediction='draw').count() / total) * 100, 1),
-        }
+        return summarize_votes(self.vote_counts)
 
 
 #  Vote Model
@@ -63,7 +107,139 @@ class Vote(models.Model):
 
     class Meta:
         unique_together = ('user', 'match')
+        indexes = [
+            models.Index(fields=['match', 'prediction']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} → {self.match} ({self.prediction})"
 
+
+#  Vote tally (one row per match). Vote writers never update it directly:
+#  they append VoteTallyDelta rows, which fold() adds in later.
+class MatchVoteTally(models.Model):
+    match = models.OneToOneField(Match, on_delete=models.CASCADE, primary_key=True, related_name='tally')
+    home_win = models.PositiveIntegerField(default=0)
+    draw = models.PositiveIntegerField(default=0)
+    away_win = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.match}: {self.home_win}/{self.draw}/{self.away_win}"
+
+    @classmethod
+    def apply(cls, match_id, added=None, removed=None):
+        """
+        Move one vote into `added` and/or out of `removed`.
+        Call inside the transaction that changes the Vote row.
+        """
+        if added == removed:
+            return
+        changes = {}
+        if added:
+            changes[added] = 1
+        if removed:
+            changes[removed] = -1
+        cls.record({match_id: changes})
+
+    @classmethod
+    def record(cls, deltas):
+        """
+        Append {match_id: {prediction: change}} as VoteTallyDelta rows with one
+        INSERT (no lock on the tally rows, so hot matches don't serialize their
+        voters) and move this process's cached counters along.
+        Call inside the transaction that changes the Vote rows.
+        """
+        rows = [
+            VoteTallyDelta(match_id=match_id, **{prediction: changes.get(prediction, 0) for prediction in PREDICTIONS})
+            for match_id, changes in deltas.items() if any(changes.values())
+        ]
+        if not rows:
+            return
+        VoteTallyDelta.objects.bulk_create(rows)
+        for row in rows:
+            key = cls.cache_key(row.match_id)
+            counts = cache.get(key)
+            if counts is not None:
+                cache.set(key, {
+                    prediction: max(counts[prediction] + getattr(row, prediction), 0) for prediction in PREDICTIONS
+                }, settings.VOTE_TALLY_CACHE_TIMEOUT)
+
+    @classmethod
+    def fold(cls, match_ids):
+        """
+        Add the matches' pending deltas to their tally rows and delete them.
+        Tallies another fold is working on are skipped (SKIP LOCKED), so this
+        never waits; their deltas stay pending for the next fold.
+        """
+        match_ids = sorted(set(match_ids), key=str)
+        if not match_ids:
+            return
+        try:
+            cls._fold(match_ids)
+        except IntegrityError:  # a match was deleted meanwhile; its deltas went with it
+            pass
+
+    @classmethod
+    def _fold(cls, match_ids):
+        with transaction.atomic():
+            cls.objects.bulk_create([cls(match_id=match_id) for match_id in match_ids], ignore_conflicts=True)
+            locked = list(
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(match_id__in=match_ids).order_by('pk').values_list('pk', flat=True)
+            )
+            pending = list(
+                VoteTallyDelta.objects.filter(match_id__in=locked).values_list('id', 'match_id', *PREDICTIONS)
+            )
+            if not pending:
+                return
+            sums = {}
+            for _, match_id, *changes in pending:
+                total = sums.setdefault(match_id, [0] * len(PREDICTIONS))
+                for i, change in enumerate(changes):
+                    total[i] += change
+            now = timezone.now()
+            for match_id, total in sums.items():
+                cls.objects.filter(match_id=match_id).update(**{
+                    prediction: Greatest(F(prediction) + change, Value(0))
+                    for prediction, change in zip(PREDICTIONS, total) if change
+                }, updated_at=now)
+            VoteTallyDelta.objects.filter(id__in=[row[0] for row in pending]).delete()
+
+    # Hot matches read their counters from the cache; entries expire quickly
+    # (VOTE_TALLY_CACHE_TIMEOUT) because each worker process has its own cache
+    @staticmethod
+    def cache_key(match_id):
+        return f'matchpredictions:tally:{match_id}'
+
+    @classmethod
+    def cached_counts(cls, match_id):
+        """{prediction: count} for a match (tally plus pending deltas), from the cache or one query"""
+        key = cls.cache_key(match_id)
+        counts = cache.get(key)
+        if counts is None:
+            row = (
+                Match.objects.filter(pk=match_id).with_vote_stats()
+                .values(*(f'{prediction}_votes' for prediction in PREDICTIONS)).first()
+            ) or {}
+            counts = {prediction: row.get(f'{prediction}_votes', 0) for prediction in PREDICTIONS}
+            cache.set(key, counts, settings.VOTE_TALLY_CACHE_TIMEOUT)
+        return counts
+
+    @classmethod
+    def forget(cls, *match_ids):
+        """Drop the matches' cached counters now and again once the surrounding transaction commits"""
+        keys = [cls.cache_key(match_id) for match_id in match_ids]
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+#  Vote count changes not yet folded into MatchVoteTally (append-only)
+class VoteTallyDelta(models.Model):
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='tally_deltas')
+    home_win = models.IntegerField(default=0)
+    draw = models.IntegerField(default=0)
+    away_win = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.match_id}: {self.home_win:+}/{self.draw:+}/{self.away_win:+}"
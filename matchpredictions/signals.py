@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .ingest import match_exists_key
+from .models import Match, MatchVoteTally, Vote
+
+
+@receiver(post_delete, sender=Match)
+def forget_match_exists(sender, instance, **kwargs):
+    """The vote hot path must stop accepting votes for a deleted match"""
+    cache.delete(match_exists_key(instance.pk))
+
+
+@receiver(post_delete, sender=Vote)
+def take_vote_off_tally(sender, instance, origin=None, **kwargs):
+    """
+    Every deleted vote comes off its match's tally, including the ones a
+    deleted account takes with it. Skipped when the match itself is being
+    deleted (directly or through its league or clubs): its tally goes too.
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if model in (Vote, get_user_model()):
+        MatchVoteTally.apply(instance.match_id, removed=instance.prediction)
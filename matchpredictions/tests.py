@@ -1,16 +1,18 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from datetime import datetime, timedelta
 from django.utils.timezone import make_aware
 
-from matchpredictions.models import Match, Vote
+from matchpredictions.models import Match, MatchVoteTally, Vote, VoteTallyDelta
+from matchpredictions.voting import cast_vote
 from matchpredictions.forms import MatchForm
 from club_directories.models import League, Club
 
 User = get_user_model()
 
 
+@override_settings(VOTE_INGEST_BATCH_SIZE=1)  # write API votes before answering
 class MatchPredictionViewTests(TestCase):
     """Full test suite for match prediction views and templates"""
 
@@ -202,3 +204,222 @@ class MatchPredictionViewTests(TestCase):
 
     
 
+
+    def _add_votes(self, *predictions):
+        for i, prediction in enumerate(predictions):
+            voter = User.objects.create_user(
+                username=f"voter{i}", email=f"voter{i}@example.com", full_name=f"Voter {i}", password="12345"
+            )
+            cast_vote(voter, self.match, prediction)
+
+    def test_with_vote_stats_annotates_counts_and_user_vote(self):
+        """Vote counts, percentages and the user's own vote come from one query"""
+        self._add_votes("home_win", "home_win", "draw")
+        cast_vote(self.user, self.match, "away_win")
+
+        with self.assertNumQueries(1):
+            match = Match.objects.with_vote_stats(user=self.user).get(id=self.match.id)
+            self.assertEqual(match.vote_counts, {"home_win": 2, "draw": 1, "away_win": 1})
+            self.assertEqual(match.total_votes, 4)
+            self.assertEqual(match.vote_summary, {"home_win": 50.0, "away_win": 25.0, "draw": 25.0})
+            self.assertEqual(match.user_prediction, "away_win")
+
+        # Plain instances still work, falling back to a query
+        self.assertEqual(self.match.vote_summary, match.vote_summary)
+
+    def test_json_matches_query_count_is_independent_of_match_count(self):
+        """show_json_matches no longer runs per-match vote queries"""
+        self.client.login(username="testuser", password="12345")
+        for _ in range(3):
+            Match.objects.create(
+                league=self.league, home_team=self.home_team, away_team=self.away_team,
+                match_date=make_aware(datetime.now() + timedelta(days=2)),
+            )
+        cast_vote(self.user, self.match, "draw")
+
+        with self.assertNumQueries(3):  # session, user, matches
+            response = self.client.get(reverse("matchpredictions:show_json_matches"))
+        data = {m["id"]: m for m in response.json()}
+        self.assertEqual(len(data), 4)
+        self.assertEqual(data[str(self.match.id)]["user_vote"], "draw")
+        self.assertEqual(data[str(self.match.id)]["vote_summary"], {"home_win": 0.0, "away_win": 0.0, "draw": 100.0})
+        self.assertEqual(data[str(self.match.id)]["total_votes"], 1)
+
+    def test_my_predictions_filter_keeps_everyone_in_the_counts(self):
+        """Filtering to the user's matches must not restrict the vote counts to that user"""
+        self._add_votes("home_win", "home_win")
+        cast_vote(self.user, self.match, "draw")
+        self.client.login(username="testuser", password="12345")
+
+        response = self.client.get(reverse("matchpredictions:main"), {"filter": "my"})
+        match = response.context["matches"][0]
+        self.assertEqual(match.total_votes, 3)
+        self.assertEqual(match.user_prediction, "draw")
+
+        response = self.client.get(reverse("matchpredictions:match_detail", args=[self.match.id]))
+        self.assertEqual(response.context["home_votes"], 2)
+        self.assertEqual(response.context["user_vote"], {"prediction": "draw"})
+
+    def _tally(self):
+        return MatchVoteTally.objects.filter(match=self.match).values("home_win", "draw", "away_win").first()
+
+    def test_vote_views_keep_tally_in_step(self):
+        """Voting, editing and deleting through every view moves the tally counters"""
+        self.client.login(username="testuser", password="12345")
+
+        self.client.post(reverse("matchpredictions:vote_match", args=[self.match.id]), {"prediction": "home_win"})
+        self.assertEqual(self._tally(), {"home_win": 1, "draw": 0, "away_win": 0})
+
+        self.client.post(reverse("matchpredictions:edit_vote", args=[self.match.id]), {"prediction": "draw"})
+        self.assertEqual(self._tally(), {"home_win": 0, "draw": 1, "away_win": 0})
+
+        self.client.post(reverse("matchpredictions:delete_vote", args=[self.match.id]))
+        self.assertEqual(self._tally(), {"home_win": 0, "draw": 0, "away_win": 0})
+
+        response = self.client.post(reverse("matchpredictions:vote_match_api", args=[self.match.id]), {"prediction": "away_win"})
+        self.assertEqual(response.json()["total_votes"], 1)
+        response = self.client.post(reverse("matchpredictions:vote_match_api", args=[self.match.id]), {"prediction": "away_win"})
+        self.assertEqual(self._tally(), {"home_win": 0, "draw": 0, "away_win": 1})
+
+        response = self.client.post(reverse("matchpredictions:delete_vote_api", args=[self.match.id]))
+        self.assertEqual(response.json()["total_votes"], 0)
+        self.assertEqual(self._tally(), {"home_win": 0, "draw": 0, "away_win": 0})
+
+    def test_vote_summary_reads_tally(self):
+        """A plain Match reads its summary with one primary-key lookup"""
+        self._add_votes("home_win", "draw")
+        with self.assertNumQueries(1):
+            self.assertEqual(self.match.vote_counts, {"home_win": 1, "draw": 1, "away_win": 0})
+
+    def test_rebuild_vote_tallies_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+        self._add_votes("home_win", "away_win")
+        Vote.objects.create(match=self.match, user=self.user, prediction="draw")  # bypasses the tally
+        MatchVoteTally.objects.filter(match=self.match).update(away_win=7)
+        self.assertEqual(MatchVoteTally.cached_counts(self.match.pk), {"home_win": 1, "draw": 0, "away_win": 7})
+
+        out = StringIO()
+        call_command("rebuild_vote_tallies", stdout=out)
+        self.assertIn("Rebuilt tallies for 1 matches (1 changed).", out.getvalue())
+        self.assertEqual(self._tally(), {"home_win": 1, "draw": 1, "away_win": 1})
+        self.assertEqual(MatchVoteTally.cached_counts(self.match.pk), {"home_win": 1, "draw": 1, "away_win": 1})
+
+    def test_vote_api_upserts_without_loading_the_match(self):
+        """The API path writes with INSERT ... ON CONFLICT and reads counters back from the cache"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.client.login(username="testuser", password="12345")
+        url = reverse("matchpredictions:vote_match_api", args=[self.match.id])
+        self.client.post(url, {"prediction": "home_win"})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {"prediction": "draw"})
+        self.assertEqual(response.json()["vote_summary"], {"home_win": 0.0, "away_win": 0.0, "draw": 100.0})
+        sql = [q["sql"] for q in queries.captured_queries]
+        self.assertFalse([q for q in sql if 'FROM "matchpredictions_match"' in q])
+        self.assertTrue([q for q in sql if "ON CONFLICT" in q])
+        self.assertEqual(Vote.objects.get(user=self.user, match=self.match).prediction, "draw")
+        self.assertEqual(self._tally(), {"home_win": 0, "draw": 1, "away_win": 0})
+
+    def test_vote_api_rejects_unknown_match_and_prediction(self):
+        import uuid
+        self.client.login(username="testuser", password="12345")
+        response = self.client.post(reverse("matchpredictions:vote_match_api", args=[uuid.uuid4()]), {"prediction": "draw"})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(reverse("matchpredictions:vote_match_api", args=[self.match.id]), {"prediction": "x"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Vote.objects.exists())
+
+    def test_vote_buffer_batches_and_coalesces(self):
+        """Buffered votes are written together once the batch is full"""
+        from matchpredictions.ingest import VoteBuffer
+        buffer = VoteBuffer(batch_size=2, max_delay=60)
+        other = User.objects.create_user(username="other", email="other@example.com", full_name="Other", password="12345")
+
+        buffer.add(self.user.pk, self.match.pk, "home_win")
+        buffer.add(self.user.pk, self.match.pk, "away_win")  # replaces the pending vote
+        self.assertFalse(Vote.objects.exists())
+
+        buffer.add(other.pk, self.match.pk, "away_win")
+        self.assertIsNone(buffer.timer)
+        self.assertEqual(Vote.objects.get(user=self.user).prediction, "away_win")
+        self.assertEqual(self._tally(), {"home_win": 0, "draw": 0, "away_win": 2})
+        self.assertEqual(self.match.total_votes, 2)
+
+    def test_ingest_moves_tally_by_deltas(self):
+        """Flushed votes add and move counters instead of recounting the match"""
+        from django.core.cache import cache
+        from matchpredictions.ingest import flush_votes, match_exists, match_exists_key
+        cast_vote(self.user, self.match, "home_win")
+        MatchVoteTally.objects.filter(match=self.match).update(draw=5)  # counters untouched by a recount
+
+        flush_votes({(self.user.pk, self.match.pk): "away_win", (self.admin.pk, self.match.pk): "draw"})
+        self.assertEqual(self._tally(), {"home_win": 0, "draw": 6, "away_win": 1})
+        flush_votes({(self.user.pk, self.match.pk): "away_win"})  # unchanged
+        self.assertEqual(self._tally(), {"home_win": 0, "draw": 6, "away_win": 1})
+
+        self.assertTrue(match_exists(self.match.pk))
+        self.match.delete()
+        self.assertIsNone(cache.get(match_exists_key(self.match.pk)))
+
+
+    def test_ingest_appends_deltas_without_touching_the_tally(self):
+        """Votes only lock their own rows; the tally catches up when deltas are folded"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from matchpredictions.ingest import write_votes
+        with CaptureQueriesContext(connection) as queries:
+            write_votes({(self.user.pk, self.match.pk): "draw", (self.admin.pk, self.match.pk): "draw"})
+        self.assertFalse([q for q in queries.captured_queries if "matchvotetally" in q["sql"]])
+        self.assertEqual(len(queries.captured_queries), 6)  # savepoint, voters, new votes, inserted check, deltas, release
+        self.assertEqual(Match.objects.with_vote_stats().get(pk=self.match.pk).vote_counts["draw"], 2)
+
+        MatchVoteTally.fold([self.match.pk])
+        self.assertEqual(self._tally(), {"home_win": 0, "draw": 2, "away_win": 0})
+        self.assertFalse(VoteTallyDelta.objects.exists())
+
+class VoteIngestTransactionTests(TransactionTestCase):
+    """Foreign keys are only checked on commit, so these run outside a test transaction"""
+
+    def test_votes_for_a_deleted_match_are_dropped(self):
+        import uuid
+        from matchpredictions.ingest import flush_votes
+        user = User.objects.create_user(username="fan", email="fan@example.com", full_name="Fan", password="12345")
+        league = League.objects.create(name="Premier League")
+        match = Match.objects.create(
+            league=league,
+            home_team=Club.objects.create(name="Chelsea", league=league),
+            away_team=Club.objects.create(name="Arsenal", league=league),
+            match_date=make_aware(datetime.now() + timedelta(days=1)),
+        )
+
+        flush_votes({(user.pk, match.pk): "draw", (user.pk, uuid.uuid4()): "home_win"})
+        self.assertEqual(list(Vote.objects.values_list("match_id", "prediction")), [(match.pk, "draw")])
+        self.assertEqual(MatchVoteTally.objects.get(match=match).draw, 1)
+
+    def test_deleted_votes_come_off_the_tally(self):
+        """Cascades from an account take votes off the tally; a match's own deletion doesn't write deltas"""
+        league = League.objects.create(name="Premier League")
+        match = Match.objects.create(
+            league=league,
+            home_team=Club.objects.create(name="Chelsea", league=league),
+            away_team=Club.objects.create(name="Arsenal", league=league),
+            match_date=make_aware(datetime.now() + timedelta(days=1)),
+        )
+        fans = [
+            User.objects.create_user(username=f"fan{i}", email=f"fan{i}@example.com", full_name="Fan", password="12345")
+            for i in range(3)
+        ]
+        for fan in fans:
+            cast_vote(fan, match, "draw")
+
+        fans[0].delete()
+        User.objects.filter(pk=fans[1].pk).delete()
+        self.assertEqual(Match.objects.with_vote_stats().get(pk=match.pk).vote_counts["draw"], 1)
+        MatchVoteTally.fold([match.pk])
+        self.assertEqual(MatchVoteTally.objects.get(match=match).draw, 1)
+
+        league.delete()
+        self.assertFalse(Vote.objects.exists())
+        self.assertFalse(VoteTallyDelta.objects.exists())
@@ -1,8 +1,10 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import JsonResponse, HttpResponse
-from .models import Match, Vote, League, Club
+from django.http import JsonResponse, HttpResponse, Http404
+from .models import Match, MatchVoteTally, Vote, League, Club, summarize_votes
 from .forms import MatchForm
+from .voting import cast_vote, remove_vote
+from .ingest import ingest_vote, match_exists
 from django.db.models import Q
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt
@@ -23,7 +25,11 @@ def main_view(request):
     search_query = request.GET.get('search', '').strip()
     filter_type = request.GET.get('filter', 'all')  #  "all" or "my"
 
-    matches = Match.objects.all().order_by('match_date')
+    matches = (
+        Match.objects.select_related('league', 'home_team', 'away_team')
+        .with_vote_stats(user=request.user)
+        .order_by('match_date')
+    )
 
     #  League filter
     if selected_league_id:
@@ -38,12 +44,13 @@ def main_view(request):
 
     #  My Predictions filter
     if filter_type == 'my' and request.user.is_authenticated:
-        matches = matches.filter(votes__user=request.user)  #  FIXED HERE
+        # Subquery instead of a join so the vote counts still cover every user
+        matches = matches.filter(id__in=Vote.objects.filter(user=request.user).values('match_id'))
     elif filter_type == 'my' and not request.user.is_authenticated:
         matches = Match.objects.none()  #  avoids exposing all matches to guests
 
     return render(request, 'matchpredictions/main.html', {
-        'matches': matches.distinct(),
+        'matches': matches,
         'leagues': leagues,
         'selected_league_id': selected_league_id,
         'filter_type': filter_type,
@@ -52,29 +59,20 @@ def main_view(request):
 
 # 🔵 DETAIL PAGE (Voting)
 def match_detail(request, match_id):
-    match = get_object_or_404(Match, id=match_id)
-    user_vote = None
-
-    if request.user.is_authenticated:
-        user_vote = Vote.objects.filter(user=request.user, match=match).first()
-
-    #  Precompute the counts
-    total_votes = match.votes.count()
-    home_votes = match.votes.filter(prediction="home_win").count()
-    draw_votes = match.votes.filter(prediction="draw").count()
-    away_votes = match.votes.filter(prediction="away_win").count()
-
-    #  Use existing percentage logic
-    vote_summary = match.vote_summary
+    match = get_object_or_404(
+        Match.objects.select_related('league', 'home_team', 'away_team').with_vote_stats(user=request.user),
+        id=match_id
+    )
+    user_prediction = getattr(match, 'user_prediction', None)
 
     return render(request, 'matchpredictions/match_detail.html', {
         'match': match,
-        'user_vote': user_vote,
-        'vote_summary': vote_summary,
-        'total_votes': total_votes,
-        'home_votes': home_votes,
-        'draw_votes': draw_votes,
-        'away_votes': away_votes,
+        'user_vote': {'prediction': user_prediction} if user_prediction else None,
+        'vote_summary': match.vote_summary,
+        'total_votes': match.total_votes,
+        'home_votes': match.home_win_votes,
+        'draw_votes': match.draw_votes,
+        'away_votes': match.away_win_votes,
     })
 
 
@@ -89,13 +87,7 @@ def vote_match(request, match_id):
         prediction = request.POST.get("prediction")
 
         if prediction in ["home_win", "away_win", "draw"]:
-            Vote.objects.update_or_create(
-                user=request.user,
-                match=match,
-                defaults={
-                    "prediction": prediction,
-                }
-            )
+            cast_vote(request.user, match, prediction)
     return redirect('matchpredictions:match_detail', match_id=match.id)
 
 
@@ -156,8 +148,7 @@ def edit_vote(request, match_id):
     if request.method == "POST":
         prediction = request.POST.get("prediction")
         if prediction in ["home_win", "away_win", "draw"]:
-            vote.prediction = prediction
-            vote.save()
+            cast_vote(request.user, match, prediction)
             messages.success(request, f"Your vote has been updated to '{prediction.replace('_', ' ').title()}'!")
             return redirect('matchpredictions:match_detail', match_id=match.id)
 
@@ -177,7 +168,7 @@ def delete_vote(request, match_id):
         return redirect('matchpredictions:match_detail', match_id=match.id)
 
     if request.method == "POST":
-        vote.delete()
+        remove_vote(vote)
         messages.success(request, "Your vote has been deleted successfully.")
         return redirect('matchpredictions:match_detail', match_id=match.id)
 
@@ -193,7 +184,7 @@ def show_json_matches(request):
 
     matches = Match.objects.select_related(
         "league", "home_team", "away_team"
-    )
+    ).with_vote_stats(user=request.user)
 
     if selected_league_id:
         matches = matches.filter(league__id=selected_league_id)
@@ -205,20 +196,13 @@ def show_json_matches(request):
         )
 
     if filter_type == 'my' and request.user.is_authenticated:
-        matches = matches.filter(votes__user=request.user).distinct()
+        matches = matches.filter(id__in=Vote.objects.filter(user=request.user).values('match_id'))
     elif filter_type == 'my':
         matches = Match.objects.none()
 
     data = []
 
     for match in matches:
-        # 🔥 THIS IS THE CRITICAL PART
-        user_vote = None
-        if request.user.is_authenticated:
-            vote = match.votes.filter(user=request.user).first()
-            if vote:
-                user_vote = vote.prediction
-
         data.append({
             "id": str(match.id),
             "league": {
@@ -237,7 +221,7 @@ def show_json_matches(request):
             "status": match.status,
             "total_votes": match.total_votes,
             "vote_summary": match.vote_summary,
-            "user_vote": user_vote,
+            "user_vote": getattr(match, 'user_prediction', None),
         })
 
     return JsonResponse(data, safe=False)
@@ -246,22 +230,22 @@ def show_json_matches(request):
 @login_required
 @require_POST
 def vote_match_api(request, match_id):
-    match = get_object_or_404(Match, id=match_id)
+    # Hot path: one upsert per vote (or per batch), counters served from the cache
     prediction = request.POST.get("prediction")
 
     if prediction not in ["home_win", "away_win", "draw"]:
         return JsonResponse({"error": "Invalid prediction"}, status=400)
 
-    Vote.objects.update_or_create(
-        user=request.user,
-        match=match,
-        defaults={"prediction": prediction},
-    )
+    if not match_exists(match_id):
+        raise Http404("Match not found")
+
+    ingest_vote(request.user.pk, match_id, prediction)
+    counts = MatchVoteTally.cached_counts(match_id)
 
     return JsonResponse({
         "message": "Vote recorded",
-        "vote_summary": match.vote_summary,
-        "total_votes": match.total_votes,
+        "vote_summary": summarize_votes(counts),
+        "total_votes": sum(counts.values()),
     })
 
 @csrf_exempt
@@ -278,7 +262,7 @@ def delete_vote_api(request, match_id):
     if not vote:
         return JsonResponse({"error": "Vote not found"}, status=404)
 
-    vote.delete()
+    remove_vote(vote)
 
     match = Match.objects.get(id=match_id)
 
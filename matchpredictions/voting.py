@@ -0,0 +1,32 @@
+from django.db import transaction
+
+from .models import MatchVoteTally, Vote
+
+
+def cast_vote(user, match, prediction):
+    """Create or change a user's vote and record the tally change in the same transaction"""
+    with transaction.atomic():
+        vote = Vote.objects.select_for_update().filter(user=user, match=match).first()
+        if vote is None:
+            vote = Vote.objects.create(user=user, match=match, prediction=prediction)
+            MatchVoteTally.apply(match.pk, added=prediction)
+        elif vote.prediction != prediction:
+            previous = vote.prediction
+            vote.prediction = prediction
+            vote.save(update_fields=['prediction'])
+            MatchVoteTally.apply(match.pk, added=prediction, removed=previous)
+    MatchVoteTally.fold([match.pk])
+    return vote
+
+
+def remove_vote(vote):
+    """
+    Delete a vote; the post_delete signal takes it off the match tally.
+    The row is locked first so the prediction taken off is the current one
+    (and a vote deleted concurrently is only taken off once).
+    """
+    with transaction.atomic():
+        current = Vote.objects.select_for_update().filter(pk=vote.pk).first()
+        if current is not None:
+            current.delete()
+    MatchVoteTally.fold([vote.match_id])
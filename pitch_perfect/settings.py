@@ -75,6 +75,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'authentication.middleware.TokenAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -185,4 +186,23 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Forum image proxy cache (see forum/image_cache.py)
+IMAGE_PROXY_CACHE_DIR = os.getenv('IMAGE_PROXY_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'image_proxy'))
+IMAGE_PROXY_CACHE_MAX_BYTES = 256 * 1024 * 1024
+IMAGE_PROXY_MAX_IMAGE_BYTES = 5 * 1024 * 1024
+IMAGE_PROXY_TTL = 60 * 60 * 24  # revalidate with the origin once a day
+
+# Match prediction vote ingestion (see matchpredictions/ingest.py)
+VOTE_TALLY_CACHE_TIMEOUT = 5  # seconds a worker may serve cached vote counters
+VOTE_INGEST_BATCH_SIZE = int(os.getenv('VOTE_INGEST_BATCH_SIZE', 50))  # 1 = write every vote immediately
+VOTE_INGEST_MAX_DELAY = 0.5  # seconds a buffered vote may wait before it is flushed
+
+# Bearer tokens for the mobile API (see authentication/tokens.py)
+ACCESS_TOKEN_TTL = 60 * 15  # seconds
+REFRESH_TOKEN_TTL = 60 * 60 * 24 * 14
+# Cache for the users behind access tokens. With the default per-process
+# cache a password change or deactivation reaches other workers only when
+# their entry expires, so keep the timeout short (or use a shared backend)
+TOKEN_USER_CACHE = 'default'
+TOKEN_USER_CACHE_TIMEOUT = 5  # seconds a token request may see a stale user
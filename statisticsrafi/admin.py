@@ -3,10 +3,15 @@ from .models import (
     Award,
     Vote, ClubRanking, TeamStatistics, ClubVote
 )
-from club_directories.models import Club, League
+from club_directories.models import Club, ClubAlias, League
+
+class ClubAliasInline(admin.TabularInline):
+    model = ClubAlias
+    extra = 1
 
 @admin.register(Club)
 class ClubAdmin(admin.ModelAdmin):
+    inlines = [ClubAliasInline]
     list_display = ['name', 'league', 'founded_year']
     list_filter = ['league']
     search_fields = ['name', 'league__name']
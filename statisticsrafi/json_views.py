@@ -5,61 +5,83 @@ from django.views.decorators.http import require_POST, require_GET
 from django.db.models import Count, Q
 from django.contrib.auth import get_user_model
 import json
+import uuid
 from .models import (
-    Club, Award, Vote, ClubRanking, TeamStatistics, ClubVote
+    Club, Award, Vote, ClubRanking, TeamStatistics, ClubVote, TEAM_STAT_METRICS
 )
 from club_directories.models import League
+from .leaderboards import get_leaderboards
+from .stats_matrix import get_stats_matrix
 
 User = get_user_model()
 
-def team_stats_to_dict(stat):
-    """Helper to convert TeamStatistics object to dictionary"""
-    return {
-        'club_name': stat.club.name,
-        'club_id': str(stat.club.id),
-        'logo_url': stat.club.logo_url,
-        'season': stat.season,
-        'matches_played': stat.matches_played,
-        'wins': stat.wins,
-        'draws': stat.draws,
-        'losses': stat.losses,
-        'win_percentage': stat.win_percentage,
-        'scored_per_match': float(stat.scored_per_match or 0),
-        'conceded_per_match': float(stat.conceded_per_match or 0),
-        'avg_match_goals': float(stat.avg_match_goals or 0),
-        'clean_sheets_percentage': float(stat.clean_sheets_percentage or 0),
-        'failed_to_score_percentage': float(stat.failed_to_score_percentage or 0),
-        'possession_avg': float(stat.possession_avg or 0),
-        'shots_taken_per_match': float(stat.shots_taken_per_match or 0),
-        'shots_conversion_rate': float(stat.shots_conversion_rate or 0),
-        'fouls_committed_per_match': float(stat.fouls_committed_per_match or 0),
-        'fouled_against_per_match': float(stat.fouled_against_per_match or 0),
-        'penalties_won': stat.penalties_won,
-        'penalties_conceded': stat.penalties_conceded,
-        'goal_kicks_per_match': float(stat.goal_kicks_per_match or 0),
-        'throw_ins_per_match': float(stat.throw_ins_per_match or 0),
-        'free_kicks_per_match': float(stat.free_kicks_per_match or 0),
-    }
+def _decimal(field):
+    return lambda stat: float(getattr(stat, field) or 0)
+
+
+# Output key -> (getter, model fields it reads). Drives both team_stats_to_dict
+# and the field projection of get_specific_stat_json.
+TEAM_STATS_FIELDS = {
+    'club_name': (lambda stat: stat.club.name, ['club__name']),
+    'club_id': (lambda stat: str(stat.club_id), ['club']),
+    'logo_url': (lambda stat: stat.club.logo_url, ['club__logo_url']),
+    'season': (lambda stat: stat.season, ['season']),
+    'matches_played': (lambda stat: stat.matches_played, ['wins', 'draws', 'losses']),
+    'wins': (lambda stat: stat.wins, ['wins']),
+    'draws': (lambda stat: stat.draws, ['draws']),
+    'losses': (lambda stat: stat.losses, ['losses']),
+    'win_percentage': (lambda stat: stat.win_percentage, ['wins', 'draws', 'losses']),
+    'scored_per_match': (_decimal('scored_per_match'), ['scored_per_match']),
+    'conceded_per_match': (_decimal('conceded_per_match'), ['conceded_per_match']),
+    'avg_match_goals': (_decimal('avg_match_goals'), ['avg_match_goals']),
+    'clean_sheets_percentage': (_decimal('clean_sheets_percentage'), ['clean_sheets_percentage']),
+    'failed_to_score_percentage': (_decimal('failed_to_score_percentage'), ['failed_to_score_percentage']),
+    'possession_avg': (_decimal('possession_avg'), ['possession_avg']),
+    'shots_taken_per_match': (_decimal('shots_taken_per_match'), ['shots_taken_per_match']),
+    'shots_conversion_rate': (_decimal('shots_conversion_rate'), ['shots_conversion_rate']),
+    'fouls_committed_per_match': (_decimal('fouls_committed_per_match'), ['fouls_committed_per_match']),
+    'fouled_against_per_match': (_decimal('fouled_against_per_match'), ['fouled_against_per_match']),
+    'penalties_won': (lambda stat: stat.penalties_won, ['penalties_won']),
+    'penalties_conceded': (lambda stat: stat.penalties_conceded, ['penalties_conceded']),
+    'goal_kicks_per_match': (_decimal('goal_kicks_per_match'), ['goal_kicks_per_match']),
+    'throw_ins_per_match': (_decimal('throw_ins_per_match'), ['throw_ins_per_match']),
+    'free_kicks_per_match': (_decimal('free_kicks_per_match'), ['free_kicks_per_match']),
+}
+DEFAULT_TEAM_STATS_FIELDS = list(TEAM_STATS_FIELDS)
+
+# Only returned when asked for with ?fields=
+TEAM_STATS_FIELDS['xg_for_per_match'] = (_decimal('xg_for_per_match'), ['xg_for_per_match'])
+TEAM_STATS_FIELDS['xg_against_per_match'] = (_decimal('xg_against_per_match'), ['xg_against_per_match'])
+
+# Old category names of json/list/<category>/ kept as aliases
+METRIC_ALIASES = {
+    'goals': 'scored_per_match',
+    'possession': 'possession_avg',
+    'clean_sheets': 'clean_sheets_percentage',
+}
+
+STATS_LIST_MAX_LIMIT = 500
+COMPARE_MAX_CLUBS = 10
+SIMILAR_MAX_K = 20
+
+
+def team_stats_to_dict(stat, fields=None):
+    """Helper to convert TeamStatistics object to dictionary (all keys, or only `fields`)"""
+    return {key: TEAM_STATS_FIELDS[key][0](stat) for key in (fields or DEFAULT_TEAM_STATS_FIELDS)}
 
 @require_GET
 def get_general_stats_json(request):
     """API for the main statistics dashboard"""
     season = request.GET.get('season', '2025/26')
-    
-    # Top 10 Goals
-    top_goals = TeamStatistics.objects.filter(season=season).order_by('-scored_per_match')[:10]
-    top_goals_data = [team_stats_to_dict(stat) for stat in top_goals]
-    
-    # Top 10 Possession
-    top_possession = TeamStatistics.objects.filter(season=season).order_by('-possession_avg')[:10]
-    top_possession_data = [team_stats_to_dict(stat) for stat in top_possession]
-    
-    # Top 10 Clean Sheets
-    top_clean_sheets = TeamStatistics.objects.filter(season=season).order_by('-clean_sheets_percentage')[:10]
-    top_clean_sheets_data = [team_stats_to_dict(stat) for stat in top_clean_sheets]
+    leaderboards = get_leaderboards(season)
+
+    # Top 10 Goals / Possession / Clean Sheets
+    top_goals_data = [team_stats_to_dict(stat) for stat in leaderboards['top_goals']]
+    top_possession_data = [team_stats_to_dict(stat) for stat in leaderboards['top_possession']]
+    top_clean_sheets_data = [team_stats_to_dict(stat) for stat in leaderboards['top_clean_sheets']]
     
     # Top 10 Rankings
-    rankings = ClubRanking.objects.order_by('rank')[:10]
+    rankings = leaderboards['club_rankings'][:10]
     rankings_data = [{
         'club_name': r.club.name,
         'club_id': str(r.club.id),
@@ -80,21 +102,54 @@ def get_general_stats_json(request):
 
 @require_GET
 def get_specific_stat_json(request, category):
-    """API for specific full lists"""
+    """
+    API for full lists
+    - category: any numeric TeamStatistics column (see TEAM_STAT_METRICS),
+      one of the old aliases (goals, possession, clean_sheets), or rankings / awards
+    - ?league=<id> only clubs from that league
+    - ?limit=<k> top k rows
+    - ?order=asc lowest first (default highest first, rows without a value last)
+    - ?fields=club_name,scored_per_match only return these keys
+    """
     season = request.GET.get('season', '2025/26')
     data = []
-    
-    if category == 'goals':
-        stats = TeamStatistics.objects.filter(season=season).order_by('-scored_per_match')
-        data = [team_stats_to_dict(s) for s in stats]
-    elif category == 'possession':
-        stats = TeamStatistics.objects.filter(season=season).order_by('-possession_avg')
-        data = [team_stats_to_dict(s) for s in stats]
-    elif category == 'clean_sheets':
-        stats = TeamStatistics.objects.filter(season=season).order_by('-clean_sheets_percentage')
-        data = [team_stats_to_dict(s) for s in stats]
+    metric = METRIC_ALIASES.get(category, category)
+
+    if metric in TEAM_STAT_METRICS:
+        fields = [f for f in request.GET.get('fields', '').split(',') if f.strip()]
+        unknown = [f for f in fields if f not in TEAM_STATS_FIELDS]
+        if unknown:
+            return JsonResponse({'error': f"Unknown fields: {', '.join(unknown)}"}, status=400)
+
+        try:
+            limit = int(request.GET['limit']) if request.GET.get('limit') else STATS_LIST_MAX_LIMIT
+        except ValueError:
+            return JsonResponse({'error': 'Invalid limit'}, status=400)
+        limit = max(1, min(limit, STATS_LIST_MAX_LIMIT))
+
+        ordering = metric if request.GET.get('order') == 'asc' else f'-{metric}'
+        stats = TeamStatistics.objects.filter(season=season)
+        if request.GET.get('league'):
+            try:
+                stats = stats.filter(club__league_id=uuid.UUID(request.GET['league']))
+            except ValueError:
+                return JsonResponse({'error': 'Invalid league'}, status=400)
+        if fields:
+            sources = {source for f in fields for source in TEAM_STATS_FIELDS[f][1]}
+            stats = stats.only(*sources)
+            if any(source.startswith('club__') for source in sources):
+                stats = stats.select_related('club')
+        else:
+            stats = stats.select_related('club')
+
+        # Rows with a value come straight off the (season, metric) index;
+        # rows without one are only fetched to fill up the top k
+        rows = list(stats.filter(**{f'{metric}__isnull': False}).order_by(ordering, 'id')[:limit])
+        if len(rows) < limit:
+            rows += stats.filter(**{f'{metric}__isnull': True}).order_by('id')[:limit - len(rows)]
+        data = [team_stats_to_dict(s, fields) for s in rows]
     elif category == 'rankings':
-        ranks = ClubRanking.objects.order_by('rank')
+        ranks = ClubRanking.objects.select_related('club').order_by('rank')
         data = [{
             'club_name': r.club.name,
             'club_id': str(r.club.id),
@@ -128,7 +183,9 @@ def get_specific_stat_json(request, category):
                 'award_count': club.award_count,
                 'awards': awards_list
             })
-            
+    else:
+        return JsonResponse({'error': f'Unknown category: {category}'}, status=400)
+
     return JsonResponse({'results': data, 'category': category, 'season': season})
 
 @require_GET
@@ -164,6 +221,7 @@ def get_team_detail_json(request, club_id):
             'founded': club.founded_year
         },
         'stats': team_stats_to_dict(team_stats) if team_stats else None,
+        'profile': get_stats_matrix(team_stats.season).profile(club.id) if team_stats else None,
         'ranking': {
             'rank': club_ranking.rank,
             'points': float(club_ranking.points),
@@ -179,6 +237,57 @@ def get_team_detail_json(request, club_id):
     
     return JsonResponse(response_data)
 
+@require_GET
+def compare_clubs_json(request):
+    """
+    API for comparing any number of clubs, served from the in-memory stats matrix
+    - ?clubs=<id>,<id>,... (2 to COMPARE_MAX_CLUBS)
+    - ?season=2025/26
+    """
+    season = request.GET.get('season', '2025/26')
+    try:
+        club_ids = [str(uuid.UUID(c)) for c in request.GET.get('clubs', '').split(',') if c.strip()]
+    except ValueError:
+        return JsonResponse({'error': 'Invalid club id'}, status=400)
+    if not 2 <= len(club_ids) <= COMPARE_MAX_CLUBS:
+        return JsonResponse({'error': f'Pass between 2 and {COMPARE_MAX_CLUBS} clubs'}, status=400)
+
+    try:
+        matrix = get_stats_matrix(season)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'season': season,
+        'clubs': [{
+            'club_id': club_id,
+            'club_name': matrix.club_name(club_id),
+            'has_stats': club_id in matrix,
+        } for club_id in club_ids],
+        'metrics': matrix.compare(club_ids),
+    })
+
+@require_GET
+def get_similar_clubs_json(request, club_id):
+    """
+    API for clubs that play like this one (nearest neighbours over the style metrics)
+    - ?k=5 number of clubs (at most SIMILAR_MAX_K)
+    - ?season=2025/26
+    """
+    season = request.GET.get('season', '2025/26')
+    try:
+        k = int(request.GET.get('k', 5))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid k'}, status=400)
+    k = max(1, min(k, SIMILAR_MAX_K))
+
+    try:
+        similar = get_stats_matrix(season).similar(club_id, k)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if similar is None:
+        return JsonResponse({'error': 'No statistics for this club in this season'}, status=404)
+    return JsonResponse({'club_id': str(club_id), 'season': season, 'results': similar})
+
 @csrf_exempt
 @require_POST
 def vote_club_json(request):
@@ -0,0 +1,70 @@
+import time
+
+from django.core.cache import cache
+
+from .models import ClubRanking, TeamStatistics
+
+CURRENT_SEASON = '2025/26'
+
+# Dashboard leaderboard name -> TeamStatistics column it is sorted by (descending)
+LEADERBOARDS = {
+    'top_goals': 'scored_per_match',
+    'top_possession': 'possession_avg',
+    'top_clean_sheets': 'clean_sheets_percentage',
+}
+LEADERBOARD_SIZE = 10
+RANKINGS_SIZE = 20
+
+# Upper bound on staleness when the cache isn't shared between processes
+# (e.g. after load_team_stats runs in its own process with the default LocMemCache)
+LEADERBOARD_CACHE_TIMEOUT = 60 * 15
+
+VERSION_KEY = 'statisticsrafi:stats-version'
+
+
+def stats_version():
+    """Token that changes whenever TeamStatistics or ClubRanking data changes"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def bump_stats_version():
+    """Invalidate every cached leaderboard (called by signals and load_team_stats)"""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def _sorted_desc(stats, field):
+    """Highest first, rows without a value last (like ORDER BY ... DESC NULLS LAST)"""
+    with_value = [stat for stat in stats if getattr(stat, field) is not None]
+    without_value = [stat for stat in stats if getattr(stat, field) is None]
+    return sorted(with_value, key=lambda stat: getattr(stat, field), reverse=True) + without_value
+
+
+def build_leaderboards(season):
+    """All dashboard leaderboards for a season from one TeamStatistics query and one rankings query"""
+    stats = list(TeamStatistics.objects.filter(season=season).select_related('club__league'))
+    leaderboards = {
+        name: _sorted_desc(stats, field)[:LEADERBOARD_SIZE]
+        for name, field in LEADERBOARDS.items()
+    }
+    leaderboards['club_rankings'] = list(
+        ClubRanking.objects.select_related('club__league').order_by('rank')[:RANKINGS_SIZE]
+    )
+    return leaderboards
+
+
+def get_leaderboards(season=CURRENT_SEASON):
+    """
+    Cached build_leaderboards(). Keys include the data version, so a bump
+    makes every season rebuild on its next request.
+    """
+    key = f'statisticsrafi:leaderboards:{season}:{stats_version()}'
+    leaderboards = cache.get(key)
+    if leaderboards is None:
+        leaderboards = build_leaderboards(season)
+        cache.set(key, leaderboards, LEADERBOARD_CACHE_TIMEOUT)
+    return leaderboards
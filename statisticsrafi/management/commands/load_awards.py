@@ -1,5 +1,4 @@
-from django.core.management.base import BaseCommand
-from club_directories.models import Club
+from club_directories.loaders import BulkLoadCommand, BulkLoader
 from statisticsrafi.models import Award
 from datetime import date
 
@@ -116,7 +115,26 @@ CLUB_AWARDS = [
 ]
 
 
-class Command(BaseCommand):
+class AwardLoader(BulkLoader):
+    model = Award
+    key_fields = ('club', 'title', 'season')
+    update_fields = ('award_type', 'date_awarded', 'description')
+
+    def build(self, row):
+        club = self.club(row['club_name'])
+        if club is None:
+            return self.skip(row, f"award '{row['title']}' (club '{row['club_name']}' not found)")
+        return Award(
+            club=club,
+            award_type=row['award_type'],
+            title=row['title'],
+            season=row['season'],
+            date_awarded=date.fromisoformat(row['date']),
+            description=row['description'],
+        )
+
+
+class Command(BulkLoadCommand):
     help = 'Loads club awards data into the database'
 
     def add_arguments(self, parser):
@@ -133,58 +151,7 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS('Existing club awards deleted.'))
 
         self.stdout.write(self.style.NOTICE('Loading club awards...'))
-        
-        awards_created = 0
-        awards_updated = 0
-        awards_skipped = 0
-
-        for award_data in CLUB_AWARDS:
-            club_name = award_data['club_name']
-            
-            # Find the club
-            try:
-                club = Club.objects.get(name=club_name)
-            except Club.DoesNotExist:
-                self.stdout.write(self.style.ERROR(f"  Club '{club_name}' not found. Skipping award: {award_data['title']}"))
-                awards_skipped += 1
-                continue
-            
-            # Parse the date
-            date_parts = award_data['date'].split('-')
-            award_date = date(int(date_parts[0]), int(date_parts[1]), int(date_parts[2]))
-            
-            # Check if award already exists
-            existing_award = Award.objects.filter(
-                club=club,
-                title=award_data['title'],
-                season=award_data['season']
-            ).first()
-            
-            if existing_award:
-                # Update existing award
-                existing_award.award_type = award_data['award_type']
-                existing_award.date_awarded = award_date
-                existing_award.description = award_data['description']
-                existing_award.save()
-                awards_updated += 1
-                self.stdout.write(f"  Updated: {club_name} - {award_data['title']}")
-            else:
-                # Create new award
-                Award.objects.create(
-                    club=club,
-                    award_type=award_data['award_type'],
-                    title=award_data['title'],
-                    season=award_data['season'],
-                    date_awarded=award_date,
-                    description=award_data['description']
-                )
-                awards_created += 1
-                self.stdout.write(f"  Created: {club_name} - {award_data['title']}")
-
-        self.stdout.write(self.style.SUCCESS(f'\n*** Awards loading complete! ***'))
-        self.stdout.write(self.style.SUCCESS(f'   Created: {awards_created} awards'))
-        self.stdout.write(self.style.SUCCESS(f'   Updated: {awards_updated} awards'))
-        self.stdout.write(self.style.SUCCESS(f'   Skipped: {awards_skipped} awards'))
-        self.stdout.write(self.style.SUCCESS(f'   Total club awards in database: {Award.objects.filter(club__isnull=False).count()}'))
-
-
+        self.report('Awards', AwardLoader().load(CLUB_AWARDS))
+        self.stdout.write(self.style.SUCCESS(
+            f'   Total club awards in database: {Award.objects.filter(club__isnull=False).count()}'
+        ))
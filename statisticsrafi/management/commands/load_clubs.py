@@ -1,5 +1,4 @@
-from django.core.management.base import BaseCommand
-from club_directories.models import League, Club
+from club_directories.loaders import LeaguesAndClubsCommand
 
 LEAGUES_DATA = {
     "Premier League": {"region": "UK", "logo_path": "images/leagues/premier_league.png"},
@@ -125,43 +124,7 @@ CLUBS_DATA = [
 ]
 
 
-class Command(BaseCommand):
-    help = 'Loads initial league and club data from a predefined list.'
-
-    def handle(self, *args, **options):
-        self.stdout.write(self.style.WARNING('Deleting existing club and league data...'))
-        Club.objects.all().delete()
-        League.objects.all().delete()
-
-        self.stdout.write(self.style.NOTICE('Creating leagues...'))
-        league_objects = {}
-        for league_name, league_data in LEAGUES_DATA.items():
-            league = League.objects.create(
-                name=league_name,
-                region=league_data['region'],
-                logo_path=league_data['logo_path']
-            )
-            league_objects[league_name] = league
-        
-        self.stdout.write(self.style.SUCCESS(f'Successfully created {len(league_objects)} leagues.'))
-
-        self.stdout.write(self.style.NOTICE('Creating clubs...'))
-        clubs_created_count = 0
-        for club_data in CLUBS_DATA:
-            league_name = club_data.get('league_name')
-            league_obj = league_objects.get(league_name)
-
-            if not league_obj:
-                self.stdout.write(self.style.ERROR(f"Could not find league '{league_name}' for club '{club_data['name']}'. Skipping."))
-                continue
-
-            Club.objects.create(
-                name=club_data['name'],
-                league=league_obj,
-                founded_year=club_data.get('year'),
-                logo_url=club_data.get('logo')
-            )
-            clubs_created_count += 1
-
-        self.stdout.write(self.style.SUCCESS(f'Successfully created {clubs_created_count} clubs.'))
-        self.stdout.write(self.style.SUCCESS('All data loaded successfully!'))
\ No newline at end of file
+class Command(LeaguesAndClubsCommand):
+    help = 'Loads initial league and club data from a predefined list (idempotent, matched by name).'
+    leagues_data = LEAGUES_DATA
+    clubs_data = CLUBS_DATA
@@ -1,6 +1,6 @@
-from django.core.management.base import BaseCommand
-from club_directories.models import Club
+from club_directories.loaders import BulkLoadCommand, BulkLoader
 from statisticsrafi.models import ClubRanking
+from statisticsrafi.leaderboards import bump_stats_version
 from datetime import date
 
 # Top 100 clubs with their FIFA rankings
@@ -108,7 +108,29 @@ RANKINGS_DATA = [
 ]
 
 
-class Command(BaseCommand):
+class RankingLoader(BulkLoader):
+    model = ClubRanking
+    key_fields = ('club', 'ranking_date')
+    update_fields = ('rank', 'points', 'continent')
+    unique_fields = ('club', 'ranking_date')
+
+    def __init__(self, ranking_date):
+        self.ranking_date = ranking_date
+
+    def build(self, row):
+        club = self.club(row['club_name'])
+        if club is None:
+            return self.skip(row, f"club '{row['club_name']}' (not found)")
+        return ClubRanking(
+            club=club,
+            rank=row['rank'],
+            points=row['points'],
+            continent=row['continent'],
+            ranking_date=self.ranking_date,
+        )
+
+
+class Command(BulkLoadCommand):
     help = 'Loads FIFA club world rankings data'
 
     def add_arguments(self, parser):
@@ -125,53 +147,8 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS('Existing rankings deleted.'))
 
         self.stdout.write(self.style.NOTICE('Loading club rankings...'))
-        
-        rankings_created = 0
-        rankings_updated = 0
-        rankings_skipped = 0
         ranking_date = date(2024, 10, 1)  # October 2024 rankings
-
-        for ranking_data in RANKINGS_DATA:
-            club_name = ranking_data['club_name']
-            
-            # Find the club
-            try:
-                club = Club.objects.get(name=club_name)
-            except Club.DoesNotExist:
-                self.stdout.write(self.style.ERROR(f"  Club '{club_name}' not found. Skipping."))
-                rankings_skipped += 1
-                continue
-            
-            # Check if ranking already exists for this club and date
-            existing_ranking = ClubRanking.objects.filter(
-                club=club,
-                ranking_date=ranking_date
-            ).first()
-            
-            if existing_ranking:
-                # Update existing ranking
-                existing_ranking.rank = ranking_data['rank']
-                existing_ranking.points = ranking_data['points']
-                existing_ranking.continent = ranking_data['continent']
-                existing_ranking.save()
-                rankings_updated += 1
-                self.stdout.write(f"  Updated: #{ranking_data['rank']} {club_name}")
-            else:
-                # Create new ranking
-                ClubRanking.objects.create(
-                    club=club,
-                    rank=ranking_data['rank'],
-                    points=ranking_data['points'],
-                    continent=ranking_data['continent'],
-                    ranking_date=ranking_date
-                )
-                rankings_created += 1
-                self.stdout.write(f"  Created: #{ranking_data['rank']} {club_name}")
-
-        self.stdout.write(self.style.SUCCESS(f'\n*** Rankings loading complete! ***'))
-        self.stdout.write(self.style.SUCCESS(f'   Created: {rankings_created} rankings'))
-        self.stdout.write(self.style.SUCCESS(f'   Updated: {rankings_updated} rankings'))
-        self.stdout.write(self.style.SUCCESS(f'   Skipped: {rankings_skipped} rankings'))
+        self.report('Rankings', RankingLoader(ranking_date).load(RANKINGS_DATA))
+        # Bulk writes don't send post_save, so invalidate the cached leaderboards here
+        bump_stats_version()
         self.stdout.write(self.style.SUCCESS(f'   Total rankings in database: {ClubRanking.objects.count()}'))
-
-
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('club_directories', '0004_leaguepick_delete_favoriteclub'),
+        ('statisticsrafi', '0005_remove_player_club_remove_playercomparison_player2_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-wins'], name='ts_wins_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-draws'], name='ts_draws_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-losses'], name='ts_losses_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-xg_for_per_match'], name='ts_xg_for_per_match_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-xg_against_per_match'], name='ts_xg_against_per_match_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-scored_per_match'], name='ts_scored_per_match_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-conceded_per_match'], name='ts_conceded_per_match_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-avg_match_goals'], name='ts_avg_match_goals_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-clean_sheets_percentage'], name='ts_clean_sheets_percent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-failed_to_score_percentage'], name='ts_failed_to_score_perc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-possession_avg'], name='ts_possession_avg_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-shots_taken_per_match'], name='ts_shots_taken_per_matc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-shots_conversion_rate'], name='ts_shots_conversion_rat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-fouls_committed_per_match'], name='ts_fouls_committed_per__idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-fouled_against_per_match'], name='ts_fouled_against_per_m_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-goal_kicks_per_match'], name='ts_goal_kicks_per_match_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-throw_ins_per_match'], name='ts_throw_ins_per_match_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamstatistics',
+            index=models.Index(fields=['season', '-free_kicks_per_match'], name='ts_free_kicks_per_match_idx'),
+        ),
+    ]
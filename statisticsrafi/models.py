@@ -76,6 +76,18 @@ class ClubRanking(models.Model):
         unique_together = ['club', 'ranking_date']
 
 
+# Numeric TeamStatistics columns that can be used as a sortable leaderboard metric
+TEAM_STAT_METRICS = (
+    'wins', 'draws', 'losses',
+    'xg_for_per_match', 'xg_against_per_match',
+    'scored_per_match', 'conceded_per_match', 'avg_match_goals',
+    'clean_sheets_percentage', 'failed_to_score_percentage',
+    'possession_avg', 'shots_taken_per_match', 'shots_conversion_rate',
+    'fouls_committed_per_match', 'fouled_against_per_match',
+    'goal_kicks_per_match', 'throw_ins_per_match', 'free_kicks_per_match',
+)
+
+
 class TeamStatistics(models.Model):
     """Team/Club Statistics for a season"""
     club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='team_statistics')
@@ -138,6 +150,12 @@ class TeamStatistics(models.Model):
         unique_together = ['club', 'season']
         ordering = ['-season', 'club__name']
         verbose_name_plural = "Team Statistics"
+        # One (season, metric DESC) index per metric so every leaderboard is
+        # read in index order
+        indexes = [
+            models.Index(fields=['season', f'-{metric}'], name=f'ts_{metric[:20]}_idx')
+            for metric in TEAM_STAT_METRICS
+        ]
 
 
 class ClubVote(models.Model):
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .leaderboards import bump_stats_version
+from .models import ClubRanking, TeamStatistics
+
+
+@receiver([post_save, post_delete], sender=TeamStatistics)
+@receiver([post_save, post_delete], sender=ClubRanking)
+def invalidate_leaderboards(sender, **kwargs):
+    """Admin edits and loader writes make the cached leaderboards stale"""
+    bump_stats_version()
@@ -0,0 +1,266 @@
+import threading
+from functools import cached_property
+
+import numpy as np
+from django.core.cache import cache
+
+from .leaderboards import CURRENT_SEASON, LEADERBOARD_CACHE_TIMEOUT, stats_version
+from .models import TEAM_STAT_METRICS, TeamStatistics
+
+METRIC_LABELS = {
+    'wins': 'Wins',
+    'draws': 'Draws',
+    'losses': 'Losses',
+    'xg_for_per_match': 'xG per Match',
+    'xg_against_per_match': 'xG Against per Match',
+    'scored_per_match': 'Goals per Match',
+    'conceded_per_match': 'Goals Conceded per Match',
+    'avg_match_goals': 'Average Match Goals',
+    'clean_sheets_percentage': 'Clean Sheets %',
+    'failed_to_score_percentage': 'Failed to Score %',
+    'possession_avg': 'Possession %',
+    'shots_taken_per_match': 'Shots per Match',
+    'shots_conversion_rate': 'Conversion Rate %',
+    'fouls_committed_per_match': 'Fouls Committed per Match',
+    'fouled_against_per_match': 'Fouled Against per Match',
+    'goal_kicks_per_match': 'Goal Kicks per Match',
+    'throw_ins_per_match': 'Throw-ins per Match',
+    'free_kicks_per_match': 'Free-Kicks per Match',
+}
+
+# Metrics where a lower value is the better one (percentiles and ranks are flipped)
+LOWER_IS_BETTER = {
+    'losses', 'xg_against_per_match', 'conceded_per_match',
+    'failed_to_score_percentage', 'fouls_committed_per_match',
+}
+
+# Playing-style features behind "clubs that play like X" (results and goals left out)
+STYLE_METRICS = (
+    'possession_avg', 'shots_taken_per_match', 'shots_conversion_rate',
+    'xg_for_per_match', 'xg_against_per_match',
+    'fouls_committed_per_match', 'fouled_against_per_match',
+    'goal_kicks_per_match', 'throw_ins_per_match', 'free_kicks_per_match',
+)
+
+
+def _rounded(value, digits=2):
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+class StatsMatrix:
+    """
+    One season of TeamStatistics as a clubs x metrics float matrix
+    (NaN where a value is missing). Percentiles, ranks and z-scores of every
+    cell are computed once when the matrix is built, so lookups are just
+    indexing.
+    """
+
+    def __init__(self, season, club_ids, club_names, logo_urls, league_ids, values):
+        self.season = season
+        self.club_ids = [str(club_id) for club_id in club_ids]
+        self.club_names = list(club_names)
+        self.logo_urls = list(logo_urls)
+        self.index = {club_id: i for i, club_id in enumerate(self.club_ids)}
+        self.league_ids = np.array([str(league_id) if league_id else '' for league_id in league_ids], dtype=object)
+        self.values = values.reshape(len(self.club_ids), len(TEAM_STAT_METRICS))
+        self._league_averages = {}
+
+        valid = ~np.isnan(self.values)
+        self.counts = valid.sum(axis=0)
+        self.means = self._column_means(self.values, valid)
+        deviations = np.where(valid, self.values - self.means, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt((deviations ** 2).sum(axis=0) / self.counts)
+            self.zscores = np.where(std > 0, (self.values - self.means) / std, 0.0)
+        self.zscores[~valid] = np.nan
+
+        self.percentiles = np.full(self.values.shape, np.nan)
+        self.ranks = np.zeros(self.values.shape, dtype=int)
+        for j, metric in enumerate(TEAM_STAT_METRICS):
+            column = self.values[:, j]
+            present = valid[:, j]
+            ordered = np.sort(column[present])
+            below = np.searchsorted(ordered, column[present], side='left')
+            above = len(ordered) - np.searchsorted(ordered, column[present], side='right')
+            # Share of clubs this one is ahead of, ties (itself included) counted as half
+            percentile = (below + (len(ordered) - below - above) / 2) / len(ordered) * 100
+            if metric in LOWER_IS_BETTER:
+                self.percentiles[present, j] = 100 - percentile
+                self.ranks[present, j] = below + 1
+            else:
+                self.percentiles[present, j] = percentile
+                self.ranks[present, j] = above + 1
+
+    @staticmethod
+    def _column_means(values, valid):
+        counts = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > 0, np.where(valid, values, 0.0).sum(axis=0) / counts, np.nan)
+
+    @classmethod
+    def load(cls, season):
+        """Build the matrix from a single TeamStatistics query"""
+        rows = list(
+            TeamStatistics.objects.filter(season=season)
+            .order_by('club_id')
+            .values_list('club_id', 'club__name', 'club__logo_url', 'club__league_id', *TEAM_STAT_METRICS)
+        )
+        return cls(
+            season,
+            club_ids=[row[0] for row in rows],
+            club_names=[row[1] for row in rows],
+            logo_urls=[row[2] for row in rows],
+            league_ids=[row[3] for row in rows],
+            values=np.array([row[4:] for row in rows], dtype=float),
+        )
+
+    def __contains__(self, club_id):
+        return str(club_id) in self.index
+
+    def __len__(self):
+        return len(self.club_ids)
+
+    def club_name(self, club_id):
+        i = self.index.get(str(club_id))
+        return None if i is None else self.club_names[i]
+
+    def league_average(self, league_id):
+        """{metric: average} over the clubs of one league"""
+        league_id = str(league_id) if league_id else ''
+        if league_id not in self._league_averages:
+            rows = self.values[self.league_ids == league_id]
+            means = self._column_means(rows, ~np.isnan(rows))
+            self._league_averages[league_id] = {
+                metric: _rounded(means[j]) for j, metric in enumerate(TEAM_STAT_METRICS)
+            }
+        return self._league_averages[league_id]
+
+    def profile(self, club_id):
+        """How one club ranks in every metric, or None if it has no stats this season"""
+        i = self.index.get(str(club_id))
+        if i is None:
+            return None
+        league_average = self.league_average(self.league_ids[i])
+        return [{
+            'metric': metric,
+            'label': METRIC_LABELS[metric],
+            'value': _rounded(self.values[i, j]),
+            'percentile': _rounded(self.percentiles[i, j], 1),
+            'rank': int(self.ranks[i, j]) or None,
+            'out_of': int(self.counts[j]),
+            'z_score': _rounded(self.zscores[i, j]),
+            'season_average': _rounded(self.means[j]),
+            'league_average': league_average[metric],
+        } for j, metric in enumerate(TEAM_STAT_METRICS)]
+
+    def compare(self, club_ids):
+        """
+        Side-by-side rows for any number of clubs. `best` is the position in
+        club_ids of the leading club, or None when nobody leads outright.
+        Clubs without stats this season get None values.
+        """
+        rows = [self.index.get(str(club_id)) for club_id in club_ids]
+        present = [i for i in rows if i is not None]
+        comparison = []
+        for j, metric in enumerate(TEAM_STAT_METRICS):
+            percentiles = [np.nan if i is None else self.percentiles[i, j] for i in rows]
+            best = None
+            if present and not np.all(np.isnan(percentiles)):
+                top = np.nanmax(percentiles)
+                leaders = [k for k, p in enumerate(percentiles) if p == top]
+                best = leaders[0] if len(leaders) == 1 else None
+            comparison.append({
+                'metric': metric,
+                'label': METRIC_LABELS[metric],
+                'values': [None if i is None else _rounded(self.values[i, j]) for i in rows],
+                'percentiles': [_rounded(p, 1) for p in percentiles],
+                'best': best,
+            })
+        return comparison
+
+    @cached_property
+    def style_distances(self):
+        """
+        Euclidean distances between every pair of clubs over the z-scored
+        STYLE_METRICS (a missing value counts as the season average). Clubs
+        without any style data are infinitely far from everyone.
+        """
+        columns = [TEAM_STAT_METRICS.index(metric) for metric in STYLE_METRICS]
+        vectors = np.nan_to_num(self.zscores[:, columns])
+        squared = (vectors ** 2).sum(axis=1)
+        distances = np.sqrt(np.maximum(squared[:, None] + squared[None, :] - 2 * vectors @ vectors.T, 0))
+        no_style = np.isnan(self.values[:, columns]).all(axis=1)
+        distances[no_style, :] = np.inf
+        distances[:, no_style] = np.inf
+        np.fill_diagonal(distances, np.inf)
+        return distances
+
+    def similar(self, club_id, k=5):
+        """The k clubs closest in playing style, nearest first (None if the club has no stats)"""
+        i = self.index.get(str(club_id))
+        if i is None:
+            return None
+        distances = self.style_distances[i]
+        candidates = np.flatnonzero(np.isfinite(distances))
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(distances[candidates], k - 1)[:k]]
+        nearest = candidates[np.lexsort((candidates, distances[candidates]))]
+        return [{
+            'club_id': self.club_ids[j],
+            'club_name': self.club_names[j],
+            'logo_url': self.logo_urls[j],
+            'distance': _rounded(distances[j], 3),
+            'similarity': _rounded(1 / (1 + distances[j]), 3),
+        } for j in nearest]
+
+
+_matrices = {}
+_matrices_lock = threading.Lock()
+_seasons = (None, frozenset())
+
+
+def stats_seasons():
+    """Seasons with team statistics (and the current one), re-read when the stats version changes"""
+    global _seasons
+    version = stats_version()
+    if _seasons[0] != version:
+        seasons = TeamStatistics.objects.order_by('season').values_list('season', flat=True).distinct()
+        _seasons = (version, frozenset(seasons) | {CURRENT_SEASON})
+    return _seasons[1]
+
+
+def _cache_key(season, version):
+    return f'statisticsrafi:stats-matrix:{season}:{version}'
+
+
+def get_stats_matrix(season=CURRENT_SEASON):
+    """
+    StatsMatrix of a season, kept per process and rebuilt when the shared
+    stats version changes (see leaderboards.bump_stats_version). A matrix
+    published by another process for the current version is reused.
+    Raises ValueError for a season without statistics.
+    """
+    version = stats_version()
+    cached = _matrices.get(season)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    matrix = cache.get(_cache_key(season, version))
+    if matrix is None:
+        if season not in stats_seasons():
+            raise ValueError(f"No statistics for season '{season}'")
+        matrix = StatsMatrix.load(season)
+        cache.set(_cache_key(season, version), matrix, LEADERBOARD_CACHE_TIMEOUT)
+    with _matrices_lock:
+        _matrices[season] = (version, matrix)
+    return matrix
+
+
+def publish_stats_matrix(season=CURRENT_SEASON):
+    """Build a season's matrix and its style distances up front (after a stats import)"""
+    version = stats_version()
+    matrix = StatsMatrix.load(season)
+    matrix.style_distances
+    cache.set(_cache_key(season, version), matrix, LEADERBOARD_CACHE_TIMEOUT)
+    with _matrices_lock:
+        _matrices[season] = (version, matrix)
+    return matrix
@@ -0,0 +1,149 @@
+import csv
+import os
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from club_directories.loaders import BulkLoader
+
+from .models import TeamStatistics
+
+def parse_percentage(value):
+    """Convert percentage string like '75%' to decimal like 75.00"""
+    if value and isinstance(value, str):
+        return parse_decimal(value.replace('%', '').strip())
+    elif value and isinstance(value, (int, float)):
+        return Decimal(str(value))
+    return None
+
+
+def parse_decimal(value):
+    """Convert string to decimal"""
+    if value:
+        try:
+            return Decimal(str(value))
+        except InvalidOperation:
+            return None
+    return None
+
+
+def parse_int_from_percentage(value):
+    """Convert percentage like '75%' to count out of 8 games"""
+    if value and isinstance(value, str) and '%' in value:
+        percentage = float(value.replace('%', '').strip())
+        # Assuming 8 games played, calculate number of games
+        return int(round(percentage / 100 * 8))
+    return 0
+
+
+def parse_text(value):
+    return str(value or '')
+
+
+# Stat columns in sheet order, after the team name
+COLUMNS = [
+    ('wins', parse_int_from_percentage),
+    ('draws', parse_int_from_percentage),
+    ('losses', parse_int_from_percentage),
+    ('xg_for_per_match', parse_decimal),
+    ('xg_against_per_match', parse_decimal),
+    ('scored_per_match', parse_decimal),
+    ('conceded_per_match', parse_decimal),
+    ('avg_match_goals', parse_decimal),
+    ('clean_sheets_percentage', parse_percentage),
+    ('failed_to_score_percentage', parse_percentage),
+    ('possession_avg', parse_percentage),
+    ('shots_taken_per_match', parse_decimal),
+    ('shots_conversion_rate', parse_percentage),
+    ('fouls_committed_per_match', parse_decimal),
+    ('fouled_against_per_match', parse_decimal),
+    ('penalties_won', parse_text),
+    ('penalties_conceded', parse_text),
+    ('goal_kicks_per_match', parse_decimal),
+    ('throw_ins_per_match', parse_decimal),
+    ('free_kicks_per_match', parse_decimal),
+]
+
+
+def _xlsx_rows(path):
+    import openpyxl
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _csv_rows(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        yield from csv.reader(f)
+
+
+def _parquet_rows(path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError('Reading Parquet files needs pyarrow (pip install pyarrow)')
+    parquet = pq.ParquetFile(path)
+    yield tuple(parquet.schema_arrow.names)
+    for batch in parquet.iter_batches():
+        yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+READERS = {
+    '.xlsx': _xlsx_rows,
+    '.xlsm': _xlsx_rows,
+    '.csv': _csv_rows,
+    '.parquet': _parquet_rows,
+}
+
+
+def read_rows(path):
+    """
+    Stream the rows of a stats dump (header first) as tuples of values,
+    without loading the whole file
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in READERS:
+        raise ValueError(f"Unsupported file type '{extension}' (expected one of {', '.join(READERS)})")
+    return READERS[extension](path)
+
+
+def iter_stat_rows(path, season):
+    """
+    Stat rows of a dump as dicts: team name first, then COLUMNS in order.
+    A 'season' column anywhere in the header overrides the default season,
+    so one file can hold several seasons.
+    """
+    rows = read_rows(path)
+    header = [str(h or '').strip().lower() for h in next(rows, ())]
+    season_column = header.index('season') if 'season' in header else None
+    for values in rows:
+        values = list(values)
+        row_season = season
+        if season_column is not None and season_column < len(values):
+            row_season = str(values.pop(season_column) or season)
+        if not values or not values[0]:
+            continue
+        values += [None] * (len(COLUMNS) + 1 - len(values))
+        row = {'team_name': values[0], 'season': row_season}
+        row.update({field: parse(value) for (field, parse), value in zip(COLUMNS, values[1:])})
+        yield row
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class TeamStatsLoader(BulkLoader):
+    model = TeamStatistics
+    key_fields = ('club', 'season')
+    update_fields = tuple(field for field, _ in COLUMNS)
+    unique_fields = ('club', 'season')
+
+    def build(self, row):
+        club = self.club(row['team_name'])
+        if club is None:
+            return self.skip(row, f"{row['team_name']} (club not found)")
+        return TeamStatistics(club=club, **{k: v for k, v in row.items() if k != 'team_name'})
@@ -274,6 +274,337 @@ class StatisticsViewsTest(TestCase):
 
 
 
+class LeaderboardCacheTest(TestCase):
+    """Test the cached dashboard leaderboards"""
+
+    def setUp(self):
+        self.client = Client()
+        self.league = League.objects.create(name="Premier League", region="England")
+        self.clubs = [Club.objects.create(name=f"Club {i}", league=self.league) for i in range(12)]
+        for i, club in enumerate(self.clubs):
+            TeamStatistics.objects.create(
+                club=club, season="2025/26",
+                scored_per_match=Decimal(i), possession_avg=Decimal(50 + i) if i else None,
+            )
+        ClubRanking.objects.create(
+            club=self.clubs[0], rank=1, points=Decimal('90.00'), continent="Europe", ranking_date=date(2024, 1, 1)
+        )
+
+    def test_leaderboards_built_in_one_pass(self):
+        from .leaderboards import build_leaderboards
+        with self.assertNumQueries(2):
+            boards = build_leaderboards("2025/26")
+            names = [stat.club.name for stat in boards['top_goals']]
+            league = boards['club_rankings'][0].club.league.name
+        self.assertEqual(names, [f"Club {i}" for i in range(11, 1, -1)])
+        self.assertEqual(league, "Premier League")
+        # Rows without a value sort last
+        self.assertEqual(len(boards['top_possession']), 10)
+        self.assertEqual(boards['top_possession'][0].club, self.clubs[11])
+
+    def test_warm_dashboard_does_no_db_work(self):
+        self.client.get(reverse('statisticsrafi:home'))
+        self.client.get(reverse('statisticsrafi:json_general'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('statisticsrafi:home'))
+            self.assertEqual(len(response.context['top_goals']), 10)
+            data = self.client.get(reverse('statisticsrafi:json_general')).json()
+        self.assertEqual(data['top_goals'][0]['club_name'], "Club 11")
+        self.assertEqual(data['rankings'][0]['rank'], 1)
+
+    def test_writes_invalidate_leaderboards(self):
+        self.client.get(reverse('statisticsrafi:json_general'))
+        stat = TeamStatistics.objects.get(club=self.clubs[0])
+        stat.scored_per_match = Decimal('99')
+        stat.save()
+        data = self.client.get(reverse('statisticsrafi:json_general')).json()
+        self.assertEqual(data['top_goals'][0]['club_name'], "Club 0")
+
+        ClubRanking.objects.all().delete()
+        self.assertEqual(self.client.get(reverse('statisticsrafi:json_general')).json()['rankings'], [])
+
+    def test_load_team_stats_bumps_version(self):
+        from io import StringIO
+        from unittest.mock import patch
+        from django.core.management import call_command
+        from .leaderboards import stats_version
+        before = stats_version()
+        with patch('openpyxl.load_workbook') as load_workbook:
+            load_workbook.return_value.active.rows = iter([()])
+            call_command('load_team_stats', stdout=StringIO())
+        self.assertNotEqual(stats_version(), before)
+
+
+class StatsListJsonTest(TestCase):
+    """Test the generic json/list/<metric>/ endpoint"""
+
+    def setUp(self):
+        self.client = Client()
+        self.league1 = League.objects.create(name="Premier League", region="England")
+        self.league2 = League.objects.create(name="La Liga", region="Spain")
+        self.club1 = Club.objects.create(name="Arsenal", league=self.league1, logo_url="http://a/ars.png")
+        self.club2 = Club.objects.create(name="Chelsea", league=self.league1)
+        self.club3 = Club.objects.create(name="Sevilla", league=self.league2)
+        TeamStatistics.objects.create(club=self.club1, season="2025/26", wins=5, conceded_per_match=Decimal('0.50'))
+        TeamStatistics.objects.create(club=self.club2, season="2025/26", wins=7)
+        TeamStatistics.objects.create(club=self.club3, season="2025/26", wins=6, conceded_per_match=Decimal('1.20'))
+
+    def get(self, metric, **params):
+        return self.client.get(reverse('statisticsrafi:json_specific_list', args=[metric]), params)
+
+    def test_any_metric_sorted_desc_with_limit(self):
+        data = self.get('wins', limit=2).json()
+        self.assertEqual([r['club_name'] for r in data['results']], ["Chelsea", "Sevilla"])
+        self.assertEqual(len(data['results'][0]), 24)
+
+    def test_nulls_last_and_ascending_order(self):
+        names = [r['club_name'] for r in self.get('conceded_per_match').json()['results']]
+        self.assertEqual(names, ["Sevilla", "Arsenal", "Chelsea"])
+        names = [r['club_name'] for r in self.get('conceded_per_match', order='asc').json()['results']]
+        self.assertEqual(names, ["Arsenal", "Sevilla", "Chelsea"])
+
+    def test_league_filter_and_field_projection(self):
+        with self.assertNumQueries(2):  # ranked rows + rows without a value
+            data = self.get('wins', league=str(self.league1.id), fields='club_name,logo_url,wins').json()
+        self.assertEqual(data['results'], [
+            {'club_name': "Chelsea", 'logo_url': None, 'wins': 7},
+            {'club_name': "Arsenal", 'logo_url': "http://a/ars.png", 'wins': 5},
+        ])
+        data = self.get('wins', fields='wins,win_percentage').json()
+        self.assertEqual(data['results'][0], {'wins': 7, 'win_percentage': 100.0})
+
+    def test_aliases_and_validation(self):
+        self.assertEqual(self.get('goals').status_code, 200)
+        self.assertEqual(self.get('rankings').status_code, 200)
+        self.assertEqual(self.get('penalties_won').status_code, 400)
+        self.assertEqual(self.get('wins', fields='password').status_code, 400)
+        self.assertEqual(self.get('wins', limit='ten').status_code, 400)
+        self.assertEqual(self.get('wins', league='nope').status_code, 400)
+
+
+class StatsMatrixTest(TestCase):
+    """Test the in-memory per-season stats matrix"""
+
+    def setUp(self):
+        self.client = Client()
+        self.league1 = League.objects.create(name="Premier League", region="England")
+        self.league2 = League.objects.create(name="La Liga", region="Spain")
+        self.club1 = Club.objects.create(name="Arsenal", league=self.league1)
+        self.club2 = Club.objects.create(name="Chelsea", league=self.league1)
+        self.club3 = Club.objects.create(name="Sevilla", league=self.league2)
+        self.club4 = Club.objects.create(name="Betis", league=self.league2)
+        for club, scored, conceded in [
+            (self.club1, '2.00', '0.50'), (self.club2, '1.00', '1.50'),
+            (self.club3, '3.00', None), (self.club4, '2.00', '1.00'),
+        ]:
+            TeamStatistics.objects.create(
+                club=club, season="2025/26", scored_per_match=Decimal(scored),
+                conceded_per_match=Decimal(conceded) if conceded else None,
+            )
+
+    def profile(self, club):
+        from .stats_matrix import get_stats_matrix
+        return {row['metric']: row for row in get_stats_matrix("2025/26").profile(club.id)}
+
+    def test_percentiles_ranks_and_averages(self):
+        scored = self.profile(self.club1)['scored_per_match']
+        # Ahead of Chelsea, tied with itself and Betis: (1 + 2 / 2) / 4
+        self.assertEqual(scored['percentile'], 50.0)
+        self.assertEqual(scored['rank'], 2)
+        self.assertEqual(scored['season_average'], 2.0)
+        self.assertEqual(scored['league_average'], 1.5)
+        self.assertEqual(scored['z_score'], 0.0)
+        # Lower is better; clubs without a value are left out
+        conceded = self.profile(self.club1)['conceded_per_match']
+        self.assertEqual((conceded['rank'], conceded['out_of'], conceded['percentile']), (1, 3, 83.3))
+        self.assertIsNone(self.profile(self.club3)['conceded_per_match']['rank'])
+
+    def test_compare_any_number_of_clubs(self):
+        from .stats_matrix import get_stats_matrix
+        ghost = Club.objects.create(name="No Stats", league=self.league1)
+        rows = {row['metric']: row for row in get_stats_matrix("2025/26").compare(
+            [self.club1.id, self.club2.id, self.club3.id, ghost.id]
+        )}
+        self.assertEqual(rows['scored_per_match']['values'], [2.0, 1.0, 3.0, None])
+        self.assertEqual(rows['scored_per_match']['best'], 2)
+        self.assertEqual(rows['conceded_per_match']['best'], 0)
+        self.assertIsNone(rows['wins']['best'])  # all tied on 0
+
+    def test_matrix_is_cached_until_stats_change(self):
+        from .stats_matrix import get_stats_matrix
+        matrix = get_stats_matrix("2025/26")
+        with self.assertNumQueries(0):
+            self.assertIs(get_stats_matrix("2025/26"), matrix)
+        TeamStatistics.objects.filter(club=self.club2).get().delete()
+        self.assertNotIn(self.club2.id, get_stats_matrix("2025/26"))
+
+    def test_compare_json(self):
+        url = reverse('statisticsrafi:json_compare')
+        ids = ','.join(str(c.id) for c in [self.club1, self.club2, self.club3])
+        data = self.client.get(url, {'clubs': ids}).json()
+        self.assertEqual([c['club_name'] for c in data['clubs']], ["Arsenal", "Chelsea", "Sevilla"])
+        self.assertEqual(len(data['metrics'][0]['values']), 3)
+        self.assertEqual(self.client.get(url, {'clubs': str(self.club1.id)}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'clubs': 'a,b'}).status_code, 400)
+
+    def test_unknown_season_is_rejected(self):
+        from .stats_matrix import _matrices
+        ids = ','.join(str(c.id) for c in [self.club1, self.club2])
+        response = self.client.get(reverse('statisticsrafi:json_compare'), {'clubs': ids, 'season': 'x' * 40})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            reverse('statisticsrafi:json_team_similar', args=[self.club1.id]), {'season': '1999/00'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('1999/00', _matrices)
+
+    def test_team_detail_shows_season_ranking(self):
+        response = self.client.get(reverse('statisticsrafi:team_detail', args=[self.club3.id]))
+        self.assertContains(response, "Season Ranking")
+        self.assertEqual(response.context['stat_profile'][0]['metric'], 'wins')
+
+
+class SimilarClubsTest(TestCase):
+    """Test the similar-club finder"""
+
+    def setUp(self):
+        self.client = Client()
+        self.league = League.objects.create(name="Premier League", region="England")
+        self.clubs = {}
+        for name, possession, shots, fouls in [
+            ("City", '65.0', '18.0', '8.0'), ("Arsenal", '62.0', '17.0', '9.0'),
+            ("Burnley", '40.0', '9.0', '14.0'), ("Luton", '38.0', '8.0', '15.0'),
+        ]:
+            club = Club.objects.create(name=name, league=self.league)
+            TeamStatistics.objects.create(
+                club=club, season="2025/26", possession_avg=Decimal(possession),
+                shots_taken_per_match=Decimal(shots), fouls_committed_per_match=Decimal(fouls),
+            )
+            self.clubs[name] = club
+        self.no_style = Club.objects.create(name="Empty", league=self.league)
+        TeamStatistics.objects.create(club=self.no_style, season="2025/26", wins=3)
+
+    def similar(self, name, **params):
+        url = reverse('statisticsrafi:json_team_similar', args=[self.clubs[name].id])
+        return self.client.get(url, params)
+
+    def test_nearest_first_excluding_self_and_clubs_without_data(self):
+        results = self.similar("City").json()['results']
+        self.assertEqual([r['club_name'] for r in results], ["Arsenal", "Burnley", "Luton"])
+        self.assertLess(results[0]['distance'], results[1]['distance'])
+        self.assertEqual([r['club_name'] for r in self.similar("Luton", k=1).json()['results']], ["Burnley"])
+
+    def test_unknown_club_and_bad_k(self):
+        url = reverse('statisticsrafi:json_team_similar', args=[self.no_style.id])
+        self.assertEqual(self.client.get(url).json()['results'], [])
+        other = Club.objects.create(name="No Stats", league=self.league)
+        self.assertEqual(
+            self.client.get(reverse('statisticsrafi:json_team_similar', args=[other.id])).status_code, 404
+        )
+        self.assertEqual(self.similar("City", k='x').status_code, 400)
+
+    def test_published_matrix_is_reused(self):
+        from .stats_matrix import _matrices, get_stats_matrix, publish_stats_matrix
+        published = publish_stats_matrix("2025/26")
+        self.assertIn('style_distances', published.__dict__)
+        _matrices.clear()  # as in another process sharing the cache
+        with self.assertNumQueries(0):
+            self.assertIn('style_distances', get_stats_matrix("2025/26").__dict__)
+
+
+class LoadCommandsTest(TestCase):
+    """Test the bulk rankings/awards loaders"""
+
+    def test_rankings_and_awards_reload_idempotently(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .leaderboards import stats_version
+        call_command('load_clubs', stdout=StringIO())
+        version = stats_version()
+
+        out = StringIO()
+        with self.assertNumQueries(6 + 1):  # bulk load + total count
+            call_command('load_rankings', stdout=out)
+        self.assertIn("Rankings: 100 created, 0 updated, 0 unchanged, 0 skipped", out.getvalue())
+        self.assertNotEqual(stats_version(), version)
+        call_command('load_awards', stdout=StringIO())
+        awards = Award.objects.count()
+
+        ClubRanking.objects.filter(rank=1).update(points=Decimal('1.00'))
+        out = StringIO()
+        call_command('load_rankings', stdout=out)
+        call_command('load_awards', stdout=out)
+        self.assertIn("Rankings: 0 created, 1 updated, 99 unchanged", out.getvalue())
+        self.assertIn(f"Awards: 0 created, 0 updated, {awards} unchanged", out.getvalue())
+        self.assertEqual(ClubRanking.objects.get(rank=1).points, Decimal('2077.50'))
+
+
+class TeamStatsImportTest(TestCase):
+    """Test the streaming load_team_stats importer"""
+
+    def setUp(self):
+        self.league = League.objects.create(name="Bundesliga", region="Germany")
+        self.bayern = Club.objects.create(name="FC Bayern München", league=self.league)
+        self.dortmund = Club.objects.create(name="Borussia Dortmund", league=self.league)
+
+    def write_csv(self, lines):
+        import os
+        import tempfile
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+        self.addCleanup(os.remove, path)
+        return path
+
+    def load(self, *args):
+        from io import StringIO
+        from django.core.management import call_command
+        out = StringIO()
+        call_command('load_team_stats', *args, stdout=out)
+        return out.getvalue()
+
+    def test_csv_with_season_column(self):
+        path = self.write_csv([
+            'Team,Season,Wins,Draws,Losses,xG For,xG Against,Scored,Conceded',
+            'fc-bayern-munchen,2024/25,75%,13%,13%,2.10,0.80,2.50,0.75',
+            'borussia-dortmund,2024/25,50%,25%,25%,1.60,1.20,1.75,1.25',
+            'fc-bayern-munchen,2025/26,88%,0%,13%,2.30,0.70,3.00,0.50',
+            'nowhere-united,2025/26,0%,0%,100%,,,,',
+        ])
+        out = self.load(path, '--batch-size', '2')
+        self.assertIn("Team statistics: 3 created, 0 updated, 0 unchanged, 1 skipped", out)
+        stats = TeamStatistics.objects.get(club=self.bayern, season="2024/25")
+        self.assertEqual((stats.wins, stats.draws, stats.losses), (6, 1, 1))
+        self.assertEqual(stats.scored_per_match, Decimal('2.50'))
+        self.assertIsNone(stats.possession_avg)
+        self.assertEqual(TeamStatistics.objects.get(club=self.bayern, season="2025/26").wins, 7)
+
+        out = self.load(path)
+        self.assertIn("0 created, 0 updated, 3 unchanged", out)
+
+    def test_failed_import_leaves_previous_data(self):
+        from django.core.management.base import CommandError
+        self.load(self.write_csv(['Team,Wins', 'fc-bayern-munchen,75%']))
+        path = self.write_csv([
+            'Team,Wins',
+            'fc-bayern-munchen,50%',
+            'borussia-dortmund,50%',
+            'borussia-dortmund,lots%',
+        ])
+        with self.assertRaises(CommandError):
+            self.load(path, '--batch-size', '1')
+        self.assertEqual(list(TeamStatistics.objects.values_list('club__name', 'wins')), [("FC Bayern München", 6)])
+
+    def test_sample_workbook_streams_in_bulk(self):
+        from django.core.management.base import CommandError
+        with self.assertNumQueries(9):  # clubs, aliases, existing rows, upsert, season matrix (+ 2 x savepoint/release)
+            out = self.load()
+        self.assertIn("2 created", out)
+        self.assertEqual(TeamStatistics.objects.get(club=self.dortmund).wins, 5)
+        with self.assertRaises(CommandError):
+            self.load('stats.json')
+
+
 class VotingViewsTest(TestCase):
     """Test voting views"""
     
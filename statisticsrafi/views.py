@@ -9,17 +9,13 @@ from .models import (
     Club, Award, 
     Vote, ClubRanking, TeamStatistics, ClubVote
 )
+from .leaderboards import get_leaderboards
+from .stats_matrix import get_stats_matrix
 
 # READ - List Views
 def statistics_home(request):
-    """Main statistics dashboard"""
-    context = {
-        'top_goals': TeamStatistics.objects.filter(season='2025/26').order_by('-scored_per_match')[:10],
-        'top_possession': TeamStatistics.objects.filter(season='2025/26').order_by('-possession_avg')[:10],
-        'top_clean_sheets': TeamStatistics.objects.filter(season='2025/26').order_by('-clean_sheets_percentage')[:10],
-        'club_rankings': ClubRanking.objects.order_by('rank')[:20],
-    }
-    return render(request, 'statisticsrafi/home.html', context)
+    """Main statistics dashboard (served from the cached leaderboards)"""
+    return render(request, 'statisticsrafi/home.html', get_leaderboards())
 
 def top_scorers(request, season='2025/26'):
     """Top goals based on club stats"""
@@ -125,6 +121,10 @@ def compare_clubs(request):
         
         stats1 = TeamStatistics.objects.filter(club=club1, season=season).first()
         stats2 = TeamStatistics.objects.filter(club=club2, season=season).first()
+        try:
+            comparison = get_stats_matrix(season).compare([club1.id, club2.id])
+        except ValueError:  # no statistics for that season
+            comparison = []
         
         context = {
             'club1': club1,
@@ -132,6 +132,7 @@ def compare_clubs(request):
             'stats1': stats1,
             'stats2': stats2,
             'season': season,
+            'comparison': comparison,
         }
         return render(request, 'statisticsrafi/club_comparison_result.html', context)
     
@@ -168,6 +169,7 @@ def team_detail(request, club_id):
     context = {
         'club': club,
         'team_stats': team_stats,
+        'stat_profile': get_stats_matrix(team_stats.season).profile(club.id) if team_stats else None,
         'club_ranking': club_ranking,
         'club_awards': club_awards,
         'user_has_voted': user_has_voted,